@@ -0,0 +1,205 @@
+# 计算核心的微基准测试：用固定种子生成打卡、出勤和请假数据，测量各计算函数在 1×、100×、10000× 个员工月上的耗时和峰值内存
+# 用法: python benchmarks/kernel_benchmark.py [--scales 1,100,10000] [--save-baseline] [--baseline benchmarks/kernel_baseline.json]
+# -*- coding: utf-8 -*-
+import os, sys, json, random, argparse, platform, tracemalloc, contextlib
+import time as t
+
+from mock_hr_server import attendance_records, clock_in_records, holiday_calendar
+
+
+REPO_PATH       = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE   = os.path.join(REPO_PATH, 'benchmarks', 'kernel_baseline.json')
+sys.path.insert(0, REPO_PATH)
+
+import calculator
+
+
+BENCHMARK_YEAR  = 2025
+MEMORY_SAMPLE   = 100       # 峰值内存只在前若干个员工月上测量，每次调用的峰值与规模无关
+COOKIE          = 'quectel_token=bench; MCHRID=0'
+
+# 被测函数，按流水线中的顺序排列
+KERNELS = ('parse_attendance_data', 'parse_process_application_data', 'group_daily_punches', 'calculate_daily_results',
+           'overtime_cal', 'late_time_cal', 'summarize')
+
+
+def leave_records(employee: str, year: int, month: int) -> list:
+    """
+    生成一个月的年假、事假和销假申请。销假申请撤销之前的某一条请假，不生成需要在线获取表单的延时工时扣减申请。
+
+    参数:
+        employee (str): 员工标识，与月份一起决定随机种子。
+        year (int): 年份。
+        month (int): 月份。
+
+    返回值:
+        list: 流程申请记录，格式与 290104 接口一致。
+    """
+    rnd = random.Random(f"{employee}|leave|{year}|{month}")
+    records = []
+    for index in range(rnd.randint(0, 4)):
+        kind = rnd.choice(('年假', '事假'))
+        day = rnd.randint(1, 26)
+        if rnd.random() < 0.7:
+            start_hour = rnd.choice((9, 14))
+            period = f"{year}-{month:02d}-{day:02d} {start_hour:02d}:00 - {year}-{month:02d}-{day:02d} {start_hour + 4:02d}:00"
+        else:
+            period = f"{year}-{month:02d}-{day:02d} 09:00 - {year}-{month:02d}-{day + rnd.randint(1, 2):02d} 18:00"
+        records.append({"ABSTRACTS": f"{employee}|{kind}|审批通过|{period}", "AUTHKEY": f"{employee}-{month}-{index}"})
+    if records and rnd.random() < 0.2:
+        cancelled = rnd.choice(records)["ABSTRACTS"].split('|')[3]
+        records.append({"ABSTRACTS": f"{employee}|销假申请|审批通过|{cancelled}", "AUTHKEY": f"{employee}-{month}-cancel"})
+    return records
+
+
+def employee_month(index: int, seed: int) -> dict:
+    """
+    生成第 index 个员工月的全部原始数据，同样的 index 和 seed 总是生成同样的数据。
+
+    返回值:
+        dict: clock_in、attendance 和 leave 三种原始记录。
+    """
+    employee = f"{seed}-{index}"
+    month = index % 12 + 1
+    return {
+        'clock_in': clock_in_records(employee, BENCHMARK_YEAR, month),
+        'attendance': attendance_records(employee, BENCHMARK_YEAR, month),
+        'leave': leave_records(employee, BENCHMARK_YEAR, month),
+    }
+
+
+def prepare_calls(data: dict, work_calendar) -> dict:
+    """
+    按流水线的顺序算出每个被测函数的输入，返回 {函数名: (调用函数, 处理的记录数)}。
+    输入在计时之外准备好，每个函数只测量它自己的耗时。
+    """
+    attendance = calculator.parse_attendance_data(data['attendance'])
+    daily_late_minutes, total_late_count, total_late_minutes, daily_shift_map = attendance
+    annual_leave, personal_leave, delay_deduction = calculator.parse_process_application_data(data['leave'], COOKIE)
+    result, _ = calculator.calculate_daily_results(data['clock_in'], work_calendar, annual_leave, personal_leave, delay_deduction,
+                                                   daily_late_minutes, daily_shift_map)
+    days = [(row.first_check_seconds, row.last_check_seconds, row.day_type, daily_shift_map.get(row.date)) for row in result]
+
+    def overtime_kernel():
+        for first, last, day_type, shift_name in days:
+            calculator.overtime_cal(first, last, day_type, shift_name)
+
+    def late_time_kernel():
+        for first, _, day_type, _ in days:
+            calculator.late_time_cal(first, day_type)
+
+    return {
+        'parse_attendance_data': (lambda: calculator.parse_attendance_data(data['attendance']), len(data['attendance'])),
+        'parse_process_application_data': (lambda: calculator.parse_process_application_data(data['leave'], COOKIE), len(data['leave'])),
+        'group_daily_punches': (lambda: calculator.group_daily_punches(data['clock_in']), len(data['clock_in'])),
+        'calculate_daily_results': (lambda: calculator.calculate_daily_results(data['clock_in'], work_calendar, annual_leave, personal_leave,
+                                                                               delay_deduction, daily_late_minutes, daily_shift_map),
+                                    len(data['clock_in'])),
+        'overtime_cal': (overtime_kernel, len(days)),
+        'late_time_cal': (late_time_kernel, len(days)),
+        'summarize': (lambda: calculator.summarize(result, work_calendar, total_late_count, total_late_minutes, verbose=False), len(result)),
+    }
+
+
+def run_scale(scale: int, seed: int, work_calendar, repeat: int = 1) -> dict:
+    """
+    在 scale 个员工月上运行所有被测函数。数据逐个员工月生成，只计被测函数的时间，内存占用不随规模增长。
+    计时重复 repeat 轮，每个函数取耗时最少的一轮，减少机器上其他负载带来的抖动。
+
+    返回值:
+        dict: {函数名: {'records', 'seconds', 'peak_bytes'}}，peak_bytes 为单次调用期间新增内存的峰值。
+    """
+    stats = {name: {'records': 0, 'seconds': float('inf'), 'peak_bytes': 0} for name in KERNELS}
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(max(repeat, 1)):
+            seconds = dict.fromkeys(KERNELS, 0.0)
+            records_count = dict.fromkeys(KERNELS, 0)
+            for index in range(scale):
+                calls = prepare_calls(employee_month(index, seed), work_calendar)
+                for name in KERNELS:
+                    function, records = calls[name]
+                    start = t.perf_counter()
+                    function()
+                    seconds[name] += t.perf_counter() - start
+                    records_count[name] += records
+            for name in KERNELS:
+                stats[name]['seconds'] = min(stats[name]['seconds'], seconds[name])
+                stats[name]['records'] = records_count[name]
+
+        # 峰值内存单独测量，tracemalloc 会明显拖慢运行速度，不和计时放在一起
+        tracemalloc.start()
+        try:
+            for index in range(min(scale, MEMORY_SAMPLE)):
+                calls = prepare_calls(employee_month(index, seed), work_calendar)
+                for name in KERNELS:
+                    function, _ = calls[name]
+                    tracemalloc.reset_peak()
+                    base = tracemalloc.get_traced_memory()[0]
+                    function()
+                    stats[name]['peak_bytes'] = max(stats[name]['peak_bytes'], tracemalloc.get_traced_memory()[1] - base)
+        finally:
+            tracemalloc.stop()
+    return stats
+
+
+def load_baseline(file_path: str) -> dict:
+    if not os.path.exists(file_path):
+        return {}
+    with open(file_path, 'r', encoding='utf-8') as file:
+        baseline = json.load(file)
+    print(f"基线: {file_path}（{baseline.get('python', '未知')}，{baseline.get('platform') or baseline.get('machine', '未知')}，"
+          f"{baseline.get('cpu_count', '?')} 核，{baseline.get('created', '未知日期')}）")
+    return baseline.get('results', {})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='测量计算核心各函数的耗时和峰值内存，并与基线比较')
+    parser.add_argument('--scales', default='1,100,10000', help='员工月数量，逗号分隔，默认为 1,100,10000')
+    parser.add_argument('--seed', type=int, default=0, help='数据生成的随机数种子')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help=f'基线文件，默认为 {os.path.relpath(BASELINE_FILE, REPO_PATH)}')
+    parser.add_argument('--save-baseline', action='store_true', help='将本次结果保存为新的基线')
+    parser.add_argument('--repeat', type=int, default=3, help='计时重复的轮数，每个函数取最快的一轮，默认为 3')
+    parser.add_argument('--threshold', type=float, default=1.2, help='耗时超过基线的倍数时视为退化，默认为 1.2')
+    parser.add_argument('--min-seconds', type=float, default=0.1,
+                        help='基线总耗时低于该秒数的函数只显示对比、不判定退化（毫秒级的计时受机器抖动影响太大），默认为 0.1')
+    args = parser.parse_args()
+
+    scales = [int(value) for value in args.scales.split(',') if value.strip()]
+    work_calendar = calculator.WorkCalendar.from_holiday_calendar(BENCHMARK_YEAR, holiday_calendar(BENCHMARK_YEAR))
+    baseline = load_baseline(args.baseline)
+    results = {}
+    regressions = []
+
+    print(f"{'函数':<34}{'规模':>8}{'记录数':>12}{'总耗时(ms)':>14}{'每条(µs)':>12}{'峰值(KB)':>12}{'对比基线':>10}")
+    for scale in scales:
+        stats = run_scale(scale, args.seed, work_calendar, args.repeat)
+        for name in KERNELS:
+            stat = stats[name]
+            key = f"{name}@{scale}"
+            results[key] = stat
+            per_record = stat['seconds'] / stat['records'] * 1e6 if stat['records'] else 0.0
+            comparison = ''
+            if key in baseline and baseline[key]['seconds']:
+                ratio = stat['seconds'] / baseline[key]['seconds']
+                comparison = f"{ratio:.2f}x"
+                if ratio > args.threshold and baseline[key]['seconds'] >= args.min_seconds:
+                    regressions.append(key)
+                    comparison += ' !'
+            print(f"{name:<34}{scale:>8}{stat['records']:>12}{stat['seconds'] * 1000:>14.2f}{per_record:>12.2f}"
+                  f"{stat['peak_bytes'] / 1024:>12.1f}{comparison:>10}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as file:
+            # 记录生成基线的环境，不同机器上的耗时不能直接比较
+            json.dump({'python': f"{platform.python_implementation()} {platform.python_version()}", 'machine': platform.machine(),
+                       'platform': platform.platform(), 'processor': platform.processor(), 'cpu_count': os.cpu_count(),
+                       'created': t.strftime('%Y-%m-%d'), 'seed': args.seed, 'repeat': args.repeat, 'results': results},
+                      file, ensure_ascii=False, indent=2)
+        print(f"基线已保存到 {args.baseline}")
+    if regressions:
+        print(f"以下函数的耗时超过基线的 {args.threshold} 倍: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,359 @@
+# 本地模拟的 HR 服务器，用于压测和端到端测试，不需要访问 hr.quectel.com
+# 用法: python benchmarks/mock_hr_server.py [--port 8080] [--latency 0.05] [--error-rate 0.01] [--expire-after 100]
+# 然后将 calculator.ORIGIN、HOLIDAY_API_URL 和 TOKEN_REFRESH_URL 指向打印出来的地址，GET /__stats 返回各接口的请求数
+# -*- coding: utf-8 -*-
+import re, sys, json, random, argparse, threading
+import time as t
+from datetime import date as dt_date, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+CLOCK_IN_VARIABLE               = 'MOCKCLOCK'
+PROCESS_APPLICATION_VARIABLE    = 'MOCKPROCESS'
+SHIFT_NAME                      = '深圳佛山桂林'
+TOKEN_REFRESH_PATH              = '/api/auth/refreshToken'
+STATS_PATH                      = '/__stats'
+
+# 模拟的法定节假日（wage 3 为三倍工资，2 为节假日中的周末，holiday 为 False 的是调休上班）
+HOLIDAYS = {
+    '01-01': (True, 3),
+    '05-01': (True, 3), '05-02': (True, 2), '05-03': (True, 2), '05-04': (True, 2), '05-05': (True, 2),
+    '10-01': (True, 3), '10-02': (True, 3), '10-03': (True, 3), '10-04': (True, 2), '10-05': (True, 2),
+    '10-06': (True, 2), '10-07': (True, 2), '09-28': (False, 1), '10-11': (False, 1),
+}
+
+
+def employee_random(employee: str, *salt) -> random.Random:
+    """
+    每个员工、每个月份使用固定的随机种子，同样的请求总是返回同样的数据。
+    """
+    return random.Random("|".join([employee] + [str(item) for item in salt]))
+
+
+def month_days(year: int, month: int):
+    day = dt_date(year, month, 1)
+    while day.month == month:
+        yield day
+        day += timedelta(days=1)
+
+
+def is_workday(day: dt_date) -> bool:
+    special = HOLIDAYS.get(day.strftime('%m-%d'))
+    if special is not None:
+        return not special[0]
+    return day.weekday() < 5
+
+
+def holiday_calendar(year) -> dict:
+    """
+    生成节假日接口返回的 holiday 字段。
+    """
+    return {key: {"holiday": is_holiday, "name": "假期" if is_holiday else "调休", "wage": wage, "date": f"{year}-{key}"}
+            for key, (is_holiday, wage) in HOLIDAYS.items()}
+
+
+def clock_in_records(employee: str, year: int, month: int) -> list:
+    """
+    生成一个月的打卡记录：工作日上下班各打卡一到两次，部分周末加班，偶尔有异地打卡。
+    """
+    rnd = employee_random(employee, 'clock', year, month)
+    records = []
+    for day in month_days(year, month):
+        if not is_workday(day) and rnd.random() > 0.3:
+            continue
+        date = day.isoformat()
+        start = rnd.randint(7 * 3600 + 40 * 60, 9 * 3600 + 10 * 60)
+        end = rnd.randint(17 * 3600 + 30 * 60, 22 * 3600 + 30 * 60)
+        punches = [start, end] + [rnd.randint(start, end) for _ in range(rnd.randint(0, 2))]
+        for seconds in punches:
+            remote = '(异地打卡)' if rnd.random() < 0.02 else ''
+            records.append({
+                "SHIFTTERM": date,
+                "CARDTIME": f"{date} {seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}{remote}",
+            })
+    return records
+
+
+def attendance_records(employee: str, year: int, month: int) -> list:
+    """
+    生成一个月的考勤记录，LATE 和 LATEMIN 为当月累计值，每条记录都带有。
+    """
+    rnd = employee_random(employee, 'attendance', year, month)
+    days = list(month_days(year, month))
+    late = {day: rnd.choice((5, 12, 25, 45, 70)) for day in days if is_workday(day) and rnd.random() < 0.08}
+    return [{
+        "TERM": day.isoformat(),
+        "LTRM_1": str(late.get(day, 0)),
+        "SHIFT": SHIFT_NAME,
+        "LATE": str(len(late)),
+        "LATEMIN": str(sum(late.values())),
+    } for day in days]
+
+
+def process_application_records(employee: str) -> list:
+    """
+    生成已完成的流程申请：最近一年的若干年假、事假和延时工时扣减申请。
+    """
+    rnd = employee_random(employee, 'process')
+    today = dt_date.today()
+    records = []
+    for index in range(rnd.randint(4, 12)):
+        day = today - timedelta(days=rnd.randint(1, 365))
+        kind = rnd.choice(('年假', '事假', '延时工时扣减申请'))
+        if kind == '延时工时扣减申请':
+            abstracts = f"{employee}|{kind}|{day.isoformat()}"
+        else:
+            start_hour = rnd.choice((9, 14))
+            abstracts = f"{employee}|{kind}|审批通过|{day.isoformat()} {start_hour:02d}:00 - {day.isoformat()} {start_hour + 4:02d}:00"
+        records.append({"ABSTRACTS": abstracts, "AUTHKEY": f"{employee}-{index}-{day.isoformat()}"})
+    return records
+
+
+def delay_deduction_form(auth_key: str) -> dict:
+    match = re.search(r'(\d{4}-\d{2}-\d{2})$', auth_key)
+    date = match.group(1) if match else dt_date.today().isoformat()
+    return {"formList": [{"formData": {"CARDBEGINTIME": f"{date}T19:00:00", "CARDENDTIME": f"{date}T19:30:00"}}]}
+
+
+class MockHRState:
+    """
+    服务器的可配置行为和统计数据，所有请求线程共用。
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, expire_after: int = 0, seed: int = 0):
+        """
+        参数:
+            latency (float): 每个请求的固定延迟（秒）。
+            jitter (float): 在固定延迟上额外增加的随机延迟上限（秒）。
+            error_rate (float): 返回 HTTP 500 的概率。
+            expire_after (int): 每个令牌可以使用的 alist 请求次数，用完后返回过期响应，需要续期；0 表示永不过期。
+                只有 alist 接口检查令牌，与 calculator 中经过 check_and_refresh_data 的请求一致。
+            seed (int): 随机数种子。
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.expire_after = expire_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.token_uses = {}
+        self.token_serial = 0
+        self.counts = {}
+
+    def count(self, name: str):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def should_fail(self) -> bool:
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+    def delay(self) -> float:
+        with self.lock:
+            return self.latency + (self.random.random() * self.jitter if self.jitter else 0.0)
+
+    def use_token(self, token: str) -> bool:
+        """
+        记录一次令牌使用，返回令牌是否仍然有效。
+        """
+        if not self.expire_after:
+            return True
+        with self.lock:
+            uses = self.token_uses.get(token, 0) + 1
+            self.token_uses[token] = uses
+            return uses <= self.expire_after
+
+    def issue_token(self) -> str:
+        with self.lock:
+            self.token_serial += 1
+            return f"mock-token-{self.token_serial}"
+
+
+class MockHRHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state = None    # 由 MockHRServer 设置
+    # keep-alive 连接上响应头和响应体分两次写出时，Nagle 算法和客户端的延迟确认会让每个请求多等约 40ms。
+    # 响应先写入缓冲区，请求处理完后一次写出，同时关闭 Nagle 算法
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, body: str, status: int = 200, content_type: str = 'application/json; charset=utf-8', headers: dict = None):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def cookies(self) -> dict:
+        header = self.headers.get('Cookie', '')
+        return dict(item.strip().split('=', 1) for item in header.split(';') if '=' in item)
+
+    def read_json(self) -> dict:
+        length = int(self.headers.get('Content-Length', 0) or 0)
+        raw = self.rfile.read(length) if length else b''
+        try:
+            return json.loads(raw or b'{}')
+        except ValueError:
+            return {}
+
+    def prepare(self, name: str, check_token: bool = True) -> bool:
+        """
+        统计请求、模拟延迟和错误，检查令牌是否过期。返回 False 时已经发送了响应。
+        """
+        state = self.state
+        state.count(name)
+        delay = state.delay()
+        if delay:
+            t.sleep(delay)
+        if state.should_fail():
+            state.count('error')
+            self.send_body('Internal Server Error', 500, 'text/plain; charset=utf-8')
+            return False
+        if check_token and not state.use_token(self.cookies().get('quectel_token', '')):
+            state.count('expired')
+            self.send_body(json.dumps({"code": "expired", "message": "token expired"}))
+            return False
+        return True
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path.startswith('/api/holiday/year/'):
+            if not self.prepare('holiday', check_token=False):
+                return
+            year = path.rstrip('/').rsplit('/', 1)[-1]
+            self.send_body(json.dumps({"code": 0, "holiday": holiday_calendar(year)}, ensure_ascii=False))
+        elif path == STATS_PATH:
+            # 统计数据不计入请求数，也不受延迟和错误率影响
+            with self.state.lock:
+                counts = dict(self.state.counts)
+            self.send_body(json.dumps(counts))
+        elif path == '/portal/index':
+            if not self.prepare('portal', check_token=False):
+                return
+            self.send_body(
+                f'<html><body><a title="个人考勤查询" href="/portal/app!{CLOCK_IN_VARIABLE}">个人考勤查询</a>'
+                f'<a title="流程申请" href="/portal/app!{PROCESS_APPLICATION_VARIABLE}">流程申请</a></body></html>',
+                content_type='text/html; charset=utf-8')
+        else:
+            self.send_body('Not Found', 404, 'text/plain; charset=utf-8')
+
+    def do_POST(self):
+        path = self.path.split('?', 1)[0]
+        body = self.read_json()
+        employee = self.cookies().get('MCHRID', 'anonymous')
+        if path == TOKEN_REFRESH_PATH:
+            if not self.prepare('refresh', check_token=False):
+                return
+            if not body.get('refreshToken'):
+                self.send_body(json.dumps({"code": "unauthorized"}), 401)
+                return
+            token = self.state.issue_token()
+            self.send_body(json.dumps({"code": 0, "data": {"token": token, "refreshToken": body['refreshToken']}}),
+                           headers={'Set-Cookie': f'quectel_token={token}; Path=/'})
+        elif path.startswith('/ajax/function/alist!'):
+            code = path.rsplit('.', 1)[-1]
+            if code not in ('220302', '220398', '290104'):
+                self.send_body('Not Found', 404, 'text/plain; charset=utf-8')
+                return
+            if not self.prepare(code):
+                return
+            if code == '290104':
+                self.send_body(json.dumps(process_application_records(employee), ensure_ascii=False))
+                return
+            term = body.get('appParam', {}).get('TERM', '')
+            try:
+                year, month = int(term[:4]), int(term[5:7])
+            except ValueError:
+                self.send_body(json.dumps({"code": "error", "message": "bad TERM"}), 400)
+                return
+            records = clock_in_records(employee, year, month) if code == '220302' else attendance_records(employee, year, month)
+            self.send_body(json.dumps(records, ensure_ascii=False))
+        elif path.startswith('/ajax/flowform/formlist!'):
+            if not self.prepare('formlist', check_token=False):
+                return
+            self.send_body(json.dumps(delay_deduction_form(path.rsplit('!', 1)[-1])))
+        else:
+            self.send_body('Not Found', 404, 'text/plain; charset=utf-8')
+
+
+def configure_calculator(calculator, url: str):
+    """
+    让 calculator 模块的所有请求都发到模拟服务器。
+
+    参数:
+        calculator (module): 已导入的 calculator 模块。
+        url (str): 模拟服务器地址，例如 http://127.0.0.1:8080。
+    """
+    calculator.ORIGIN = url
+    calculator.HOLIDAY_API_URL = url + '/api/holiday/year/{year}'
+    calculator.TOKEN_REFRESH_URL = url + TOKEN_REFRESH_PATH
+
+
+class MockHRServer:
+    """
+    在后台线程中运行的模拟 HR 服务器。
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, **options):
+        """
+        参数:
+            host (str): 监听地址。
+            port (int): 监听端口，0 表示随机端口。
+            **options: 传给 MockHRState 的参数。
+        """
+        self.state = MockHRState(**options)
+        handler = type('BoundMockHRHandler', (MockHRHandler,), {'state': self.state})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def configure(self, calculator):
+        configure_calculator(calculator, self.url)
+
+    def start(self) -> 'MockHRServer':
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟的 HR 服务器')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址，默认为 127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080, help='监听端口，0 表示随机端口，默认为 8080')
+    parser.add_argument('--latency', type=float, default=0.0, help='每个请求的固定延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='额外的随机延迟上限（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回 HTTP 500 的概率，例如 0.01')
+    parser.add_argument('--expire-after', type=int, default=0, help='每个令牌可以使用的请求次数，0 表示永不过期')
+    parser.add_argument('--seed', type=int, default=0, help='随机数种子')
+    args = parser.parse_args()
+
+    server = MockHRServer(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                          error_rate=args.error_rate, expire_after=args.expire_after, seed=args.seed)
+    # 第一行输出服务器地址，方便其他程序读取
+    print(server.url, flush=True)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(json.dumps(server.state.counts), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
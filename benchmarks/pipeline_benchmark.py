@@ -0,0 +1,218 @@
+# 端到端吞吐测试：在本地模拟的 HR 服务器上批量计算 N 名员工 × M 个月，统计请求速率、请求延迟和各阶段的 CPU 时间
+# 用法: python benchmarks/pipeline_benchmark.py [--employees 20] [--months 3] [--workers 8] [--latency 0.02] [--error-rate 0] [--expire-after 0]
+# -*- coding: utf-8 -*-
+import os, sys, csv, json, argparse, tempfile, threading, contextlib, subprocess, urllib.request
+import time as t
+from datetime import date as dt_date
+
+from mock_hr_server import STATS_PATH, configure_calculator
+
+
+REPO_PATH           = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MOCK_SERVER_FILE    = os.path.join(REPO_PATH, 'benchmarks', 'mock_hr_server.py')
+sys.path.insert(0, REPO_PATH)
+
+# 阶段名称和对应的 calculator 函数。同一线程中阶段不会嵌套，
+# 并发获取的请求在各自的线程中计时，所以 CPU 时间不会重复计算
+STAGES = {
+    'portal':    ('get_user_variable_online',),
+    'fetch':     ('get_clock_in_data', 'get_attendance_data', 'get_process_application_data', 'get_delay_deduction_data'),
+    'parse':     ('parse_process_application_data', 'parse_attendance_data'),
+    'compute':   ('calculate_daily_results',),
+    'summarize': ('summarize',),
+    'report':    ('save_report',),
+}
+
+
+class StageRecorder:
+    """
+    记录每个阶段的调用次数、墙钟时间和 CPU 时间，以及每个 HTTP 请求的延迟（包括排队等待连接的时间）。
+    CPU 时间使用 time.thread_time，只统计调用线程自己的 CPU 时间，不包括等待其他线程的时间。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {name: [0, 0.0, 0.0] for name in STAGES}
+        self.latencies = []
+
+    def wrap_stage(self, stage: str, function):
+        def wrapper(*args, **kwargs):
+            wall_start, cpu_start = t.perf_counter(), t.thread_time()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                wall, cpu = t.perf_counter() - wall_start, t.thread_time() - cpu_start
+                with self.lock:
+                    record = self.stages[stage]
+                    record[0] += 1
+                    record[1] += wall
+                    record[2] += cpu
+        return wrapper
+
+    def wrap_request(self, function):
+        def wrapper(*args, **kwargs):
+            start = t.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                with self.lock:
+                    self.latencies.append(t.perf_counter() - start)
+        return wrapper
+
+    def install(self, calculator):
+        """
+        替换 calculator 模块中的阶段函数和 HRClient 的请求方法。calculator 内部按全局名称调用，替换后立即生效。
+        """
+        for stage, names in STAGES.items():
+            for name in names:
+                setattr(calculator, name, self.wrap_stage(stage, getattr(calculator, name)))
+        calculator.HRClient.get = self.wrap_request(calculator.HRClient.get)
+        calculator.HRClient.post_json = self.wrap_request(calculator.HRClient.post_json)
+
+
+def percentile(values: list, fraction: float) -> float:
+    """
+    最近秩法计算百分位数。
+
+    参数:
+        values (list): 数值列表。
+        fraction (float): 百分位，例如 0.99。
+
+    返回值:
+        float: 百分位数；列表为空时返回 0。
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))]
+
+
+def recent_months(count: int) -> list:
+    """
+    生成最近 count 个已经结束的月份，按时间顺序排列。
+
+    返回值:
+        list: (年, 月) 列表。
+    """
+    today = dt_date.today()
+    year, month = today.year, today.month
+    months = []
+    for _ in range(count):
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+        months.append((year, month))
+    return months[::-1]
+
+
+def write_roster(file_path: str, employees: int):
+    """
+    生成名单文件，每名员工使用不同的 MCHRID 和令牌，分属 4 个部门。
+    """
+    with open(file_path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['name', 'cookie', 'department'])
+        for index in range(employees):
+            cookie = (f"quectel_lang=zh_CN; quectel_token=initial-{index}; quectel_refresh_token=refresh-{index}; "
+                      f"quectel_user_info=user{index}; MCLGID={index}; MCHRID={100000 + index}; ENMAME=user{index}; EMPTYPE=1")
+            writer.writerow([f"员工{index:04d}", cookie, f"部门{index % 4}"])
+
+
+def start_mock_server(args) -> tuple:
+    """
+    在单独的进程中启动模拟服务器，服务器的 CPU 时间不计入被测进程。
+
+    返回值:
+        tuple: (服务器进程, 服务器地址)。
+    """
+    command = [sys.executable, MOCK_SERVER_FILE, '--port', '0', '--latency', str(args.latency), '--jitter', str(args.jitter),
+               '--error-rate', str(args.error_rate), '--expire-after', str(args.expire_after), '--seed', str(args.seed)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    url = process.stdout.readline().strip()
+    if not url:
+        process.kill()
+        raise RuntimeError("模拟服务器启动失败")
+    return process, url
+
+
+def run_benchmark(args) -> dict:
+    """
+    启动模拟服务器，在临时目录中逐月运行批量计算，返回统计结果。
+    """
+    server, url = start_mock_server(args)
+    previous_directory = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            # calculator 使用相对路径读写配置、缓存和报表，切换到临时目录，不影响仓库中的文件
+            os.chdir(directory)
+            import calculator
+            configure_calculator(calculator, url)
+            calculator.size_http_pool(args.workers, batch=True)
+            recorder = StageRecorder()
+            recorder.install(calculator)
+            write_roster('roster.csv', args.employees)
+
+            months = recent_months(args.months)
+            wall_start, cpu_start = t.perf_counter(), t.process_time()
+            with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+                for year, month in months:
+                    calculator.run_batch('roster.csv', year, month, args.workers)
+            wall, cpu = t.perf_counter() - wall_start, t.process_time() - cpu_start
+
+            failed = 0
+            for year, month in months:
+                with open(f"{calculator.OUTPUT_PATH}{year}年{month:02d}月批量报表/批量汇总.csv", encoding='utf-8-sig') as file:
+                    failed += sum(1 for row in csv.DictReader(file) if row['状态'] != '成功')
+            os.chdir(previous_directory)
+        with urllib.request.urlopen(url + STATS_PATH, timeout=10) as response:
+            server_counts = json.load(response)
+    finally:
+        os.chdir(previous_directory)
+        server.terminate()
+        server.wait()
+
+    latencies = recorder.latencies
+    return {
+        'employees': args.employees,
+        'months': len(months),
+        'workers': args.workers,
+        'failed': failed,
+        'wall_seconds': wall,
+        'cpu_seconds': cpu,
+        'requests': len(latencies),
+        'requests_per_second': len(latencies) / wall if wall else 0.0,
+        'latency_p50_ms': percentile(latencies, 0.50) * 1000,
+        'latency_p99_ms': percentile(latencies, 0.99) * 1000,
+        'server_counts': server_counts,
+        'stages': {name: {'calls': calls, 'wall_seconds': stage_wall, 'cpu_seconds': stage_cpu}
+                   for name, (calls, stage_wall, stage_cpu) in recorder.stages.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='在本地模拟的 HR 服务器上测量批量计算的吞吐')
+    parser.add_argument('--employees', type=int, default=20, help='员工数量，默认为 20')
+    parser.add_argument('--months', type=int, default=3, help='计算最近几个月，默认为 3')
+    parser.add_argument('--workers', type=int, default=8, help='批量计算的并发数量，默认为 8')
+    parser.add_argument('--latency', type=float, default=0.02, help='模拟服务器每个请求的固定延迟（秒），默认为 0.02')
+    parser.add_argument('--jitter', type=float, default=0.01, help='模拟服务器额外的随机延迟上限（秒），默认为 0.01')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='模拟服务器返回 HTTP 500 的概率')
+    parser.add_argument('--expire-after', type=int, default=0, help='每个令牌可以使用的请求次数，0 表示永不过期')
+    parser.add_argument('--seed', type=int, default=0, help='随机数种子')
+    parser.add_argument('--json', help='将统计结果另外保存为 JSON 文件')
+    args = parser.parse_args()
+
+    stats = run_benchmark(args)
+    print(f"{stats['employees']} 名员工 × {stats['months']} 个月，{stats['workers']} 个并发，失败 {stats['failed']} 次")
+    print(f"总耗时 {stats['wall_seconds']:.2f}s，CPU {stats['cpu_seconds']:.2f}s，"
+          f"请求 {stats['requests']} 次，{stats['requests_per_second']:.1f} req/s，"
+          f"p50 {stats['latency_p50_ms']:.1f}ms，p99 {stats['latency_p99_ms']:.1f}ms")
+    print(f"服务器端请求数: {json.dumps(stats['server_counts'], ensure_ascii=False)}")
+    print(f"{'阶段':<12}{'调用次数':>10}{'墙钟(s)':>12}{'CPU(s)':>12}")
+    for name, stage in stats['stages'].items():
+        print(f"{name:<12}{stage['calls']:>10}{stage['wall_seconds']:>12.3f}{stage['cpu_seconds']:>12.3f}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(stats, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
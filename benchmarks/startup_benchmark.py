@@ -0,0 +1,120 @@
+# 启动耗时测试：分别测量不同命令行路径的总耗时和各依赖的导入耗时
+# 用法: python benchmarks/startup_benchmark.py [--repeat 10]
+# -*- coding: utf-8 -*-
+import os, sys, json, argparse, tempfile, statistics, subprocess
+import time as t
+
+
+REPO_PATH       = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CALCULATOR_FILE = os.path.join(REPO_PATH, 'calculator.py')
+
+# 需要关注的第三方依赖，启动时不应该被无关的路径加载
+HEAVY_MODULES = ('requests', 'bs4', 'tabulate', 'selenium', 'webdriver_manager')
+
+# 模拟已有 Cookie 时的启动过程：导入后创建 HTTP 客户端，到发出第一个请求之前为止
+CACHED_COOKIE_CODE = (
+    "import calculator; "
+    "calculator.get_hr_client('quectel_token=t; quectel_refresh_token=r; MCHRID=1')"
+)
+
+
+def prepare_local_data(directory: str):
+    """
+    在 directory 下生成 --local 需要的 data/data.json 和 data/holidays.json（一个月、每天四次打卡）。
+
+    参数:
+        directory (str): 运行目录。
+    """
+    os.makedirs(os.path.join(directory, 'data'), exist_ok=True)
+    records = []
+    for day in range(1, 32):
+        date = f"2026-01-{day:02d}"
+        for clock in ('08:25:13', '12:01:40', '13:02:11', '20:45:09'):
+            records.append({"SHIFTTERM": date, "CARDTIME": f"{date} {clock}"})
+    with open(os.path.join(directory, 'data', 'data.json'), 'w', encoding='utf-8') as file:
+        json.dump(records, file)
+    with open(os.path.join(directory, 'data', 'holidays.json'), 'w', encoding='utf-8') as file:
+        json.dump({"holiday": {"01-01": {"holiday": True, "wage": 3, "date": "2026-01-01"}}}, file)
+
+
+def build_cases() -> list:
+    """
+    生成要测试的路径。--local 和 --delete_sensitive_files 在临时目录中运行，不影响仓库中的文件。
+
+    返回值:
+        list: (名称, 命令参数) 列表。
+    """
+    return [
+        ("解释器启动（基准）", ['-c', 'pass']),
+        ("--help", [CALCULATOR_FILE, '--help']),
+        ("--delete_sensitive_files", [CALCULATOR_FILE, '--delete_sensitive_files']),
+        ("--local", [CALCULATOR_FILE, '--local']),
+        ("已有 Cookie（到第一次请求前）", ['-c', CACHED_COOKIE_CODE]),
+    ]
+
+
+def run_once(arguments: list, directory: str, import_time: bool = False) -> subprocess.CompletedProcess:
+    """
+    运行一次被测命令。
+
+    参数:
+        arguments (list): 传给 Python 解释器的参数。
+        directory (str): 运行目录。
+        import_time (bool): 是否加上 -X importtime。
+
+    返回值:
+        subprocess.CompletedProcess: 运行结果，stderr 中包含 importtime 输出。
+    """
+    env = dict(os.environ, PYTHONPATH=REPO_PATH, PYTHONIOENCODING='utf-8')
+    command = [sys.executable] + (['-X', 'importtime'] if import_time else []) + arguments
+    return subprocess.run(command, cwd=directory, env=env, input='\n\n', capture_output=True, text=True, encoding='utf-8')
+
+
+def parse_import_time(stderr: str) -> dict:
+    """
+    解析 -X importtime 的输出。
+
+    参数:
+        stderr (str): 被测命令的标准错误输出。
+
+    返回值:
+        dict: total 为所有顶层导入的累计耗时（毫秒），其余键为 HEAVY_MODULES 中已加载模块的累计耗时（毫秒）。
+    """
+    timings = {'total': 0.0}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        cumulative_ms = int(cumulative) / 1000
+        if not name[1:].startswith(' '):    # 没有缩进的是顶层导入
+            timings['total'] += cumulative_ms
+        if name.strip() in HEAVY_MODULES and name.strip() not in timings:
+            timings[name.strip()] = cumulative_ms
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='测量不同命令行路径的启动耗时')
+    parser.add_argument('--repeat', type=int, default=10, help='每个路径运行的次数，默认为 10')
+    args = parser.parse_args()
+
+    print(f"{'路径':<32}{'中位数(ms)':>12}{'最快(ms)':>12}{'导入(ms)':>12}  已加载的重依赖")
+    for name, arguments in build_cases():
+        durations = []
+        with tempfile.TemporaryDirectory() as directory:
+            for _ in range(max(1, args.repeat)):
+                prepare_local_data(directory)
+                start = t.perf_counter()
+                completed = run_once(arguments, directory)
+                durations.append((t.perf_counter() - start) * 1000)
+                if completed.returncode not in (0, None):
+                    print(f"{name} 运行失败: {(completed.stdout + completed.stderr).strip()[-500:]}")
+                    break
+            prepare_local_data(directory)
+            timings = parse_import_time(run_once(arguments, directory, import_time=True).stderr)
+        loaded = ", ".join(f"{module} {timings[module]:.1f}ms" for module in HEAVY_MODULES if module in timings) or "无"
+        print(f"{name:<32}{statistics.median(durations):>12.1f}{min(durations):>12.1f}{timings['total']:>12.1f}  {loaded}")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,25 +2,31 @@
 # 适用于 深圳佛山桂林
 # 评价部分从之前的html中移植，如有冒犯 雨我无瓜
 # -*- coding: utf-8 -*-
-import csv, os, json, shutil, requests, argparse, platform, traceback
+import csv, os, re, json, atexit, shutil, hashlib, argparse, platform, tempfile, functools, itertools, threading, traceback
+from array import array
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager, nullcontext
 import time as t
-from bs4 import BeautifulSoup
-from typing import Dict, Set, Tuple, List, Optional
-from datetime import datetime, timedelta, time as dt_time
-from tabulate import tabulate
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.edge.service import Service as EdgeService
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.edge.options import Options as EdgeOptions
-from webdriver_manager.chrome import ChromeDriverManager
-from webdriver_manager.microsoft import EdgeChromiumDriverManager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Set, Tuple, List, Iterable, Iterator, Optional
+from datetime import date as dt_date, datetime, timedelta, time as dt_time
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+# requests、bs4、tabulate、selenium 和 webdriver_manager 导入较慢，只在用到它们的函数中导入，
+# --help、--delete_sensitive_files、--local 等不需要联网或浏览器的路径不会加载它们
+if TYPE_CHECKING:
+    import requests
+    from requests.adapters import HTTPAdapter
 
 
 # 定义路径前缀
 CONFIG_PATH     = 'config/'
 OUTPUT_PATH     = 'output/'
 LOCAL_DATA_PATH = 'data/'
+CACHE_PATH      = 'cache/'
 
 
 # 这里设置Cookie和配置文件路径
@@ -28,6 +34,23 @@ COOKIES_FILE    = CONFIG_PATH + 'cookies.json'
 CONFIG_FILE     = CONFIG_PATH + 'config.json'
 
 
+# 缓存文件路径
+DELAY_DEDUCTION_CACHE_FILE = CACHE_PATH + 'delay_deduction.json'
+HOLIDAY_CACHE_PATH         = CACHE_PATH + 'holidays/'
+DAILY_RESULT_CACHE_PATH    = CACHE_PATH + 'daily/'
+DAILY_RESULT_CACHE_VERSION = 2      # 计算规则变化时加一，旧的每日结果缓存全部失效
+USE_DAILY_RESULT_CACHE     = True   # 是否复用之前计算过的每日结果，--recompute 时关闭
+RESPONSE_CACHE_PATH        = CACHE_PATH + 'responses/'
+RESPONSE_CACHE_MAX_BYTES   = 256 * 1024 * 1024     # 原始响应缓存的总大小上限，超出后淘汰最久未使用的响应
+HISTORY_DB_FILE            = CACHE_PATH + 'history.db'     # 历史数据库，保存每次运行获取的原始数据和每日结果
+USE_HISTORY                = True   # 是否写入历史数据库，--no-history 时关闭
+
+
+# 节假日接口，按年份获取
+HOLIDAY_API_URL     = 'https://timor.tech/api/holiday/year/{year}'
+HOLIDAY_CACHE_TTL   = 7 * 24 * 3600     # 节假日缓存的重新验证周期（秒），过期后重新获取，获取失败时继续使用旧数据
+
+
 # 请求头信息
 USER_AGENT  = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36'
 HOST        = 'hr.quectel.com'
@@ -35,6 +58,17 @@ ORIGIN      = 'https://hr.quectel.com'
 REFERER     = 'https://hr.quectel.com/portal/index'
 
 
+# 令牌续期接口，配置后 Cookie 过期时先用 quectel_refresh_token 静默续期，失败后才启动浏览器登录
+# HR 系统没有公开的续期接口，默认为空（不续期，直接启动浏览器登录），需要时在 CONFIG_FILE 中设置 token_refresh_url
+TOKEN_REFRESH_URL = ''
+
+
+# HTTP 连接池设置，所有 HR 接口请求共用同一个连接池
+HTTP_POOL_SIZE      = 10    # 连接池最大连接数，size_http_pool 会按同时进行的请求数放大
+HTTP_TIMEOUT        = 30    # 单次请求超时时间（秒）
+HTTP_CLIENT_CACHE   = 256   # 最多缓存的 HRClient 数量（每个 Cookie 一个）
+
+
 # 需要从页面获取的标题
 CLOCK_IN_DATA_TITLE             = '个人考勤查询'
 PROCESS_APPLICATION_DATA_TITLE  = '流程申请'
@@ -44,11 +78,370 @@ DEFAULT_SHIFT_NAME = '深圳佛山桂林'
 DEFAULT_WORKDAY_OVERTIME_START = '19:00:00'
 ALT_WORKDAY_OVERTIME_START = '18:30:00'
 
+# 同时获取延时工时扣减表单的请求数量上限
+DELAY_DEDUCTION_WORKERS = 8
+
 # 全局 debug 开关
 DEBUG = False
 
+# 是否允许交互（弹出浏览器登录、写回本地 Cookie 和接口配置），批量模式下关闭
+INTERACTIVE = True
+
+# 离线模式，只使用 RESPONSE_CACHE_PATH 中缓存的原始响应，不发出任何请求
+OFFLINE = False
+
+# 性能分析开关，--profile 时开启，结束时打印各阶段耗时并写入 PROFILE_TRACE_FILE
+PROFILE = False
+PROFILE_TRACE_FILE = OUTPUT_PATH + 'profile_trace.json'
+
+
+# 性能分析
+# 阶段名称和打印时使用的说明，按流水线中的顺序排列
+PROFILE_STAGES = OrderedDict([
+    ('browser_login', '浏览器登录'),
+    ('token_refresh', '令牌续期'),
+    ('endpoint_discovery', '获取接口地址'),
+    ('fetch_clock_in', '获取打卡数据'),
+    ('fetch_attendance', '获取出勤数据'),
+    ('fetch_process_application', '获取流程申请'),
+    ('delay_deduction', '获取延时工时扣减'),
+    ('holiday', '节假日数据'),
+    ('parse', '解析'),
+    ('compute', '逐日计算'),
+    ('summarize', '汇总'),
+    ('report', '写入报表'),
+    ('other', '其他'),
+])
+
+class StageProfiler:
+    """
+    按阶段统计墙钟时间、CPU 时间、调用次数、请求数、传输字节数和重试次数，同时记录 Chrome trace 格式的事件，
+    可以用 chrome://tracing 或 Perfetto 打开。
+    阶段按线程记录：同一线程中嵌套的阶段只计入最内层，不在阶段中发出的请求计入 other。
+    并发执行的阶段各自计时，所以各阶段墙钟时间之和可能超过总耗时。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.start_wall = t.perf_counter()
+        self.start_cpu = t.process_time()
+        self.stages = OrderedDict()
+        self.events = []
+
+    def totals(self, name: str) -> Dict[str, float]:
+        """
+        获取阶段的统计数据，调用方需要持有 self.lock。
+        """
+        totals = self.stages.get(name)
+        if totals is None:
+            totals = {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'requests': 0, 'bytes_sent': 0, 'bytes_received': 0, 'retries': 0}
+            self.stages[name] = totals
+        return totals
+
+    def current_stage(self) -> str:
+        stack = getattr(self.local, 'stack', None)
+        return stack[-1][0] if stack else 'other'
+
+    @contextmanager
+    def stage(self, name: str, count_wall: bool = True):
+        """
+        记录一个阶段。
+
+        参数:
+            name (str): 阶段名称，见 PROFILE_STAGES。
+            count_wall (bool): 是否计入墙钟时间。线程池中的子任务已经由提交它们的阶段计时，只统计 CPU 时间和请求。
+        """
+        stack = self.local.__dict__.setdefault('stack', [])
+        frame = [name, t.perf_counter(), t.thread_time(), 0.0, 0.0]     # 名称、开始时间、开始 CPU 时间、子阶段墙钟时间、子阶段 CPU 时间
+        stack.append(frame)
+        try:
+            yield
+        finally:
+            stack.pop()
+            wall = t.perf_counter() - frame[1]
+            cpu = t.thread_time() - frame[2]
+            if stack:
+                stack[-1][3] += wall
+                stack[-1][4] += cpu
+            with self.lock:
+                totals = self.totals(name)
+                totals['calls'] += 1
+                if count_wall:
+                    totals['wall_seconds'] += wall - frame[3]
+                totals['cpu_seconds'] += cpu - frame[4]
+                self.events.append({'name': name, 'cat': 'stage', 'ph': 'X', 'pid': os.getpid(), 'tid': threading.get_ident(),
+                                    'ts': round((frame[1] - self.start_wall) * 1e6), 'dur': round(wall * 1e6),
+                                    'args': {'cpu_ms': round(cpu * 1000, 3)}})
+
+    def record_request(self, response: 'requests.Response'):
+        """
+        记录一次 HTTP 请求，计入当前线程所在的阶段。字节数只统计请求体和响应体，不包括请求头。
+        """
+        body = response.request.body if response.request is not None else None
+        sent = len(body.encode('utf-8') if isinstance(body, str) else body) if body else 0
+        received = len(response.content)
+        elapsed = response.elapsed.total_seconds()
+        end = t.perf_counter()
+        stage = self.current_stage()
+        with self.lock:
+            totals = self.totals(stage)
+            totals['requests'] += 1
+            totals['bytes_sent'] += sent
+            totals['bytes_received'] += received
+            self.events.append({'name': f"{response.request.method if response.request is not None else ''} {response.url.split('?', 1)[0]}",
+                                'cat': 'request', 'ph': 'X', 'pid': os.getpid(), 'tid': threading.get_ident(),
+                                'ts': round((end - elapsed - self.start_wall) * 1e6), 'dur': round(elapsed * 1e6),
+                                'args': {'stage': stage, 'status': response.status_code, 'bytes_sent': sent, 'bytes_received': received}})
+
+    def record_retry(self, stage: Optional[str] = None):
+        """
+        记录一次重试（Cookie 或接口过期后重新请求）。
+
+        参数:
+            stage (Optional[str]): 重试的阶段，为空时使用当前线程所在的阶段。
+        """
+        with self.lock:
+            self.totals(stage or self.current_stage())['retries'] += 1
+
+    def report(self, trace_file: str):
+        """
+        打印各阶段耗时并将统计数据和事件写入 trace_file。
+        """
+        total_wall = t.perf_counter() - self.start_wall
+        total_cpu = t.process_time() - self.start_cpu
+        with self.lock:
+            stages = OrderedDict((name, dict(self.stages[name])) for name in list(PROFILE_STAGES) + list(self.stages)
+                                 if name in self.stages)
+            events = list(self.events)
+
+        rows = [[PROFILE_STAGES.get(name, name), totals['calls'], f"{totals['wall_seconds']:.3f}", f"{totals['cpu_seconds']:.3f}",
+                 totals['requests'], f"{totals['bytes_sent'] / 1024:.1f}", f"{totals['bytes_received'] / 1024:.1f}", totals['retries']]
+                for name, totals in stages.items()]
+        from tabulate import tabulate
+        print(f"\n性能分析：总耗时 {total_wall:.3f}s，CPU {total_cpu:.3f}s（并发阶段的耗时分别累计）")
+        print(tabulate(rows, headers=["阶段", "次数", "墙钟(s)", "CPU(s)", "请求数", "发送(KB)", "接收(KB)", "重试"], tablefmt="grid"))
+
+        ensure_directory_exists(trace_file)
+        atomic_write_json(trace_file, {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'total_wall_seconds': total_wall, 'total_cpu_seconds': total_cpu, 'stages': stages},
+        })
+        print(f"性能分析数据已保存到 {trace_file}")
+
+_profiler = None
+
+def enable_profiling(trace_file: str = PROFILE_TRACE_FILE):
+    """
+    开启性能分析，程序退出时（包括调用 exit() 退出）打印各阶段耗时并写入 trace_file。
+
+    参数:
+        trace_file (str): JSON 跟踪文件路径。
+    """
+    global PROFILE, _profiler
+    PROFILE = True
+    _profiler = StageProfiler()
+    atexit.register(_profiler.report, trace_file)
+
+def profile_stage(name: str, count_wall: bool = True):
+    """
+    返回记录阶段 name 的上下文管理器，没有开启性能分析时什么也不做。
+    """
+    return _profiler.stage(name, count_wall) if PROFILE else nullcontext()
+
+def profiled(name: str, count_wall: bool = True):
+    """
+    把函数的每次调用记录为阶段 name 的装饰器。
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not PROFILE:
+                return function(*args, **kwargs)
+            with _profiler.stage(name, count_wall):
+                return function(*args, **kwargs)
+        wrapper.profile_stage = name
+        return wrapper
+    return decorator
+
 
 # 本地文件操作
+class FileLock:
+    """
+    基于锁文件（path + '.lock'）的跨进程建议锁，POSIX 上使用 fcntl.flock，Windows 上使用 msvcrt.locking。
+    同一主机上同时运行的多个进程写同一个文件时，用它保证读取-修改-写回不会互相覆盖。
+    """
+
+    def __init__(self, path: str):
+        """
+        参数:
+            path (str): 要保护的文件路径。
+        """
+        self.lock_path = path + '.lock'
+        self.file = None
+
+    def __enter__(self):
+        ensure_directory_exists(self.lock_path)
+        self.file = open(self.lock_path, 'a+')
+        if os.name == 'nt':
+            self.file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass    # LK_LOCK 重试 10 秒后仍未拿到锁会抛出异常，继续等待
+        else:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        try:
+            if os.name == 'nt':
+                self.file.seek(0)
+                msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        finally:
+            self.file.close()
+            self.file = None
+
+def atomic_write_json(file_path: str, data, indent: Optional[int] = None):
+    """
+    原子地写入 JSON 文件：先写到同目录下的临时文件，再用 os.replace 替换。
+    其他进程读到的要么是旧文件，要么是完整的新文件，不会读到写了一半的内容。
+
+    参数:
+        file_path (str): 目标文件路径。
+        data: 要写入的数据。
+        indent (Optional[int]): JSON 缩进。
+    """
+    ensure_directory_exists(file_path)
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(file_path) + '.', suffix='.tmp', dir=os.path.dirname(file_path))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False, indent=indent)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+class JsonStore:
+    """
+    一个 JSON 对象文件的进程内缓存。文件只在第一次使用和被其他进程修改后（修改时间或大小变化）重新读取；
+    写入时持有 FileLock，先合并磁盘上的最新内容再原子写回，多个线程和进程可以安全地共用同一个文件。
+    """
+
+    def __init__(self, file_path: str, indent: Optional[int] = None):
+        """
+        参数:
+            file_path (str): JSON 文件路径。
+            indent (Optional[int]): 写入时的 JSON 缩进。
+        """
+        self.file_path = file_path
+        self.indent = indent
+        self._data = None
+        self._signature = None
+        self._lock = threading.RLock()
+
+    def _disk_signature(self):
+        try:
+            stat = os.stat(self.file_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _refresh(self):
+        signature = self._disk_signature()
+        if self._data is not None and signature == self._signature:
+            return
+        data = {}
+        if signature is not None:
+            try:
+                with open(self.file_path, 'r', encoding='utf-8') as file:
+                    data = json.load(file)
+                if not isinstance(data, dict):
+                    raise ValueError("文件内容不是 JSON 对象")
+            except (json.JSONDecodeError, ValueError) as e:
+                print(f"读取 {self.file_path} 失败: {e}")
+                data = {}
+        self._data, self._signature = data, signature
+
+    def load(self) -> dict:
+        """
+        读取文件内容。
+
+        返回值:
+            dict: 文件内容的副本；文件不存在时返回空字典。
+        """
+        with self._lock:
+            self._refresh()
+            return dict(self._data)
+
+    def update(self, changes: dict):
+        """
+        更新部分键并写回文件，其他键保持磁盘上的最新值。
+
+        参数:
+            changes (dict): 要更新的键值。
+        """
+        with self._lock, FileLock(self.file_path):
+            self._refresh()
+            data = dict(self._data)
+            data.update(changes)
+            self._write(data)
+
+    def transform(self, function):
+        """
+        在锁内读取磁盘上的最新内容，交给 function 修改后写回，用于需要删除键或整体调整的场景。
+
+        参数:
+            function (Callable[[dict], dict]): 接收当前内容的副本，返回新的内容。
+        """
+        with self._lock, FileLock(self.file_path):
+            self._refresh()
+            self._write(function(dict(self._data)))
+
+    def replace(self, data: dict):
+        """
+        用 data 替换整个文件内容。
+
+        参数:
+            data (dict): 新的文件内容。
+        """
+        with self._lock, FileLock(self.file_path):
+            self._write(dict(data))
+
+    def _write(self, data: dict):
+        atomic_write_json(self.file_path, data, self.indent)
+        self._data, self._signature = data, self._disk_signature()
+
+_json_stores = {}
+_json_stores_lock = threading.Lock()
+
+def get_json_store(file_path: str, indent: Optional[int] = None) -> JsonStore:
+    """
+    获取指定文件的 JsonStore，同一个文件在进程内只有一个实例。
+
+    参数:
+        file_path (str): JSON 文件路径。
+        indent (Optional[int]): 写入时的 JSON 缩进。
+
+    返回值:
+        JsonStore: 文件对应的存储。
+    """
+    with _json_stores_lock:
+        store = _json_stores.get(file_path)
+        if store is None:
+            store = _json_stores[file_path] = JsonStore(file_path, indent)
+        return store
+
 def get_cookie():
     """
     从 COOKIE_FILE 中读取 Cookie。
@@ -58,8 +451,7 @@ def get_cookie():
     """
     if os.path.exists(COOKIES_FILE):
         try:
-            with open(COOKIES_FILE, 'r', encoding='utf-8') as file:
-                cookie_data = json.load(file)
+            cookie_data = get_json_store(COOKIES_FILE, indent=2).load()
 
             # 不在本地判断Cookie是否过期，由服务器响应决定
             # 如果服务器返回过期/未授权响应，check_and_refresh_data 会自动重新获取
@@ -72,23 +464,19 @@ def get_cookie():
             else:
                 print("Cookie文件中无有效Cookie数据")
                 return None
-        except (json.JSONDecodeError, KeyError, ValueError) as e:
+        except (KeyError, ValueError, TypeError, OSError) as e:
             print(f"读取Cookie文件失败: {e}")
             return None
     return None
 
 def read_config():
     """
-    读取 CONFIG_FILE。
+    读取 CONFIG_FILE。文件在进程内只读取一次，被其他进程修改后才会重新读取。
 
     返回值:
-        dict: 如果存在配置文件，返回保存的配置数据；否则返回 None。
+        dict: 保存的配置数据的副本；配置文件不存在时返回空字典。
     """
-    config = {}
-    if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as file:
-            config = json.load(file)
-    return config
+    return get_json_store(CONFIG_FILE, indent=4).load()
 
 def get_clock_in_api_endpoint_from_config():
     """
@@ -116,7 +504,7 @@ def get_process_application_api_endpoint_from_config():
 
 def get_holiday_data_from_local(records: json, holiday_data: json) -> Tuple[Dict, Set]:
     """
-    从本地 JSON 数据中获取指定年份的节假日数据。
+    从本地 JSON 数据中获取指定年份的节假日数据，并写入节假日缓存，之后的在线查询也会使用这份数据。
 
     参数:
         records (json): 包含打卡记录的 JSON 数据。
@@ -134,20 +522,244 @@ def get_holiday_data_from_local(records: json, holiday_data: json) -> Tuple[Dict
         print("数据文件为空或格式不正确。")
         exit()
 
-    if holiday_data:
-        holidays = {}
-        workdays = set()
-        for date, info in holiday_data['holiday'].items():
-            if info['date'][:-3] == records[0]['SHIFTTERM'][:-3]:
-                if info['holiday']:
-                    holidays[info['date']] = info['wage']
-                else:
-                    workdays.add(info['date'])
-        return holidays, workdays
+    if holiday_data and holiday_data.get('holiday'):
+        # 节假日数据的年份以文件内容为准，不一定与打卡记录的年份相同
+        year = int(next(iter(holiday_data['holiday'].values()))['date'][:4])
+        store_holiday_calendar(year, holiday_data['holiday'])
+        return filter_month_holidays(holiday_data['holiday'], records[0]['SHIFTTERM'][:-3])
     else:
         print("节假日数据文件为空或格式不正确。")
         exit()
 
+def filter_month_holidays(calendar: Dict[str, Dict], month_prefix: str) -> Tuple[Dict, Set]:
+    """
+    从全年的节假日数据中筛选出指定月份的节假日和调休工作日。
+
+    参数:
+        calendar (Dict[str, Dict]): 节假日接口返回的 holiday 字段。
+        month_prefix (str): 月份，格式为 'YYYY-MM'。
+
+    返回值:
+        Tuple[Dict, Set]: 节假日数据（键为日期，值为工资倍数）和工作日集合。
+    """
+    holidays = {}
+    workdays = set()
+    for date, info in calendar.items():
+        if info['date'][:-3] == month_prefix:
+            if info['holiday']:
+                holidays[info['date']] = info['wage']
+            else:
+                workdays.add(info['date'])
+    return holidays, workdays
+
+def read_holiday_calendar_from_cache(year: int) -> Optional[Tuple[Dict[str, Dict], float]]:
+    """
+    从 HOLIDAY_CACHE_PATH 中读取指定年份的节假日数据。
+
+    参数:
+        year (int): 年份。
+
+    返回值:
+        Optional[Tuple[Dict[str, Dict], float]]: 节假日数据和获取时间戳；没有缓存时返回 None。
+    """
+    file_path = f"{HOLIDAY_CACHE_PATH}{year}.json"
+    if not os.path.exists(file_path):
+        return None
+    try:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            cached = json.load(file)
+        return cached['holiday'], cached['timestamp']
+    except (json.JSONDecodeError, KeyError, ValueError) as e:
+        print(f"读取节假日缓存失败: {e}")
+        return None
+
+def save_holiday_calendar_to_cache(year: int, calendar: Dict[str, Dict]):
+    """
+    保存指定年份的节假日数据到 HOLIDAY_CACHE_PATH，包含时间戳。
+
+    参数:
+        year (int): 年份。
+        calendar (Dict[str, Dict]): 节假日接口返回的 holiday 字段。
+    """
+    atomic_write_json(f"{HOLIDAY_CACHE_PATH}{year}.json", {'holiday': calendar, 'timestamp': datetime.now().timestamp()})
+
+def read_daily_results_from_cache(employee_key: str, month: str) -> Dict[str, list]:
+    """
+    从 DAILY_RESULT_CACHE_PATH 中读取一个员工一个月已经计算过的每日结果。
+
+    参数:
+        employee_key (str): 员工标识，见 get_employee_cache_key。
+        month (str): 月份，格式为 YYYY-MM。
+
+    返回值:
+        Dict[str, list]: 键为日期，值为 [输入指纹, DailyResult]；没有缓存或缓存版本不一致时返回空字典。
+    """
+    file_path = f"{DAILY_RESULT_CACHE_PATH}{employee_key}/{month}.json"
+    if not os.path.exists(file_path):
+        return {}
+    try:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            cached = json.load(file)
+        if cached.get('version') != DAILY_RESULT_CACHE_VERSION:
+            return {}
+        return {date: [fingerprint, DailyResult.from_row(row)] for date, (fingerprint, row) in cached['days'].items()}
+    except (json.JSONDecodeError, KeyError, ValueError, TypeError, AttributeError) as e:
+        print(f"读取每日结果缓存失败，将重新计算: {e}")
+        return {}
+
+def save_daily_results_to_cache(employee_key: str, month: str, days: Dict[str, list]):
+    """
+    保存一个员工一个月的每日结果到 DAILY_RESULT_CACHE_PATH。
+
+    参数:
+        employee_key (str): 员工标识，见 get_employee_cache_key。
+        month (str): 月份，格式为 YYYY-MM。
+        days (Dict[str, list]): 键为日期，值为 [输入指纹, DailyResult]。
+    """
+    atomic_write_json(f"{DAILY_RESULT_CACHE_PATH}{employee_key}/{month}.json",
+                      {'version': DAILY_RESULT_CACHE_VERSION, 'days': {date: [fingerprint, row.as_row()] for date, (fingerprint, row) in days.items()}})
+
+def is_closed_month(year: int, month: int) -> bool:
+    """
+    判断指定月份是否已经结束，已结束月份的打卡和出勤数据不会再变化。
+
+    参数:
+        year (int): 年份。
+        month (int): 月份。
+
+    返回值:
+        bool: 早于当前月份时返回 True。
+    """
+    now = datetime.now()
+    return (int(year), int(month)) < (now.year, now.month)
+
+def month_end_timestamp(year: int, month: int) -> float:
+    """
+    返回指定月份结束（下个月第一天零点）的时间戳。
+
+    参数:
+        year (int): 年份。
+        month (int): 月份。
+
+    返回值:
+        float: 时间戳。
+    """
+    year, month = int(year), int(month)
+    return datetime(year + month // 12, month % 12 + 1, 1).timestamp()
+
+def response_cache_key(endpoint_code: str, user_cookie, year: Optional[int] = None, month: Optional[int] = None) -> Optional[str]:
+    """
+    生成原始响应缓存的键：接口编号/员工标识/月份，不按月份查询的接口月份部分为 all。
+
+    参数:
+        endpoint_code (str): 接口编号，例如打卡数据为 220302。
+        user_cookie (str 或 dict): 员工的 Cookie。
+        year (Optional[int]): 年份。
+        month (Optional[int]): 月份。
+
+    返回值:
+        Optional[str]: 缓存键；Cookie 中没有员工标识时返回 None。
+    """
+    employee_key = get_employee_cache_key(user_cookie)
+    if not employee_key:
+        return None
+    period = f"{int(year)}-{int(month):02d}" if year is not None and month is not None else 'all'
+    return f"{endpoint_code}/{employee_key}/{period}"
+
+def read_cached_response(endpoint_code: str, user_cookie, year: Optional[int] = None, month: Optional[int] = None):
+    """
+    读取缓存的原始响应。在线时只使用已结束月份、并且是在月份结束之后获取的缓存（月中获取的是不完整的数据），
+    离线模式下使用所有缓存。命中时更新响应文件的修改时间，作为淘汰时的最近使用时间，不改写索引。
+
+    参数:
+        endpoint_code (str): 接口编号。
+        user_cookie (str 或 dict): 员工的 Cookie。
+        year (Optional[int]): 年份，不按月份查询的接口为 None。
+        month (Optional[int]): 月份，不按月份查询的接口为 None。
+
+    返回值:
+        缓存的响应数据；不能使用缓存时返回 None。
+
+    异常:
+        ValueError: 离线模式下没有对应的缓存。
+    """
+    closed = year is not None and month is not None and is_closed_month(year, month)
+    if not (OFFLINE or closed):
+        return None
+    key = response_cache_key(endpoint_code, user_cookie, year, month)
+    index = get_json_store(RESPONSE_CACHE_PATH + 'index.json')
+    entry = index.load().get(key) if key else None
+    if entry and not OFFLINE and entry.get('fetched_at', 0) < month_end_timestamp(year, month):
+        entry = None
+    if entry:
+        try:
+            object_path = f"{RESPONSE_CACHE_PATH}objects/{entry['sha'][:2]}/{entry['sha']}.json"
+            with open(object_path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            os.utime(object_path)
+            return data
+        except (OSError, json.JSONDecodeError, KeyError, TypeError) as e:
+            print(f"读取响应缓存 {key} 失败: {e}")
+    if OFFLINE:
+        raise ValueError(f"离线模式下没有 {key or endpoint_code} 的缓存数据，请先在线运行一次")
+    return None
+
+def save_response_to_cache(endpoint_code: str, user_cookie, data, year: Optional[int] = None, month: Optional[int] = None):
+    """
+    按内容哈希保存原始响应，相同内容只保存一份，并记录获取时间；总大小超过 RESPONSE_CACHE_MAX_BYTES 时
+    按响应文件的修改时间淘汰最久未使用的响应。只缓存正常的数据（列表），错误信息和过期提示不缓存。
+    未结束月份的响应也会保存，供离线模式使用，在线时由 read_cached_response 根据获取时间决定是否使用。
+
+    参数:
+        endpoint_code (str): 接口编号。
+        user_cookie (str 或 dict): 员工的 Cookie。
+        data: 响应数据。
+        year (Optional[int]): 年份，不按月份查询的接口为 None。
+        month (Optional[int]): 月份，不按月份查询的接口为 None。
+    """
+    key = response_cache_key(endpoint_code, user_cookie, year, month)
+    if not key or not isinstance(data, list):
+        return
+    sha = hashlib.sha256(json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()
+    object_path = f"{RESPONSE_CACHE_PATH}objects/{sha[:2]}/{sha}.json"
+    if os.path.exists(object_path):
+        os.utime(object_path)
+    else:
+        atomic_write_json(object_path, data)
+    entry = {'sha': sha, 'size': os.path.getsize(object_path), 'fetched_at': datetime.now().timestamp()}
+
+    def last_used(sha: str) -> float:
+        try:
+            return os.path.getmtime(f"{RESPONSE_CACHE_PATH}objects/{sha[:2]}/{sha}.json")
+        except OSError:
+            return 0.0
+
+    removed = []
+    def evict(entries: dict) -> dict:
+        entries[key] = entry
+        sizes = {item['sha']: item['size'] for item in entries.values()}
+        total = sum(sizes.values())
+        if total <= RESPONSE_CACHE_MAX_BYTES:
+            return entries
+        used = {sha: last_used(sha) for sha in sizes}
+        for old_key in sorted(entries, key=lambda name: used[entries[name]['sha']]):
+            if total <= RESPONSE_CACHE_MAX_BYTES:
+                break
+            if old_key == key:
+                continue
+            old_sha = entries.pop(old_key)['sha']
+            if all(item['sha'] != old_sha for item in entries.values()):
+                total -= sizes[old_sha]
+                removed.append(old_sha)
+        return entries
+
+    get_json_store(RESPONSE_CACHE_PATH + 'index.json').transform(evict)
+    for old_sha in removed:
+        try:
+            os.remove(f"{RESPONSE_CACHE_PATH}objects/{old_sha[:2]}/{old_sha}.json")
+        except OSError:
+            pass
+
 def ensure_directory_exists(file_path):
     """
     确保文件路径的目录存在。如果不存在，则创建它。
@@ -156,9 +768,70 @@ def ensure_directory_exists(file_path):
         file_path (str): 文件路径。
     """
     directory = os.path.dirname(file_path)
-    if not os.path.exists(directory):
+    if directory and not os.path.exists(directory):
         os.makedirs(directory)
 
+_JSON_WHITESPACE = re.compile(r'[ \t\r\n]*')
+_JSON_SEPARATOR = re.compile(r'[ \t\r\n]*([,\]])')
+
+def iter_json_array(file_path: str, chunk_size: int = 1 << 16):
+    """
+    逐条读取 JSON 数组文件中的元素，每次只读入 chunk_size 个字符，
+    适合几百 MB 的多人打卡数据导出文件，内存占用与文件大小无关。
+
+    参数:
+        file_path (str): JSON 文件路径，文件内容必须是一个数组。
+        chunk_size (int): 每次读取的字符数。
+
+    返回值:
+        Iterator: 按顺序产出数组中的每个元素。
+
+    异常:
+        ValueError: 如果文件内容不是 JSON 数组或格式不正确。
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r', encoding='utf-8-sig') as file:
+        buffer = ''
+        pos = 0
+        eof = False
+        started = False     # 是否已经读到左括号
+        empty = True        # 是否还没有产出任何元素
+        while True:
+            pos = _JSON_WHITESPACE.match(buffer, pos).end()
+            if pos >= len(buffer) and not eof:
+                # 丢弃已经解析过的部分，buffer 只保留未解析的内容
+                chunk = file.read(chunk_size)
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+            if not started:
+                if not buffer.startswith('[', pos):
+                    raise ValueError("JSON 文件内容不是数组")
+                started = True
+                pos += 1
+                continue
+            if empty and buffer.startswith(']', pos):
+                return
+
+            # 元素后面必须跟着逗号或右括号，否则元素可能在读取边界处被截断（例如数字），需要读入更多内容再解析
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+                separator = _JSON_SEPARATOR.match(buffer, end)
+                if separator is None:
+                    raise json.JSONDecodeError("数据不完整", buffer, end)
+            except json.JSONDecodeError:
+                if eof:
+                    raise ValueError(f"JSON 格式不正确: {buffer[pos:pos + 50]}")
+                chunk = file.read(chunk_size)
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+            yield item
+            if separator.group(1) == ']':
+                return
+            empty = False
+            pos = separator.end()
+
 def save_cookie(cookie):
     """
     保存 Cookie 到 COOKIE_FILE，包含时间戳。
@@ -166,13 +839,11 @@ def save_cookie(cookie):
     参数:
         cookie (str): 要保存的 Cookie 字符串。
     """
-    ensure_directory_exists(COOKIES_FILE)
     cookie_data = {
         'user_cookie': cookie,
         'timestamp': datetime.now().timestamp()
     }
-    with open(COOKIES_FILE, 'w', encoding='utf-8') as file:
-        json.dump(cookie_data, file, ensure_ascii=False, indent=2)
+    get_json_store(COOKIES_FILE, indent=2).replace(cookie_data)
 
 def save_config(config_data):
     """
@@ -181,9 +852,7 @@ def save_config(config_data):
     参数:
         config_data (dict): 要保存的配置数据。
     """
-    ensure_directory_exists(CONFIG_FILE)
-    with open(CONFIG_FILE, 'w', encoding='utf-8') as file:
-        json.dump(config_data, file, ensure_ascii=False, indent=4)
+    get_json_store(CONFIG_FILE, indent=4).replace(config_data)
 
 def save_clock_in_api_endpoint_to_config(config_data):
     """
@@ -192,9 +861,7 @@ def save_clock_in_api_endpoint_to_config(config_data):
     参数:
         config_data (str): 打卡数据接口的 URL。
     """
-    config = read_config()
-    config['clock_in_api_endpoint'] = config_data
-    save_config(config)
+    get_json_store(CONFIG_FILE, indent=4).update({'clock_in_api_endpoint': config_data})
 
 def save_process_application_api_endpoint_to_config(config_data):
     """
@@ -203,15 +870,254 @@ def save_process_application_api_endpoint_to_config(config_data):
     参数:
         config_data (str): 流程申请信息接口的 URL。
     """
-    config = read_config()
-    config['process_application_api_endpoint'] = config_data
-    save_config(config)
+    get_json_store(CONFIG_FILE, indent=4).update({'process_application_api_endpoint': config_data})
+
+def get_cached_delay_deductions(auth_keys: List[str]) -> Dict[str, List[Tuple[str, str]]]:
+    """
+    从 DELAY_DEDUCTION_CACHE_FILE 中读取已缓存的延时工时扣减表单。
+    已完成的审批表单不会再变化，所以缓存不设过期时间。
+
+    参数:
+        auth_keys (List[str]): 要查询的 AUTHKEY 列表。
+
+    返回值:
+        Dict[str, List[Tuple[str, str]]]: 已缓存的表单，键为 AUTHKEY，值为 (CARDBEGINTIME, CARDENDTIME) 列表。
+    """
+    cache = get_json_store(DELAY_DEDUCTION_CACHE_FILE).load()
+    return {key: [tuple(period) for period in cache[key]] for key in auth_keys if key in cache}
+
+def save_delay_deductions_to_cache(forms: Dict[str, List[Tuple[str, str]]]):
+    """
+    将新获取的延时工时扣减表单追加保存到 DELAY_DEDUCTION_CACHE_FILE。
+    写入时持有文件锁并合并磁盘上的最新内容，同时运行的其他进程保存的表单不会丢失。
+
+    参数:
+        forms (Dict[str, List[Tuple[str, str]]]): 键为 AUTHKEY，值为 (CARDBEGINTIME, CARDENDTIME) 列表。
+    """
+    if not forms:
+        return
+    get_json_store(DELAY_DEDUCTION_CACHE_FILE).update({key: [list(period) for period in periods] for key, periods in forms.items()})
+
+# HTTP 客户端
+class HRClient:
+    """
+    hr.quectel.com 的 HTTP 客户端，持有默认请求头和 Cookie。
+    所有 HRClient 共用同一个连接池适配器，同一主机的请求复用 keep-alive 连接，
+    不用每次请求都重新建立 TCP 和 TLS 连接。
+    """
+
+    def __init__(self, user_cookie: str, adapter: 'HTTPAdapter'):
+        """
+        参数:
+            user_cookie (str): 用户的 Cookie 字符串。
+            adapter (HTTPAdapter): 共用的连接池适配器。
+        """
+        import requests
+        self.user_cookie = user_cookie
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Host': HOST,
+            'Origin': ORIGIN,
+            'Referer': REFERER,
+            'User-Agent': USER_AGENT,
+        })
+        self.session.cookies.update(parse_cookie_string(user_cookie))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, url: str) -> 'requests.Response':
+        """
+        发送 GET 请求。
+
+        参数:
+            url (str): 请求地址。
+
+        返回值:
+            requests.Response: 服务器响应。
+        """
+        response = self.session.get(url, timeout=HTTP_TIMEOUT)
+        if PROFILE:
+            _profiler.record_request(response)
+        return response
+
+    def post_json(self, url: str, payload: str, pin_host: bool = True) -> 'requests.Response':
+        """
+        发送 JSON 格式的 POST 请求。
+
+        参数:
+            url (str): 请求地址。
+            payload (str): 已序列化的 JSON 请求体。
+            pin_host (bool): 是否发送固定的 Host 请求头。请求 hr.quectel.com 以外的地址时为 False，由 requests 根据 url 生成。
+
+        返回值:
+            requests.Response: 服务器响应。
+        """
+        headers = {'Content-Type': 'application/json'}
+        if not pin_host:
+            headers['Host'] = None      # 值为 None 的请求头会从会话的默认请求头中去掉
+        response = self.session.post(url, data=payload, headers=headers, timeout=HTTP_TIMEOUT)
+        if PROFILE:
+            _profiler.record_request(response)
+        return response
+
+_http_adapter = None
+_hr_clients = OrderedDict()
+_hr_clients_lock = threading.Lock()
+
+def size_http_pool(workers: int, batch: bool):
+    """
+    按同时进行的请求数放大连接池，需要在第一次请求之前调用。连接池小于并发数时，多出来的连接用完就被丢弃
+    （Connection pool is full），高并发时反而失去复用。
+
+    每个员工先由 fetch_employee_data 同时发出 3 个请求，之后再用 DELAY_DEDUCTION_WORKERS 个线程获取延时工时扣减表单，
+    两者先后进行。批量模式下 workers 个员工同时进行，峰值为 workers * max(3, DELAY_DEDUCTION_WORKERS)；
+    区间查询时 workers 个月份请求和扣减表单也是先后进行，峰值为两者中较大的一个。
+
+    参数:
+        workers (int): 批量模式下同时处理的员工数量，区间查询时同时发出的请求数量。
+        batch (bool): 是否为批量模式。
+    """
+    global HTTP_POOL_SIZE
+    per_employee = max(3, DELAY_DEDUCTION_WORKERS)
+    if batch:
+        HTTP_POOL_SIZE = max(HTTP_POOL_SIZE, max(1, workers) * per_employee)
+    else:
+        HTTP_POOL_SIZE = max(HTTP_POOL_SIZE, workers, per_employee)
+
+def parse_cookie_string(user_cookie) -> Dict[str, str]:
+    """
+    将 Cookie 字符串转换为字典，已经是字典时原样返回。
+
+    参数:
+        user_cookie (str 或 dict): Cookie 字符串，例如 'a=1; b=2'。
+
+    返回值:
+        Dict[str, str]: Cookie 字典。
+    """
+    if isinstance(user_cookie, dict):
+        return user_cookie
+    return dict(item.strip().split("=", 1) for item in str(user_cookie).split(";") if "=" in item)
+
+def get_hr_client(user_cookie) -> HRClient:
+    """
+    获取指定 Cookie 对应的 HRClient，同一个 Cookie 复用同一个客户端，所有客户端共用一个连接池。
+
+    参数:
+        user_cookie (str 或 dict): 用户的 Cookie 信息。
+
+    返回值:
+        HRClient: HTTP 客户端。
+    """
+    global _http_adapter
+    if isinstance(user_cookie, dict):
+        user_cookie = "; ".join(f"{name}={value}" for name, value in user_cookie.items())
+    else:
+        user_cookie = str(user_cookie)  # 强制转换为字符串
+
+    with _hr_clients_lock:
+        client = _hr_clients.get(user_cookie)
+        if client is not None:
+            _hr_clients.move_to_end(user_cookie)
+            return client
+        if _http_adapter is None:
+            from requests.adapters import HTTPAdapter
+            _http_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE)
+        client = HRClient(user_cookie, _http_adapter)
+        _hr_clients[user_cookie] = client
+        # 淘汰最久未使用的客户端，连接池由所有客户端共用，不随客户端释放
+        while len(_hr_clients) > HTTP_CLIENT_CACHE:
+            _hr_clients.popitem(last=False)
+        return client
 
 
 # 在线获取
+_holiday_calendars = {}
+_holiday_year_locks = {}
+_holiday_year_locks_lock = threading.Lock()
+
+def _holiday_year_lock(year: int) -> threading.Lock:
+    """
+    获取指定年份的锁，不同年份可以同时获取，同一年份只会请求一次。
+    """
+    with _holiday_year_locks_lock:
+        return _holiday_year_locks.setdefault(year, threading.Lock())
+
+def store_holiday_calendar(year: int, calendar: Dict[str, Dict]):
+    """
+    将指定年份的节假日数据放入内存并写入缓存文件。
+
+    参数:
+        year (int): 年份。
+        calendar (Dict[str, Dict]): 节假日接口返回的 holiday 字段。
+    """
+    with _holiday_year_lock(year):
+        _holiday_calendars[year] = calendar
+        _work_calendars.pop(year, None)
+        save_holiday_calendar_to_cache(year, calendar)
+
+@profiled('holiday')
+def get_holiday_calendar(year: int) -> Optional[Dict[str, Dict]]:
+    """
+    获取指定年份的节假日数据。依次使用内存中的数据、未过期的缓存文件和在线接口，
+    在线获取失败时退回到已过期的缓存文件，同一年份在一个进程中最多请求一次。
+
+    参数:
+        year (int): 年份。
+
+    返回值:
+        Optional[Dict[str, Dict]]: 节假日接口返回的 holiday 字段；完全无法获取时返回 None。
+    """
+    year = int(year)
+    with _holiday_year_lock(year):
+        if year in _holiday_calendars:
+            return _holiday_calendars[year]
+
+        cached = read_holiday_calendar_from_cache(year)
+        if cached and datetime.now().timestamp() - cached[1] < HOLIDAY_CACHE_TTL:
+            _holiday_calendars[year] = cached[0]
+            return cached[0]
+
+        if OFFLINE:
+            calendar = cached[0] if cached else None
+            _holiday_calendars[year] = calendar
+            return calendar
+
+        import requests
+        try:
+            response = requests.get(HOLIDAY_API_URL.format(year=year), headers={'User-Agent': USER_AGENT}, timeout=HTTP_TIMEOUT)
+            if PROFILE:
+                _profiler.record_request(response)
+            response.raise_for_status()
+            calendar = response.json()['holiday']
+            save_holiday_calendar_to_cache(year, calendar)
+        except requests.exceptions.RequestException as e:
+            print(f"请求失败: {e}")
+            calendar = None
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+            print(f"JSON解析失败: {e}")
+            calendar = None
+
+        if calendar is None and cached:
+            print(f"无法在线获取{year}年的节假日信息，使用缓存数据")
+            calendar = cached[0]
+        # 获取失败也记录下来，离线时同一年份不再反复请求
+        _holiday_calendars[year] = calendar
+        return calendar
+
+def prefetch_holiday_calendars(years):
+    """
+    并发预取多个年份的节假日数据，区间查询跨年或批量计算开始前调用。
+
+    参数:
+        years (Iterable[int]): 年份。
+    """
+    years = sorted({int(year) for year in years})
+    with ThreadPoolExecutor(max_workers=max(1, len(years))) as executor:
+        list(executor.map(get_holiday_calendar, years))
+
 def get_holiday_data_online(records: json) -> Tuple[Dict, Set]:
     """
-    在线获取指定年份的节假日数据。
+    在线获取指定年份的节假日数据，优先使用节假日缓存。
 
     参数:
         records (json): 包含打卡记录的 JSON 数据。
@@ -230,31 +1136,91 @@ def get_holiday_data_online(records: json) -> Tuple[Dict, Set]:
     else:
         print("数据文件为空或格式不正确。")
         exit()
-    headers = {
-        'User-Agent': USER_AGENT
-    }
+    calendar = get_holiday_calendar(int(year))
+    if calendar is None:
+        print(f"无法获取{year}年的节假日信息，仅按周末判断")
+        return {}, set()
+    return filter_month_holidays(calendar, sample_date[:-3])
+
+def get_token_refresh_url() -> str:
+    """
+    获取令牌续期接口地址，CONFIG_FILE 中的 token_refresh_url 优先。
+
+    返回值:
+        str: 令牌续期接口地址；没有配置时为空字符串，表示不使用静默续期。
+    """
     try:
-        api_url = f'https://timor.tech/api/holiday/year/{year}'
-        response = requests.get(api_url, headers=headers)
-        response.raise_for_status()
-        holiday_data = response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"请求失败: {e}")
-        holiday_data = None
-    except json.JSONDecodeError as e:
-        print(f"JSON解析失败: {e}")
-        holiday_data = None
-    if holiday_data:
-        holidays = {}
-        workdays = set()
-        for date, info in holiday_data['holiday'].items():
-            if info['date'][:-3] == records[0]['SHIFTTERM'][:-3]:
-                if info['holiday']:
-                    holidays[info['date']] = info['wage']
-                else:
-                    workdays.add(info['date'])
-    return holidays, workdays
+        return read_config().get('token_refresh_url') or TOKEN_REFRESH_URL
+    except OSError as e:
+        print(f"读取配置文件失败，不使用令牌续期: {e}")
+        return TOKEN_REFRESH_URL
+
+@profiled('token_refresh')
+def refresh_cookie_via_token(user_cookie) -> Optional[str]:
+    """
+    使用 Cookie 中的 quectel_refresh_token 通过 HTTP 请求续期登录状态，不需要浏览器。只有配置了续期接口时才会请求。
+
+    续期接口的格式没有公开文档，这里假设：请求体为 {"refreshToken": ...}；新的令牌在响应的 Set-Cookie 中
+    （quectel_token，可选 quectel_refresh_token），或在响应体（或其中的 data 对象）的 token 字段中，
+    可选 refreshToken 字段。没有新的 refresh token 时沿用原来的。响应不符合这些假设时打印原因并返回 None，
+    不会拼出缺少令牌的 Cookie。
+
+    参数:
+        user_cookie (str 或 dict): 已过期的 Cookie。
+
+    返回值:
+        Optional[str]: 续期后的 Cookie 字符串；没有配置续期接口、没有 refresh token、请求失败或响应中没有新令牌时返回 None。
+    """
+    cookie_dict = dict(parse_cookie_string(user_cookie))
+    refresh_token = cookie_dict.get('quectel_refresh_token')
+    url = get_token_refresh_url()
+    if not refresh_token or not url:
+        return None
+
+    import requests
+    from urllib.parse import urlsplit
+    try:
+        # 续期接口可以配置到其他主机，只有主机为 hr.quectel.com 时才发送固定的 Host 请求头
+        response = get_hr_client(user_cookie).post_json(url, json.dumps({"refreshToken": refresh_token}), pin_host=urlsplit(url).netloc == HOST)
+    except requests.RequestException as e:
+        print(f"令牌续期请求失败: {e}")
+        return None
+    if DEBUG:
+        print(f"[DEBUG] refresh_cookie_via_token 响应状态码: {response.status_code}")
+        print(f"[DEBUG] refresh_cookie_via_token 响应内容: {response.text[:2000]}")
+    if response.status_code != 200:
+        print(f"令牌续期失败，状态码: {response.status_code}")
+        return None
 
+    tokens = response.cookies.get_dict()
+    token, new_refresh_token = tokens.get('quectel_token'), tokens.get('quectel_refresh_token')
+    try:
+        body = response.json()
+    except ValueError:
+        body = None
+    if isinstance(body, dict) and isinstance(body.get('data'), dict):
+        body = body['data']
+    if isinstance(body, dict):
+        token = token or body.get('token')
+        new_refresh_token = new_refresh_token or body.get('refreshToken')
+
+    if not token or not isinstance(token, str):
+        print(f"令牌续期失败：响应中没有新的令牌（Set-Cookie 中的 quectel_token 或响应体中的 token）: {response.text[:200]}")
+        return None
+    if token == cookie_dict.get('quectel_token'):
+        print("令牌续期失败：服务器返回的令牌与原来的相同")
+        return None
+    renewed = dict(cookie_dict)
+    renewed['quectel_token'] = token
+    if new_refresh_token and isinstance(new_refresh_token, str):
+        renewed['quectel_refresh_token'] = new_refresh_token
+    new_cookie = "; ".join(f"{name}={value}" for name, value in renewed.items())
+    if not validate_user_cookie(new_cookie):
+        print("令牌续期失败：续期后的Cookie缺少必需字段")
+        return None
+    return new_cookie
+
+@profiled('endpoint_discovery')
 def get_user_variable_online(user_cookie, title):
     """
     从用户的 Cookie 信息中获取指定标题的用户变量。
@@ -266,22 +1232,8 @@ def get_user_variable_online(user_cookie, title):
     返回值：
         指定标题的用户变量。
     """
-    # 如果 user_cookie 是字符串，则将其转换为字典
-    if isinstance(user_cookie, str):
-        user_cookie = dict(item.strip().split("=", 1) for item in user_cookie.split(";"))
-
-    session = requests.Session()
-    session.headers.update({
-        'Host': HOST,
-        'Origin': ORIGIN,
-        'Referer': REFERER,
-        'User-Agent': USER_AGENT,
-    })
-    # 直接更新会话的 Cookie
-    session.cookies.update(user_cookie)
-
-    url = "https://hr.quectel.com/portal/index"
-    response = session.get(url)
+    url = f"{ORIGIN}/portal/index"
+    response = get_hr_client(user_cookie).get(url)
 
     if response.status_code != 200:
         if DEBUG:
@@ -289,6 +1241,7 @@ def get_user_variable_online(user_cookie, title):
             print(f"[DEBUG] get_user_variable_online 响应内容: {response.text[:2000]}")
         raise ValueError(f"请求失败: {response.status_code}")
 
+    from bs4 import BeautifulSoup
     soup = BeautifulSoup(response.text, 'html.parser')
     link = soup.find('a', {'title': title})
 
@@ -304,6 +1257,7 @@ def get_user_variable_online(user_cookie, title):
     user_variable = href[href.index('!')+1:]
     return user_variable
 
+@profiled('fetch_clock_in')
 def get_clock_in_data(user_variable, user_cookie, target_month, target_year):
     """
     从指定网页获取个人打卡查询数据。
@@ -320,30 +1274,29 @@ def get_clock_in_data(user_variable, user_cookie, target_month, target_year):
     # 确保 target_month 是两位数格式
     target_month = f"{int(target_month):02d}"
     
+    # 已结束月份的数据不会再变化，优先使用缓存
+    cached = read_cached_response('220302', user_cookie, target_year, target_month)
+    if cached is not None:
+        return cached
+
     # 220302: 个人打卡查询
-    url = f"https://hr.quectel.com/ajax/function/alist!{user_variable}.220302"
-    user_cookie = str(user_cookie)  # 强制转换为字符串
+    url = f"{ORIGIN}/ajax/function/alist!{user_variable}.220302"
     payload = json.dumps({
         "appParam": {"TERM": f"{target_year}-{target_month}-01T00:00:00.000Z"},
         "appFnKey": "SE0302",
         "formData": {}
     })
-    headers = {
-        'Host': HOST,
-        'Origin': ORIGIN,
-        'Referer': REFERER,
-        'User-Agent': USER_AGENT,
-        'Cookie': user_cookie,
-        'Content-Type': 'application/json'
-    }
-    response = requests.request("POST", url, headers=headers, data=payload)
+    response = get_hr_client(user_cookie).post_json(url, payload)
 
     if DEBUG:
         print(f"[DEBUG] get_clock_in_data 响应状态码: {response.status_code}")
         print(f"[DEBUG] get_clock_in_data 响应内容: {response.text[:2000]}")
 
-    return response.json()
+    data = response.json()
+    save_response_to_cache('220302', user_cookie, data, target_year, target_month)
+    return data
 
+@profiled('fetch_attendance')
 def get_attendance_data(user_variable, user_cookie, target_month, target_year):
     """
     从指定网页获取个人考勤查询数据。
@@ -360,30 +1313,29 @@ def get_attendance_data(user_variable, user_cookie, target_month, target_year):
     # 确保 target_month 是两位数格式
     target_month = f"{int(target_month):02d}"
     
+    # 已结束月份的数据不会再变化，优先使用缓存
+    cached = read_cached_response('220398', user_cookie, target_year, target_month)
+    if cached is not None:
+        return cached
+
     # 220398: 个人考勤查询
-    url = f"https://hr.quectel.com/ajax/function/alist!{user_variable}.220398"
-    user_cookie = str(user_cookie)  # 强制转换为字符串
+    url = f"{ORIGIN}/ajax/function/alist!{user_variable}.220398"
     payload = json.dumps({
         "appParam": {"TERM": f"{target_year}-{target_month}-01T00:00:00.000Z"},
         "appFnKey": "SE0398",
         "formData": {}
     })
-    headers = {
-        'Host': HOST,
-        'Origin': ORIGIN,
-        'Referer': REFERER,
-        'User-Agent': USER_AGENT,
-        'Cookie': user_cookie,
-        'Content-Type': 'application/json'
-    }
-    response = requests.request("POST", url, headers=headers, data=payload)
+    response = get_hr_client(user_cookie).post_json(url, payload)
 
     if DEBUG:
         print(f"[DEBUG] get_attendance_data 响应状态码: {response.status_code}")
         print(f"[DEBUG] get_attendance_data 响应内容: {response.text[:2000]}")
 
-    return response.json()
+    data = response.json()
+    save_response_to_cache('220398', user_cookie, data, target_year, target_month)
+    return data
 
+@profiled('fetch_process_application')
 def get_process_application_data(user_variable, user_cookie):
     """
     从指定网页获取审批流程中的请假数据，事假可以用加班抵扣，年假就不计算迟到。
@@ -395,9 +1347,13 @@ def get_process_application_data(user_variable, user_cookie):
     返回值：
     - 服务器响应的 JSON 数据，包含个人流程审批查询结果。
     """
+    # 流程申请随时可能新增，在线时总是重新获取，缓存只在离线模式下使用
+    cached = read_cached_response('290104', user_cookie)
+    if cached is not None:
+        return cached
+
     # 290104: 已完成流程申请查询
-    url = f"https://hr.quectel.com/ajax/function/alist!{ user_variable }.290104"
-    user_cookie = str(user_cookie)  # 强制转换为字符串
+    url = f"{ORIGIN}/ajax/function/alist!{ user_variable }.290104"
     payload = json.dumps({
         "searchcols": "",
         "order": "asc",
@@ -437,22 +1393,17 @@ def get_process_application_data(user_variable, user_cookie):
             }
         }
     })
-    headers = {
-        'Host': HOST,
-        'Origin': ORIGIN,
-        'Referer': REFERER,
-        'User-Agent': USER_AGENT,
-        'Cookie': user_cookie,
-        'Content-Type': 'application/json'
-    }
-    response = requests.request("POST", url, headers=headers, data=payload)
+    response = get_hr_client(user_cookie).post_json(url, payload)
 
     if DEBUG:
         print(f"[DEBUG] get_process_application_data 响应状态码: {response.status_code}")
         print(f"[DEBUG] get_process_application_data 响应内容: {response.text[:2000]}")
 
-    return response.json()
+    data = response.json()
+    save_response_to_cache('290104', user_cookie, data)
+    return data
 
+@profiled('delay_deduction', count_wall=False)
 def get_delay_deduction_data(auth_key, user_cookie):
     """
     通过 AUTHKEY 获取延时工时扣减的数据
@@ -465,8 +1416,7 @@ def get_delay_deduction_data(auth_key, user_cookie):
     - 服务器响应的 JSON 数据，包含延时工时扣减申请审批查询结果。
     """
     # 290104: 已完成流程申请查询
-    url = f"https://hr.quectel.com/ajax/flowform/formlist!{ auth_key }"
-    user_cookie = str(user_cookie)  # 强制转换为字符串
+    url = f"{ORIGIN}/ajax/flowform/formlist!{ auth_key }"
     payload = json.dumps({
         "formData": {},
         "bizData": {},
@@ -477,15 +1427,7 @@ def get_delay_deduction_data(auth_key, user_cookie):
         "receivers": 'null',
         "freeNode": 'null'
     })
-    headers = {
-        'Host': HOST,
-        'Origin': ORIGIN,
-        'Referer': REFERER,
-        'User-Agent': USER_AGENT,
-        'Cookie': user_cookie,
-        'Content-Type': 'application/json'
-    }
-    response = requests.request("POST", url, headers=headers, data=payload)
+    response = get_hr_client(user_cookie).post_json(url, payload)
 
     if DEBUG:
         print(f"[DEBUG] get_delay_deduction_data 响应状态码: {response.status_code}")
@@ -533,6 +1475,7 @@ def validate_user_cookie(user_cookie):
         print(f"Cookie验证失败: {e}")
         return False
 
+@profiled('browser_login')
 def fetch_cookie_via_browser(browser='auto'):
     """
     启动浏览器获取 Cookie 并返回。
@@ -575,10 +1518,17 @@ def fetch_cookie_via_browser(browser='auto'):
             print("未知的操作系统。")
             exit()
 
+    from selenium import webdriver
     if browser == 'edge':
+        from selenium.webdriver.edge.service import Service as EdgeService
+        from selenium.webdriver.edge.options import Options as EdgeOptions
+        from webdriver_manager.microsoft import EdgeChromiumDriverManager
         options = EdgeOptions()
         service = EdgeService(EdgeChromiumDriverManager().install())
     else:
+        from selenium.webdriver.chrome.service import Service as ChromeService
+        from selenium.webdriver.chrome.options import Options as ChromeOptions
+        from webdriver_manager.chrome import ChromeDriverManager
         options = ChromeOptions()
         service = ChromeService(ChromeDriverManager().install())
 
@@ -588,7 +1538,7 @@ def fetch_cookie_via_browser(browser='auto'):
 
     print(f"正在启动{browser}浏览器以获取Cookie...")
     driver = webdriver.Chrome(service=service, options=options) if browser == 'chrome' else webdriver.Edge(service=service, options=options)
-    driver.get("https://hr.quectel.com")
+    driver.get(ORIGIN)
 
     print("请在打开的浏览器中登录网站，获取到了Cookie会自动退出...")
 
@@ -606,13 +1556,301 @@ def fetch_cookie_via_browser(browser='auto'):
 
 
 # 逻辑部分
-def get_day_type(date: str, holidays: Dict[str, int], workdays: Set[str]) -> str:
+# 日期性质编码，WorkCalendar 中按编码存储，DAY_TYPE_NAMES 为对应的名称
+DAY_TYPE_WORKDAY            = 0
+DAY_TYPE_WEEKEND            = 1
+DAY_TYPE_HOLIDAY_WEEKEND    = 2
+DAY_TYPE_HOLIDAY            = 3
+DAY_TYPE_NAMES = ("工作日", "周末", "节假日(周末)", "节假日")
+
+class WorkCalendar:
+    """
+    一整年的日期性质索引。每天的日期性质和工资倍数各占一个字节，
+    同时保存应出勤天数和周末天数的前缀和，任意日期区间的天数统计都是 O(1)。
     """
-    判断指定日期的性质。
 
-    参数:
-        date (str): 要判断的日期，格式为 'YYYY-MM-DD'。
-        holidays (Dict[str, int]): 节假日数据，键为日期，值为工资倍数。
+    def __init__(self, year: int, holidays: Dict[str, int], workdays: Set[str]):
+        """
+        参数:
+            year (int): 年份。
+            holidays (Dict[str, int]): 节假日数据，键为日期，值为工资倍数，其他年份的日期会被忽略。
+            workdays (Set[str]): 调休工作日集合，其他年份的日期会被忽略。
+        """
+        self.year = year
+        self._year_prefix = f"{year:04d}"
+        first_day = dt_date(year, 1, 1)
+        days = dt_date(year + 1, 1, 1).toordinal() - first_day.toordinal()
+        self._month_offsets = [dt_date(year, month, 1).toordinal() - first_day.toordinal() for month in range(1, 13)] + [days]
+
+        # 先按星期几填充，再用调休工作日和节假日覆盖，判断顺序与 get_day_type 一致
+        first_weekday = first_day.weekday()
+        self.day_types = bytearray(DAY_TYPE_WEEKEND if (first_weekday + index) % 7 >= 5 else DAY_TYPE_WORKDAY for index in range(days))
+        self.wages = bytearray(2 if day_type == DAY_TYPE_WEEKEND else 1 for day_type in self.day_types)
+        for date in workdays:
+            if date.startswith(self._year_prefix):
+                self.day_types[self.day_index(date)] = DAY_TYPE_WORKDAY
+                self.wages[self.day_index(date)] = 1
+        for date, wage in holidays.items():
+            if date.startswith(self._year_prefix):
+                self.day_types[self.day_index(date)] = DAY_TYPE_HOLIDAY if wage == 3 else DAY_TYPE_HOLIDAY_WEEKEND
+                self.wages[self.day_index(date)] = wage
+
+        self._workday_prefix = array('H', [0]) * (days + 1)
+        self._weekend_prefix = array('H', [0]) * (days + 1)
+        for index, day_type in enumerate(self.day_types):
+            self._workday_prefix[index + 1] = self._workday_prefix[index] + (day_type == DAY_TYPE_WORKDAY)
+            self._weekend_prefix[index + 1] = self._weekend_prefix[index] + (day_type == DAY_TYPE_WEEKEND)
+
+    @classmethod
+    def from_holiday_calendar(cls, year: int, calendar: Optional[Dict[str, Dict]]) -> 'WorkCalendar':
+        """
+        根据节假日接口返回的 holiday 字段建立索引，没有节假日数据时只按周末判断。
+
+        参数:
+            year (int): 年份。
+            calendar (Optional[Dict[str, Dict]]): 节假日接口返回的 holiday 字段。
+
+        返回值:
+            WorkCalendar: 该年份的日期性质索引。
+        """
+        holidays = {}
+        workdays = set()
+        for info in (calendar or {}).values():
+            if info['holiday']:
+                holidays[info['date']] = info['wage']
+            else:
+                workdays.add(info['date'])
+        return cls(year, holidays, workdays)
+
+    def day_index(self, date: str) -> int:
+        """
+        计算日期在该年中的序号（从 0 开始），只截取月和日，不做完整的日期解析。
+
+        参数:
+            date (str): 日期，格式为 'YYYY-MM-DD'，必须属于该年份。
+
+        返回值:
+            int: 日期序号。
+
+        异常:
+            ValueError: 如果日期不属于该年份或格式不正确。
+        """
+        if not date.startswith(self._year_prefix):
+            raise ValueError(f"日期 {date} 不属于 {self.year} 年")
+        return self._month_offsets[int(date[5:7]) - 1] + int(date[8:10]) - 1
+
+    def day_type_code(self, date: str) -> int:
+        """返回日期性质编码，取值见 DAY_TYPE_*。"""
+        return self.day_types[self.day_index(date)]
+
+    def day_type(self, date: str) -> str:
+        """返回日期性质，可能的值为 "节假日", "节假日(周末)", "周末", "工作日"。"""
+        return DAY_TYPE_NAMES[self.day_types[self.day_index(date)]]
+
+    def wage(self, date: str) -> int:
+        """返回日期的工资倍数，工作日为 1，周末为 2，节假日为接口给出的倍数。"""
+        return self.wages[self.day_index(date)]
+
+    def count_workdays(self, start: str, end: str) -> int:
+        """返回 [start, end] 区间（包含两端）内的应出勤天数。"""
+        return self._workday_prefix[self.day_index(end) + 1] - self._workday_prefix[self.day_index(start)]
+
+    def count_weekends(self, start: str, end: str) -> int:
+        """返回 [start, end] 区间（包含两端）内的周末天数（不包括节假日和调休工作日）。"""
+        return self._weekend_prefix[self.day_index(end) + 1] - self._weekend_prefix[self.day_index(start)]
+
+    def required_workdays(self, month: int) -> int:
+        """返回指定月份的应出勤天数。"""
+        return self._workday_prefix[self._month_offsets[month]] - self._workday_prefix[self._month_offsets[month - 1]]
+
+    def weekends_in_month(self, month: int) -> int:
+        """返回指定月份的周末天数（不包括节假日和调休工作日）。"""
+        return self._weekend_prefix[self._month_offsets[month]] - self._weekend_prefix[self._month_offsets[month - 1]]
+
+_work_calendars = {}
+
+def get_work_calendar(year: int) -> WorkCalendar:
+    """
+    获取指定年份的日期性质索引，每个年份只建立一次。
+
+    参数:
+        year (int): 年份。
+
+    返回值:
+        WorkCalendar: 该年份的日期性质索引。
+    """
+    year = int(year)
+    work_calendar = _work_calendars.get(year)
+    if work_calendar is None:
+        work_calendar = WorkCalendar.from_holiday_calendar(year, get_holiday_calendar(year))
+        _work_calendars[year] = work_calendar
+    return work_calendar
+
+# 打卡时间统一用当天零点起的秒数（整数）表示，原始 CARDTIME 只在读入时解析一次
+REMOTE_PUNCH_MARK = '(异地打卡)'
+
+class Punch:
+    """
+    一次打卡记录：当天零点起的秒数和是否为异地打卡。
+    """
+    __slots__ = ('seconds', 'remote')
+
+    def __init__(self, seconds: int, remote: bool = False):
+        self.seconds = seconds
+        self.remote = remote
+
+    def __repr__(self):
+        return f"Punch({seconds_to_time(self.seconds)}{REMOTE_PUNCH_MARK if self.remote else ''})"
+
+def time_to_seconds(time_str: str) -> int:
+    """
+    将 'HH:MM:SS' 或 'HH:MM' 格式的时间转换为当天零点起的秒数。
+
+    参数:
+        time_str (str): 时间字符串。
+
+    返回值:
+        int: 秒数。
+
+    异常:
+        ValueError: 如果时间格式不正确。
+    """
+    parts = time_str.split(':')
+    if not 2 <= len(parts) <= 3:
+        raise ValueError(f"时间格式不正确: {time_str}")
+    hour, minute = int(parts[0]), int(parts[1])
+    second = int(parts[2]) if len(parts) == 3 else 0
+    if not (0 <= hour < 24 and 0 <= minute < 60 and 0 <= second < 60):
+        raise ValueError(f"时间超出范围: {time_str}")
+    return hour * 3600 + minute * 60 + second
+
+def seconds_to_time(seconds: int) -> str:
+    """
+    将当天零点起的秒数转换为 'HH:MM:SS' 格式的时间。
+
+    参数:
+        seconds (int): 秒数。
+
+    返回值:
+        str: 时间字符串。
+    """
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+def parse_punch(card_time: str) -> Punch:
+    """
+    解析打卡记录中的 CARDTIME，例如 '2026-01-05 19:30:00' 或 '2026-01-05 19:30:00(异地打卡)'，异地打卡标记可以在任何位置。
+
+    参数:
+        card_time (str): 打卡时间，也可以只包含时间部分。
+
+    返回值:
+        Punch: 解析后的打卡记录。
+
+    异常:
+        ValueError: 如果时间格式不正确。
+    """
+    # 与原来过滤打卡记录时一致，标记出现在任何位置都算异地打卡
+    remote = REMOTE_PUNCH_MARK in card_time
+    if remote:
+        card_time = card_time.replace(REMOTE_PUNCH_MARK, '')
+    card_time = card_time.strip()
+    return Punch(time_to_seconds(card_time[11:] if len(card_time) > 10 and card_time[10] == ' ' else card_time), remote)
+
+# 打卡记录按 生成器 -> 归约 的流水线处理：逐条解析，只保留每天最早和最晚的有效打卡时间，不保存所有打卡
+def iter_valid_punches(records: Iterable[Dict]) -> Iterator[Tuple[str, str, int]]:
+    """
+    逐条解析打卡记录，跳过无效记录和异地打卡。
+
+    参数:
+        records (Iterable[Dict]): 打卡记录，可以是列表，也可以是 iter_json_array 之类的生成器。
+
+    返回值:
+        Iterator[Tuple[str, str, int]]: (员工 EMPID, 日期 SHIFTTERM, 打卡时间秒数)，没有 EMPID 的记录员工为空字符串。
+    """
+    for item in records:
+        # 验证数据完整性
+        if not isinstance(item, dict) or 'SHIFTTERM' not in item or 'CARDTIME' not in item:
+            print(f"跳过无效的打卡记录: {item}")
+            continue
+        try:
+            punch = parse_punch(item['CARDTIME'])
+        except ValueError as e:
+            print(f"跳过无效的打卡记录: {item}, {e}")
+            continue
+        # 过滤掉包含异地打卡的数据
+        if punch.remote:
+            continue
+        yield item.get('EMPID', ''), item['SHIFTTERM'], punch.seconds
+
+def reduce_daily_punches(records: Iterable[Dict]) -> Iterator[Tuple[str, str, int, int]]:
+    """
+    按 (员工, SHIFTTERM) 归约打卡记录，只记录最早和最晚的有效打卡时间，员工或日期变化时立即输出上一天。
+    接口和导出文件中的记录按日期分组，归约本身只占常数内存；乱序的记录会让同一天输出多次，由调用方合并。
+
+    参数:
+        records (Iterable[Dict]): 打卡记录。
+
+    返回值:
+        Iterator[Tuple[str, str, int, int]]: (员工, 日期, 最早打卡秒数, 最晚打卡秒数)。
+    """
+    current = None
+    first = last = 0
+    for employee, date, seconds in iter_valid_punches(records):
+        if current is None or current[0] != employee or current[1] != date:
+            if current is not None:
+                yield current[0], current[1], first, last
+            current = (employee, date)
+            first = last = seconds
+        elif seconds < first:
+            first = seconds
+        elif seconds > last:
+            last = seconds
+    if current is not None:
+        yield current[0], current[1], first, last
+
+def group_daily_punches(records: Iterable[Dict]) -> Dict[str, List[int]]:
+    """
+    统计一名员工每天最早和最晚的有效打卡时间，内存只与天数有关，与打卡次数无关。
+    结果只按日期区分，多名员工的记录会被合并到同一天，所以遇到第二个不同的 EMPID 时直接报错；
+    多员工的导出文件需要直接使用 reduce_daily_punches 按 (员工, 日期) 处理。
+
+    参数:
+        records (Iterable[Dict]): 一名员工的打卡记录。
+
+    返回值:
+        Dict[str, List[int]]: 键为日期（按第一次出现的顺序），值为 [最早打卡秒数, 最晚打卡秒数]。
+
+    异常:
+        ValueError: 如果记录中包含多名员工。
+    """
+    day_bounds = {}
+    employee = None
+    for current, date, first, last in reduce_daily_punches(records):
+        # 没有 EMPID 的记录（空字符串）不参与判断
+        if current and employee is None:
+            employee = current
+        elif current and current != employee:
+            raise ValueError(f"打卡记录中包含多名员工（{employee} 和 {current}），无法按日期合并")
+        bounds = day_bounds.get(date)
+        if bounds is None:
+            day_bounds[date] = [first, last]
+        else:
+            bounds[0] = min(bounds[0], first)
+            bounds[1] = max(bounds[1], last)
+    return day_bounds
+
+# 工作日上班时间和加班起算时间，预先转换为秒数
+WORK_START_SECONDS                      = 9 * 3600
+DEFAULT_WORKDAY_OVERTIME_START_SECONDS  = time_to_seconds(DEFAULT_WORKDAY_OVERTIME_START)
+ALT_WORKDAY_OVERTIME_START_SECONDS      = time_to_seconds(ALT_WORKDAY_OVERTIME_START)
+
+def get_day_type(date: str, holidays: Dict[str, int], workdays: Set[str]) -> str:
+    """
+    判断指定日期的性质。
+
+    参数:
+        date (str): 要判断的日期，格式为 'YYYY-MM-DD'。
+        holidays (Dict[str, int]): 节假日数据，键为日期，值为工资倍数。
         workdays (Set[str]): 工作日数据，包含日期的集合。
 
     返回值:
@@ -626,30 +1864,209 @@ def get_day_type(date: str, holidays: Dict[str, int], workdays: Set[str]) -> str
         return "周末"
     return "工作日"
 
-def parse_process_application_data(leave_data: List[Dict], user_cookie: str) -> Tuple[Dict[str, List[Tuple[str, str]]], Dict[str, List[Tuple[str, str]]], Dict[str, List[Tuple[str, str]]]]:
+# 请假和延时工时扣减时间段统一用分钟表示：公元元年 1 月 1 日（date.toordinal() 为 1）零点起的分钟数
+MINUTES_PER_DAY         = 24 * 60
+LEAVE_DAY_START_MINUTES = 9 * 60    # 跨天请假中间各天和最后一天从 09:00 开始
+LEAVE_DAY_END_MINUTES   = 18 * 60   # 跨天请假第一天和中间各天到 18:00 结束
+
+def date_ordinal(date: str) -> int:
+    """
+    将 'YYYY-MM-DD' 格式的日期转换为 date.toordinal() 的序号。
+
+    参数:
+        date (str): 日期。
+
+    返回值:
+        int: 日期序号。
+
+    异常:
+        ValueError: 如果日期格式不正确。
+    """
+    if len(date) != 10 or date[4] != '-' or date[7] != '-':
+        raise ValueError(f"日期格式不正确: {date}")
+    return dt_date(int(date[:4]), int(date[5:7]), int(date[8:10])).toordinal()
+
+def parse_minute_key(date_time: str) -> int:
+    """
+    将 'YYYY-MM-DD HH:MM' 或 'YYYY-MM-DDTHH:MM:SS' 格式的时间转换为分钟序号，秒数被舍去。
+
+    参数:
+        date_time (str): 日期和时间。
+
+    返回值:
+        int: 分钟序号。
+
+    异常:
+        ValueError: 如果时间格式不正确。
+    """
+    date_time = date_time.strip()
+    if len(date_time) < 16 or date_time[10] not in ' T':
+        raise ValueError(f"时间格式不正确: {date_time}")
+    return date_ordinal(date_time[:10]) * MINUTES_PER_DAY + time_to_seconds(date_time[11:]) // 60
+
+def leave_day_segments(start: int, end: int):
+    """
+    将一段请假时间拆成每天的时间段：第一天从开始时间到 18:00（不超过结束时间），
+    中间各天 09:00 到 18:00，最后一天从 09:00 到结束时间。
+
+    参数:
+        start (int): 开始时间的分钟序号。
+        end (int): 结束时间的分钟序号。
+
+    返回值:
+        Iterator[Tuple[int, int]]: 每天的 (开始, 结束) 分钟序号，空的时间段被跳过。
+    """
+    first_day, last_day = start // MINUTES_PER_DAY, end // MINUTES_PER_DAY
+    for day in range(first_day, last_day + 1):
+        base = day * MINUTES_PER_DAY
+        segment_start = start if day == first_day else base + LEAVE_DAY_START_MINUTES
+        segment_end = end if day == last_day and day != first_day else min(end, base + LEAVE_DAY_END_MINUTES)
+        if segment_end > segment_start:
+            yield segment_start, segment_end
+
+class IntervalIndex:
+    """
+    互不重叠的时间段集合，按开始时间排序，用两个平行列表保存分钟序号。
+    添加时合并重叠和相邻的时间段，撤销时切掉对应部分。定位用二分查找，为 O(log n)；
+    添加和撤销还要在列表中间插入或删除元素，为 O(n)。一个员工月只有几十段，列表比平衡树更快也更简单。
+    """
+    __slots__ = ('starts', 'ends')
+
+    def __init__(self, intervals=()):
+        """
+        参数:
+            intervals (Iterable[Tuple[int, int]]): 初始的 (开始, 结束) 分钟序号。
+        """
+        self.starts = []
+        self.ends = []
+        for start, end in intervals:
+            self.add(start, end)
+
+    def add(self, start: int, end: int):
+        """
+        添加时间段 [start, end)，与已有的重叠或相邻的时间段合并为一段。
+        同一分钟只会被覆盖一次：重叠的请假或扣减申请不会重复计算时长。
+        """
+        if end <= start:
+            return
+        # 结束时间不早于 start 且开始时间不晚于 end 的时间段都需要合并
+        i = bisect_left(self.ends, start)
+        j = bisect_right(self.starts, end)
+        if i < j:
+            start = min(start, self.starts[i])
+            end = max(end, self.ends[j - 1])
+        self.starts[i:j] = [start]
+        self.ends[i:j] = [end]
+
+    def remove(self, start: int, end: int):
+        """
+        从集合中去掉 [start, end) 覆盖的部分，部分重叠的时间段只保留没有被覆盖的部分。
+        """
+        if end <= start:
+            return
+        i = bisect_right(self.ends, start)
+        j = bisect_left(self.starts, end)
+        if i >= j:
+            return
+        starts, ends = [], []
+        if self.starts[i] < start:
+            starts.append(self.starts[i])
+            ends.append(start)
+        if self.ends[j - 1] > end:
+            starts.append(end)
+            ends.append(self.ends[j - 1])
+        self.starts[i:j] = starts
+        self.ends[i:j] = ends
+
+    def day_intervals(self, date: str) -> List[Tuple[int, int]]:
+        """
+        查询某一天被覆盖的时间段。
+
+        参数:
+            date (str): 日期，格式为 'YYYY-MM-DD'。
+
+        返回值:
+            List[Tuple[int, int]]: 当天的 (开始, 结束) 时间段，以当天零点起的分钟数表示，按开始时间排序。
+        """
+        day_start = date_ordinal(date) * MINUTES_PER_DAY
+        day_end = day_start + MINUTES_PER_DAY
+        intervals = []
+        index = bisect_right(self.ends, day_start)
+        while index < len(self.starts) and self.starts[index] < day_end:
+            intervals.append((max(self.starts[index], day_start) - day_start, min(self.ends[index], day_end) - day_start))
+            index += 1
+        return intervals
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        return zip(self.starts, self.ends)
+
+    def __repr__(self):
+        return f"IntervalIndex({list(self)})"
+
+@profiled('delay_deduction')
+def fetch_delay_deductions(auth_keys: List[str], user_cookie: str, max_workers: Optional[int] = None) -> Dict[str, List[Tuple[str, str]]]:
+    """
+    获取延时工时扣减表单。已缓存的表单直接读取，其余的并发请求后写入缓存。
+
+    参数:
+        auth_keys (List[str]): 延时工时扣减申请的 AUTHKEY 列表。
+        user_cookie (str): 用户的 Cookie 信息，用于身份验证。
+        max_workers (Optional[int]): 同时请求的数量上限，默认为 DELAY_DEDUCTION_WORKERS。
+
+    返回值:
+        Dict[str, List[Tuple[str, str]]]: 键为 AUTHKEY，值为 (CARDBEGINTIME, CARDENDTIME) 列表。
+    """
+    forms = get_cached_delay_deductions(auth_keys)
+    missing = [key for key in dict.fromkeys(auth_keys) if key not in forms]
+    if not missing:
+        return forms
+    if OFFLINE:
+        print(f"离线模式下有 {len(missing)} 个延时工时扣减表单没有缓存，按没有扣减计算")
+        return forms
+
+    def fetch(auth_key):
+        print(f"正在获取延时工时扣减数据: {auth_key}")
+        deduction_data = get_delay_deduction_data(auth_key, user_cookie)
+        return [(form['formData']['CARDBEGINTIME'], form['formData']['CARDENDTIME']) for form in deduction_data['formList']]
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers or DELAY_DEDUCTION_WORKERS)) as executor:
+        fetched = dict(zip(missing, executor.map(fetch, missing)))
+    save_delay_deductions_to_cache(fetched)
+    forms.update(fetched)
+    return forms
+
+@profiled('parse')
+def parse_process_application_data(leave_data: List[Dict], user_cookie: str, max_workers: Optional[int] = None) -> Tuple[IntervalIndex, IntervalIndex, IntervalIndex]:
     """
-    解析流程申请数据。
+    解析流程申请数据。跨天的请假按 leave_day_segments 拆成每天的时间段，销假申请在所有请假之后处理，
+    从年假和事假中去掉对应的时间，与申请的先后顺序无关。
 
     参数:
-        leave_data (List[Dict]): 包含年假、事假和延时工时扣减记录的列表，每个记录是一个字典。
+        leave_data (List[Dict]): 包含年假、事假、销假和延时工时扣减记录的列表，每个记录是一个字典。
         user_cookie (str): 用户的 Cookie 信息，用于身份验证。
+        max_workers (Optional[int]): 同时获取延时工时扣减表单的数量上限，默认为 DELAY_DEDUCTION_WORKERS。
 
     返回值:
-        Tuple[Dict[str, List[Tuple[str, str]]], Dict[str, List[Tuple[str, str]]], Dict[str, List[Tuple[str, str]]]]: 返回三个字典，分别存储年假、事假和延时工时扣减的信息。
-        - annual_leave (Dict[str, List[Tuple[str, str]]]): 年假数据，键为日期，值为时间段的列表（开始时间，结束时间）。
-        - personal_leave (Dict[str, List[Tuple[str, str]]]): 事假数据，键为日期，值为时间段的列表（开始时间，结束时间）。
-        - delay_deduction (Dict[str, List[Tuple[str, str]]]): 延时工时扣减数据，键为日期，值为时间段的列表（开始时间，结束时间）。
+        Tuple[IntervalIndex, IntervalIndex, IntervalIndex]: 年假、事假和延时工时扣减的时间段，用 day_intervals 按天查询。
     """
-    annual_leave = {}  # 存储年假的字典
-    personal_leave = {}  # 存储事假的字典
-    delay_deduction = {}  # 存储延时工时扣减的字典
+    annual_leave = IntervalIndex()      # 年假时间段
+    personal_leave = IntervalIndex()    # 事假时间段
+    delay_deduction = IntervalIndex()   # 延时工时扣减时间段，多张表单时间重叠时按并集扣减，不重复扣
+    cancellations = []                  # 销假时间段，所有请假添加完后再撤销
+
+    # 延时工时扣减表单需要逐个请求，先统一并发获取
+    auth_keys = [record['AUTHKEY'] for record in leave_data if len(record['ABSTRACTS'].split('|')) > 1 and record['ABSTRACTS'].split('|')[1] == '延时工时扣减申请']
+    deduction_forms = fetch_delay_deductions(auth_keys, user_cookie, max_workers) if auth_keys else {}
 
     for record in leave_data:
         abstracts = record['ABSTRACTS']  # 获取摘要信息
         parts = abstracts.split('|')
         leave_type = parts[1] if len(parts) > 1 else None
 
-        if leave_type in ['年假', '事假'] and len(parts) > 3:
+        if leave_type in ['年假', '事假', '销假申请'] and len(parts) > 3:
             try:
                 if ' - ' in parts[3]:
                     start_time, end_time = parts[3].split(' - ')
@@ -657,82 +2074,36 @@ def parse_process_application_data(leave_data: List[Dict], user_cookie: str) ->
                     start_time, end_time = parts[3].split(' 至 ')
                 else:
                     raise ValueError("Invalid time range format")
-
-                start_datetime = datetime.strptime(start_time, '%Y-%m-%d %H:%M')
-                end_datetime = datetime.strptime(end_time, '%Y-%m-%d %H:%M')
-
-                # 计算每一天的请假时间段
-                current_datetime = start_datetime
-                while current_datetime.date() <= end_datetime.date():
-                    date_str = current_datetime.strftime('%Y-%m-%d')
-                    if current_datetime.date() == start_datetime.date():
-                        # 第一天的请假时间段
-                        day_start_time = start_datetime
-                        day_end_time = min(end_datetime, datetime.combine(current_datetime.date(), dt_time(18, 0)))
-                    elif current_datetime.date() == end_datetime.date():
-                        # 最后一天的请假时间段
-                        day_start_time = datetime.combine(current_datetime.date(), dt_time(9, 0))
-                        day_end_time = end_datetime
-                    else:
-                        # 中间天的请假时间段
-                        day_start_time = datetime.combine(current_datetime.date(), dt_time(9, 0))
-                        day_end_time = datetime.combine(current_datetime.date(), dt_time(18, 0))
-
-                    # 根据请假类型将数据存储到相应的字典中
-                    if leave_type == '年假':
-                        if date_str not in annual_leave:
-                            annual_leave[date_str] = []
-                        annual_leave[date_str].append((day_start_time.strftime('%H:%M'), day_end_time.strftime('%H:%M')))
-                    elif leave_type == '事假':
-                        if date_str not in personal_leave:
-                            personal_leave[date_str] = []
-                        personal_leave[date_str].append((day_start_time.strftime('%H:%M'), day_end_time.strftime('%H:%M')))
-
-                    current_datetime += timedelta(days=1)
-            except ValueError as e:
-                print(f"Error parsing time range in record: {record}")
-                print(f"Exception: {e}")
-
-        elif leave_type == '销假申请':
-            try:
-                if ' - ' in parts[3]:
-                    start_time, end_time = parts[3].split(' - ')
-                elif ' 至 ' in parts[3]:
-                    start_time, end_time = parts[3].split(' 至 ')
+                segments = leave_day_segments(parse_minute_key(start_time), parse_minute_key(end_time))
+
+                # 根据请假类型将数据存储到相应的时间段集合中
+                if leave_type == '年假':
+                    for start, end in segments:
+                        annual_leave.add(start, end)
+                elif leave_type == '事假':
+                    for start, end in segments:
+                        personal_leave.add(start, end)
                 else:
-                    raise ValueError("Invalid time range format")
-
-                start_datetime = datetime.strptime(start_time, '%Y-%m-%d %H:%M')
-                end_datetime = datetime.strptime(end_time, '%Y-%m-%d %H:%M')
-
-                # 计算每一天的销假时间段
-                current_datetime = start_datetime
-                while current_datetime.date() <= end_datetime.date():
-                    date_str = current_datetime.strftime('%Y-%m-%d')
-                    if leave_type == '年假' and date_str in annual_leave:
-                        annual_leave[date_str] = [(s, e) for s, e in annual_leave[date_str] if not (s == start_datetime.strftime('%H:%M') and e == end_datetime.strftime('%H:%M'))]
-                    elif leave_type == '事假' and date_str in personal_leave:
-                        personal_leave[date_str] = [(s, e) for s, e in personal_leave[date_str] if not (s == start_datetime.strftime('%H:%M') and e == end_datetime.strftime('%H:%M'))]
-
-                    current_datetime += timedelta(days=1)
+                    cancellations.extend(segments)
             except ValueError as e:
                 print(f"Error parsing time range in record: {record}")
                 print(f"Exception: {e}")
 
         elif leave_type == '延时工时扣减申请':
-            auth_key = record['AUTHKEY']
-            print(f"正在获取延时工时扣减数据: {auth_key}")
-            deduction_data = get_delay_deduction_data(auth_key, user_cookie)
-            for form in deduction_data['formList']:
-                begin_time = form['formData']['CARDBEGINTIME']
-                end_time = form['formData']['CARDENDTIME']
-                start_date = begin_time.split('T')[0]  # 提取开始日期
-                if start_date not in delay_deduction:
-                    delay_deduction[start_date] = []
-                delay_deduction[start_date].append((begin_time.split('T')[1], end_time.split('T')[1]))
-
-    return annual_leave, personal_leave, delay_deduction  # 返回年假、事假和延时工时扣减的字典
+            for begin_time, end_time in deduction_forms[record['AUTHKEY']]:
+                try:
+                    delay_deduction.add(parse_minute_key(begin_time), parse_minute_key(end_time))
+                except ValueError as e:
+                    print(f"延时扣减时间格式错误: {e}")
+
+    # 销假申请没有写明撤销的是哪种假，年假和事假中对应的时间都去掉
+    for start, end in cancellations:
+        annual_leave.remove(start, end)
+        personal_leave.remove(start, end)
+
+    return annual_leave, personal_leave, delay_deduction  # 返回年假、事假和延时工时扣减的时间段
 
+@profiled('parse')
 def parse_attendance_data(attendance_json: str) -> Tuple[Dict[str, List[int]], int, int, Dict[str, str]]:
     """
     解析个人考勤信息的JSON数据，提取每日的迟到分钟数、当月累计的迟到次数和当月累计的迟到分钟数。
@@ -794,19 +2165,8 @@ def count_weekends(year: int, month: int, holidays: list, workdays: set) -> int:
     返回值:
         int: 指定月份中的周末天数（不包括节假日和工作日）。
     """
-    first_day = datetime(year, month, 1)
-    if month == 12:
-        last_day = datetime(year + 1, 1, 1) - timedelta(days=1)
-    else:
-        last_day = datetime(year, month + 1, 1) - timedelta(days=1)
-    weekends = 0
-    current_day = first_day
-    while current_day <= last_day:
-        cur = str(current_day.year) + '-' + str(current_day.month).zfill(2) + '-' + str(current_day.day).zfill(2)
-        if current_day.weekday() in (5, 6) and cur not in holidays and cur not in workdays:
-            weekends += 1
-        current_day += timedelta(days=1)
-    return weekends
+    holidays = holidays if isinstance(holidays, dict) else dict.fromkeys(holidays, 3)
+    return WorkCalendar(year, holidays, workdays).weekends_in_month(month)
 
 def pay_rate_cal(day_type: str) -> str:
     """
@@ -821,13 +2181,13 @@ def pay_rate_cal(day_type: str) -> str:
     # 工作日加班费20块/小时,周末30,节假日60
     return 20 if day_type == "工作日" else 30 if day_type == "周末" or day_type == "节假日(周末)" else 60 if day_type == "节假日" else 0
 
-def overtime_cal(first_check_time: str, last_check_time: str, day_type: str, shift_name: Optional[str] = None) -> float:
+def overtime_cal(first_check_time, last_check_time, day_type: str, shift_name: Optional[str] = None) -> float:
     """
     计算加班时长。
 
     参数:
-        first_check_time (str): 第一次打卡时间，格式为 'HH:MM:SS'。
-        last_check_time (str): 最后一次打卡时间，格式为 'HH:MM:SS'。
+        first_check_time (int 或 str): 第一次打卡时间，当天零点起的秒数，或格式为 'HH:MM:SS' 的字符串。
+        last_check_time (int 或 str): 最后一次打卡时间，当天零点起的秒数，或格式为 'HH:MM:SS' 的字符串。
         day_type (str): 日期类型，可以是 "工作日", "周末", "节假日(周末)" 或 "节假日"。
         shift_name (Optional[str]): 当天班次名称（SHIFT）。
 
@@ -835,29 +2195,25 @@ def overtime_cal(first_check_time: str, last_check_time: str, day_type: str, shi
         float: 加班时长（小时）。
     """
     try:
-        # 只要异地打卡就不算加班,即使是节假日
-        if last_check_time.endswith('(异地打卡)'):
-            return 0.0
-            
-        # 清理时间字符串，移除可能的异地打卡标记
-        clean_first_time = first_check_time.replace('(异地打卡)', '').strip()
-        clean_last_time = last_check_time.replace('(异地打卡)', '').strip()
-        
+        if isinstance(last_check_time, str):
+            # 只要异地打卡就不算加班,即使是节假日
+            if last_check_time.endswith(REMOTE_PUNCH_MARK):
+                return 0.0
+            # 清理时间字符串，移除可能的异地打卡标记
+            last_check_time = time_to_seconds(last_check_time.replace(REMOTE_PUNCH_MARK, '').strip())
+
         if day_type == '工作日':
-            last_dt = datetime.strptime(clean_last_time, '%H:%M:%S')
-            workday_overtime_start = DEFAULT_WORKDAY_OVERTIME_START
+            workday_overtime_start = DEFAULT_WORKDAY_OVERTIME_START_SECONDS
             if shift_name and shift_name != DEFAULT_SHIFT_NAME:
                 # 非“深圳佛山桂林”班次：下午13:00-17:30，18:30开始算加班
-                workday_overtime_start = ALT_WORKDAY_OVERTIME_START
-            end_work_dt = datetime.strptime(workday_overtime_start, '%H:%M:%S')
-            ret = (last_dt - end_work_dt).total_seconds()
-            return ret / 3600 if ret > 0 else 0.0
+                workday_overtime_start = ALT_WORKDAY_OVERTIME_START_SECONDS
+            ret = last_check_time - workday_overtime_start
         else:
-            first_dt = datetime.strptime(clean_first_time, '%H:%M:%S')
-            last_dt = datetime.strptime(clean_last_time, '%H:%M:%S')
-            ret = (last_dt - first_dt).total_seconds()
-            return ret / 3600 if ret > 0 else 0.0
-    except (ValueError, AttributeError) as e:
+            if isinstance(first_check_time, str):
+                first_check_time = time_to_seconds(first_check_time.replace(REMOTE_PUNCH_MARK, '').strip())
+            ret = last_check_time - first_check_time
+        return ret / 3600 if ret > 0 else 0.0
+    except (ValueError, AttributeError, TypeError) as e:
         print(f"计算加班时长时出错: {e}, 时间: {first_check_time} - {last_check_time}")
         return 0.0
 
@@ -935,7 +2291,7 @@ def late_time_cal(first_check_time, day_type, late_minutes=None):
     计算迟到时间。
 
     参数:
-        first_check_time (str 或 dt_time): 第一次打卡时间。
+        first_check_time (int, str 或 dt_time): 第一次打卡时间，当天零点起的秒数、'HH:MM:SS' 字符串或 dt_time 对象。
         day_type (str): 日期类型，可以是 "工作日", "周末", "节假日(周末)" 或 "节假日"。
         late_minutes (Optional[int]): 迟到分钟数。如果未提供，则根据 first_check_time 计算。
 
@@ -943,40 +2299,431 @@ def late_time_cal(first_check_time, day_type, late_minutes=None):
         float: 迟到时间（分钟）。
     """
     try:
-        # 如果是 dt_time 对象，转换为字符串
         if isinstance(first_check_time, dt_time):
-            first_check_time_str = first_check_time.strftime('%H:%M:%S')
-        else:
-            first_check_time_str = str(first_check_time)
-
-        # 只要异地打卡就不算迟到
-        if first_check_time_str.endswith('(异地打卡)') or day_type != '工作日':
+            first_check_time = first_check_time.hour * 3600 + first_check_time.minute * 60 + first_check_time.second
+        elif not isinstance(first_check_time, int):
+            first_check_time = str(first_check_time)
+            # 只要异地打卡就不算迟到
+            if first_check_time.endswith(REMOTE_PUNCH_MARK):
+                return 0.0
+
+        if day_type != '工作日':
             return 0.0
 
         if late_minutes is None:
-            # 清理时间字符串
-            clean_time = first_check_time_str.replace('(异地打卡)', '').strip()
-            first_dt = datetime.strptime(clean_time, '%H:%M:%S')
-            work_start_dt = datetime.strptime('09:00:00', '%H:%M:%S')
-            ret = (first_dt - work_start_dt).total_seconds() / 60
+            if isinstance(first_check_time, str):
+                # 清理时间字符串
+                first_check_time = time_to_seconds(first_check_time.replace(REMOTE_PUNCH_MARK, '').strip())
+            ret = (first_check_time - WORK_START_SECONDS) / 60
         else:
-            ret = float(late_minutes) if late_minutes is not None else 0.0
+            ret = float(late_minutes)
 
         return ret if ret > 0 else 0.0
     except (ValueError, AttributeError, TypeError) as e:
         print(f"计算迟到时间时出错: {e}, 打卡时间: {first_check_time}")
         return 0.0
 
-def summarize(result: list, workdays: set, holidays: list, total_late_count: int, total_late_minutes: int) -> list:
+# 按日期性质编码排列的加班费率，与 pay_rate_cal 一致
+DAY_TYPE_RATES = (20, 30, 30, 60)
+
+# 批量计算时数组长度达到该值才使用 NumPy，数据量小时纯 Python 循环更快
+NUMPY_MIN_BATCH = 256
+
+_numpy = None
+
+def _load_numpy():
+    """
+    按需导入 NumPy，未安装时返回 None，批量计算退回纯 Python 实现。
+    """
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy or None
+
+def shift_code(shift_name: Optional[str]) -> int:
+    """
+    班次编码：默认班次（或未知班次）为 0，其他班次为 1，与 overtime_cal 中的判断一致。
+    """
+    return 1 if shift_name and shift_name != DEFAULT_SHIFT_NAME else 0
+
+def batch_day_kernel(first_seconds, last_seconds, day_type_codes, shift_codes, late_minutes=None, deduction_hours=None) -> tuple:
+    """
+    批量计算任意数量员工日的加班时长、加班薪资、餐补、总收入和迟到分钟数，
+    结果与逐日调用 overtime_cal、overtime_pay_cal、allowance_cal、income_cal 和 late_time_cal 完全一致。
+    安装了 NumPy 且数据量较大时整列计算，否则使用纯 Python 循环。
+
+    参数:
+        first_seconds (Sequence[int]): 每天最早打卡时间，当天零点起的秒数。
+        last_seconds (Sequence[int]): 每天最晚打卡时间，当天零点起的秒数。
+        day_type_codes (Sequence[int]): 日期性质编码，取值见 DAY_TYPE_*。
+        shift_codes (Sequence[int]): 班次编码，见 shift_code。
+        late_minutes (Optional[Sequence[float]]): 每天的迟到分钟数，未提供时根据最早打卡时间计算。
+        deduction_hours (Optional[Sequence[float]]): 每天的延时工时扣减时长（小时），从加班时长中扣除。
+
+    返回值:
+        tuple: (加班时长, 加班薪资, 餐补, 总收入, 迟到分钟数) 五列，每列长度与输入相同。
+    """
+    np = _load_numpy() if len(first_seconds) >= NUMPY_MIN_BATCH else None
+    if np is not None:
+        first = np.asarray(first_seconds, dtype=np.int64)
+        last = np.asarray(last_seconds, dtype=np.int64)
+        codes = np.asarray(day_type_codes, dtype=np.int8)
+        workday = codes == DAY_TYPE_WORKDAY
+        overtime_start = np.where(np.asarray(shift_codes) != 0, ALT_WORKDAY_OVERTIME_START_SECONDS, DEFAULT_WORKDAY_OVERTIME_START_SECONDS)
+        ret = np.where(workday, last - overtime_start, last - first)
+        overtime = np.where(ret > 0, ret / 3600, 0.0)
+        if deduction_hours is not None:
+            overtime = np.maximum(0.0, overtime - np.asarray(deduction_hours, dtype=np.float64))
+        overtime_pay = overtime * np.asarray(DAY_TYPE_RATES, dtype=np.int64)[codes]
+        allowance = np.where(overtime >= np.where(workday, 1.0, 4.0), 20.0, 0.0)
+        total_income = overtime_pay + allowance
+        if late_minutes is None:
+            late = (first - WORK_START_SECONDS) / 60
+        else:
+            late = np.asarray(late_minutes, dtype=np.float64)
+        late = np.where(workday & (late > 0), late, 0.0)
+        return overtime, overtime_pay, allowance, total_income, late
+
+    size = len(first_seconds)
+    overtime = array('d', bytes(8 * size))
+    overtime_pay = array('d', bytes(8 * size))
+    allowance = array('d', bytes(8 * size))
+    total_income = array('d', bytes(8 * size))
+    late = array('d', bytes(8 * size))
+    for index in range(size):
+        workday = day_type_codes[index] == DAY_TYPE_WORKDAY
+        if workday:
+            ret = last_seconds[index] - (ALT_WORKDAY_OVERTIME_START_SECONDS if shift_codes[index] else DEFAULT_WORKDAY_OVERTIME_START_SECONDS)
+        else:
+            ret = last_seconds[index] - first_seconds[index]
+        hours = ret / 3600 if ret > 0 else 0.0
+        if deduction_hours is not None:
+            hours = max(0.0, hours - deduction_hours[index])
+        pay = hours * DAY_TYPE_RATES[day_type_codes[index]]
+        meal = 20.0 if hours >= (1.0 if workday else 4.0) else 0.0
+        overtime[index] = hours
+        overtime_pay[index] = pay
+        allowance[index] = meal
+        total_income[index] = pay + meal
+        if workday:
+            minutes = (first_seconds[index] - WORK_START_SECONDS) / 60 if late_minutes is None else float(late_minutes[index])
+            late[index] = minutes if minutes > 0 else 0.0
+    return overtime, overtime_pay, allowance, total_income, late
+
+# 每日结果报表的列名，与 DailyResult.as_row 的顺序一致
+DAILY_RESULT_HEADERS = ["日期", "最早打卡时间", "最晚打卡时间", "本日性质", "加班时薪", "加班时长", "加班薪资", "延时餐补", "总收入", "迟到分钟数", "延时工时扣减时间", "年假时间", "事假时间"]
+
+class DailyResult:
+    """
+    一天的统计结果。数值字段在计算时确定类型，汇总和写报表时直接使用，不需要再转换；
+    打卡时间按秒数保存，只在输出时格式化。
+    """
+    __slots__ = ('date', 'first_check_seconds', 'last_check_seconds', 'day_type_code', 'rate', 'overtime',
+                 'overtime_pay', 'allowance', 'income', 'late_minutes', 'delay_deduction', 'annual_leave', 'personal_leave')
+
+    def __init__(self, date: str, first_check_seconds: int, last_check_seconds: int, day_type_code: int, rate: int,
+                 overtime: float, overtime_pay: float, allowance: float, income: float, late_minutes: float,
+                 delay_deduction: float = 0.0, annual_leave: float = 0.0, personal_leave: float = 0.0):
+        self.date = date
+        self.first_check_seconds = first_check_seconds
+        self.last_check_seconds = last_check_seconds
+        self.day_type_code = day_type_code
+        self.rate = rate
+        self.overtime = overtime
+        self.overtime_pay = overtime_pay
+        self.allowance = allowance
+        self.income = income
+        self.late_minutes = late_minutes
+        self.delay_deduction = delay_deduction
+        self.annual_leave = annual_leave
+        self.personal_leave = personal_leave
+
+    @property
+    def day_type(self) -> str:
+        return DAY_TYPE_NAMES[self.day_type_code]
+
+    def as_row(self) -> list:
+        """
+        转换为报表中的一行，顺序与 DAILY_RESULT_HEADERS 一致。
+
+        返回值:
+            list: 报表行。
+        """
+        return [self.date, seconds_to_time(self.first_check_seconds), seconds_to_time(self.last_check_seconds),
+                DAY_TYPE_NAMES[self.day_type_code], self.rate, self.overtime, self.overtime_pay, self.allowance,
+                self.income, self.late_minutes, self.delay_deduction, self.annual_leave, self.personal_leave]
+
+    @classmethod
+    def from_row(cls, row: list) -> 'DailyResult':
+        """
+        从 as_row 的输出（例如缓存文件中的一行）还原。
+
+        参数:
+            row (list): 报表行。
+
+        返回值:
+            DailyResult: 每日结果。
+
+        异常:
+            ValueError: 如果报表行格式不正确。
+        """
+        if len(row) != len(DAILY_RESULT_HEADERS):
+            raise ValueError(f"每日结果的列数不正确: {row}")
+        return cls(row[0], time_to_seconds(row[1]), time_to_seconds(row[2]), DAY_TYPE_NAMES.index(row[3]), *row[4:])
+
+    def __eq__(self, other):
+        if not isinstance(other, DailyResult):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return f"DailyResult({self.date}, {self.day_type}, 加班 {self.overtime} 小时)"
+
+# 汇总和分组汇总
+# 按月份汇总时输出的指标，与 SummaryAccumulator.rollup_values 的顺序一致
+ROLLUP_HEADERS = ["工作日加班时长", "周末加班时长", "节假日加班时长", "总加班时长", "加班薪资", "延时餐补", "总收入", "迟到分钟数", "事假时间"]
+SUMMARY_GROUP_KEYS = ('employee', 'department', 'month', 'day_type')
+
+class SummaryAccumulator:
+    """
+    汇总指标的累加器。每条 DailyResult 只需要 add 一次，所有汇总指标（包括事假抵扣所需的分类时长）
+    都在同一次遍历中累加；多个累加器可以 merge，部门、月份等更大范围的汇总都通过 group_summaries 完成。
+    """
+    __slots__ = ('days', 'hours', 'pay', 'workdays', 'overtime_pay', 'allowance', 'income',
+                 'late_minutes', 'personal_leave', 'first_date', 'latest_date')
+
+    def __init__(self):
+        self.days = 0
+        self.hours = [0.0] * len(DAY_TYPE_NAMES)    # 按日期性质编码累加的加班时长
+        self.pay = [0.0] * len(DAY_TYPE_NAMES)      # 按日期性质编码累加的加班薪资
+        self.workdays = 0.0
+        self.overtime_pay = 0.0
+        self.allowance = 0.0
+        self.income = 0.0
+        self.late_minutes = 0.0
+        self.personal_leave = 0.0
+        self.first_date = None
+        self.latest_date = None
+
+    def add(self, row: 'DailyResult'):
+        """
+        累加一天的结果。
+
+        参数:
+            row (DailyResult): 每日结果。
+        """
+        code = row.day_type_code
+        self.days += 1
+        if self.first_date is None:
+            self.first_date = row.date
+        if self.latest_date is None or row.date > self.latest_date:
+            self.latest_date = row.date
+        self.hours[code] += row.overtime
+        self.pay[code] += row.overtime_pay
+        if code == DAY_TYPE_WORKDAY:
+            self.workdays += 1
+        self.overtime_pay += row.overtime_pay
+        self.allowance += row.allowance
+        self.income += row.income
+        self.late_minutes += row.late_minutes
+        self.personal_leave += row.personal_leave
+
+    def merge(self, other: 'SummaryAccumulator'):
+        """
+        合并另一个累加器的结果。
+
+        参数:
+            other (SummaryAccumulator): 另一个累加器。
+        """
+        self.days += other.days
+        for code in range(len(DAY_TYPE_NAMES)):
+            self.hours[code] += other.hours[code]
+            self.pay[code] += other.pay[code]
+        self.workdays += other.workdays
+        self.overtime_pay += other.overtime_pay
+        self.allowance += other.allowance
+        self.income += other.income
+        self.late_minutes += other.late_minutes
+        self.personal_leave += other.personal_leave
+        if other.first_date is not None and (self.first_date is None or other.first_date < self.first_date):
+            self.first_date = other.first_date
+        if other.latest_date is not None and (self.latest_date is None or other.latest_date > self.latest_date):
+            self.latest_date = other.latest_date
+
+    def total_hours(self) -> float:
+        """
+        总加班时长：工作日、周末和节假日加班时长之和，与个人汇总表中的“总加班时长”一致，不含节假日(周末)。
+
+        返回值:
+            float: 总加班时长（小时）。
+        """
+        return self.hours[DAY_TYPE_WORKDAY] + self.hours[DAY_TYPE_WEEKEND] + self.hours[DAY_TYPE_HOLIDAY]
+
+    def offset_hours(self) -> Tuple[float, float, float]:
+        """
+        用加班时长抵扣事假，优先抵扣工作日加班，其次周末，最后节假日。
+
+        返回值:
+            Tuple[float, float, float]: 抵扣后的工作日、周末和节假日加班时长。
+        """
+        remain = self.personal_leave
+        actual = []
+        for code in (DAY_TYPE_WORKDAY, DAY_TYPE_WEEKEND, DAY_TYPE_HOLIDAY):
+            hours = self.hours[code] - remain
+            if hours < 0:
+                hours = 0
+                remain -= self.hours[code]
+            else:
+                remain = 0
+            actual.append(hours)
+        return tuple(actual)
+
+    def rollup_values(self) -> list:
+        """
+        返回月份、部门等汇总表中的一行指标，顺序与 ROLLUP_HEADERS 一致。
+
+        返回值:
+            list: 汇总指标。
+        """
+        return [self.hours[DAY_TYPE_WORKDAY], self.hours[DAY_TYPE_WEEKEND], self.hours[DAY_TYPE_HOLIDAY], self.total_hours(),
+                self.overtime_pay, self.allowance, self.income, self.late_minutes, self.personal_leave]
+
+    def table(self, work_calendar: WorkCalendar, total_late_count: int, total_late_minutes: int) -> list:
+        """
+        生成一个员工一个月的汇总表格。
+
+        参数:
+            work_calendar (WorkCalendar): 结果所在年份的日期性质索引。
+            total_late_count (int): 当月累计的迟到次数。
+            total_late_minutes (int): 当月累计的迟到分钟数。
+
+        返回值:
+            list: 汇总表格，每行为 [汇总项目, 信息]。
+        """
+        month = int(self.first_date.split('-')[1])
+        required_workdays = work_calendar.required_workdays(month)
+        total_workday_hours = self.hours[DAY_TYPE_WORKDAY]
+        total_weekend_hours = self.hours[DAY_TYPE_WEEKEND]
+        total_holiday_hours = self.hours[DAY_TYPE_HOLIDAY]
+        actual_workday_hours, actual_weekend_hours, actual_holiday_hours = self.offset_hours()
+
+        actual_workday_overtime_pay = actual_workday_hours * 20
+        actual_weekend_overtime_pay = actual_weekend_hours * 30
+        actual_holiday_overtime_pay = actual_holiday_hours * 60
+        actual_overtime_pay = actual_workday_overtime_pay + actual_weekend_overtime_pay + actual_holiday_overtime_pay
+        actual_total_income = actual_overtime_pay + self.allowance
+
+        # 获取昨天的日期
+        yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
+
+        # 选择最晚打卡日期或昨天的日期
+        cutoff_date = self.latest_date if self.latest_date < yesterday else yesterday
+
+        return [
+            ["总加班薪资", f"{self.overtime_pay:.2f} 元"],
+            ["实际加班薪资", f"{actual_overtime_pay:.2f} 元"],
+            ["总餐补", f"{self.allowance:.2f} 元"],
+            ["总工作日加班收入", f"{self.pay[DAY_TYPE_WORKDAY]:.2f} 元"],
+            ["总周末加班收入", f"{self.pay[DAY_TYPE_WEEKEND]:.2f} 元"],
+            ["总节假日加班收入", f"{self.pay[DAY_TYPE_HOLIDAY]:.2f} 元"],
+            ["总收入", f"{self.income:.2f} 元"],
+            ["扣减后预计工作日加班收入", f"{actual_workday_overtime_pay:.2f} 元"],
+            ["扣减后预计周末加班收入", f"{actual_weekend_overtime_pay:.2f} 元"],
+            ["扣减后预计节假日加班收入", f"{actual_holiday_overtime_pay:.2f} 元"],
+            ["扣减后预计总加班收入", f"{actual_overtime_pay:.2f} 元"],
+            ["扣减后预计总收入", f"{actual_total_income:.2f} 元"],
+            ["总工作日加班时长", f"{total_workday_hours:.2f} 小时"],
+            ["总周末加班时长", f"{total_weekend_hours:.2f} 小时"],
+            ["总节假日加班时长", f"{total_holiday_hours:.2f} 小时"],
+            ["总加班时长", f"{self.total_hours():.2f} 小时"],
+            ["扣减后预计工作日加班时长", f"{actual_workday_hours:.2f} 小时"],
+            ["扣减后预计周末加班时长", f"{actual_weekend_hours:.2f} 小时"],
+            ["扣减后预计节假日加班时长", f"{actual_holiday_hours:.2f} 小时"],
+            ["扣减后预计总加班时长", f"{actual_workday_hours + actual_weekend_hours + actual_holiday_hours:.2f} 小时"],
+            [f"截止到{cutoff_date}的总迟到次数", f"{total_late_count} 次"],
+            [f"截止到{cutoff_date}的总迟到分钟数", f"{total_late_minutes} 分钟"],
+            ["应出勤天数", f"{required_workdays} 天"],
+            ["实际出勤天数", f"{self.workdays} 天"]
+        ]
+
+def group_summaries(records, keys: Tuple[str, ...]) -> Dict[tuple, SummaryAccumulator]:
+    """
+    按分组键一次遍历汇总每日结果或已有的汇总结果。已有的汇总结果直接 merge，不再遍历其中的每日结果，
+    例如部门汇总合并每个员工的汇总、区间合计合并每个月的汇总。
+
+    参数:
+        records (Iterable[Tuple[Dict[str, str], DailyResult 或 SummaryAccumulator]]): (上下文, 每日结果或汇总结果)，
+            上下文中可以包含 employee、department 和 month，month 不存在时取日期的年月，day_type 取每日结果的日期性质。
+        keys (Tuple[str, ...]): 分组键，取值见 SUMMARY_GROUP_KEYS，为空时所有结果汇总为一组。
+
+    返回值:
+        Dict[tuple, SummaryAccumulator]: 键为各分组键取值组成的元组，按首次出现的顺序排列。
+
+    异常:
+        ValueError: 如果分组键不受支持，或按 day_type 或缺少 month 上下文的汇总结果分组。
+    """
+    unknown = set(keys) - set(SUMMARY_GROUP_KEYS)
+    if unknown:
+        raise ValueError(f"不支持的分组键: {', '.join(sorted(unknown))}")
+    groups = {}
+    for context, item in records:
+        is_summary = isinstance(item, SummaryAccumulator)
+        key = []
+        for name in keys:
+            if name == 'day_type':
+                if is_summary:
+                    raise ValueError("汇总结果已经合并了各种日期性质，不能按 day_type 分组")
+                key.append(item.day_type)
+            elif name == 'month':
+                month = context.get('month')
+                if not month:
+                    if is_summary:
+                        raise ValueError("汇总结果按 month 分组时需要在上下文中给出 month")
+                    month = item.date[:7]
+                key.append(month)
+            else:
+                key.append(context.get(name, ''))
+        key = tuple(key)
+        summary = groups.get(key)
+        if summary is None:
+            summary = groups[key] = SummaryAccumulator()
+        if is_summary:
+            summary.merge(item)
+        else:
+            summary.add(item)
+    return groups
+
+def summarize_results(result: list) -> SummaryAccumulator:
+    """
+    一次遍历汇总一个员工一个月的每日结果。
+
+    参数:
+        result (list): 每日统计结果（DailyResult 列表）。
+
+    返回值:
+        SummaryAccumulator: 汇总结果。
+    """
+    summary = SummaryAccumulator()
+    for row in result:
+        summary.add(row)
+    return summary
+
+@profiled('summarize')
+def summarize(result: list, work_calendar: WorkCalendar, total_late_count: int, total_late_minutes: int, verbose: bool = True, summary: Optional[SummaryAccumulator] = None) -> list:
     """
     汇总统计结果。
 
     参数:
-        result (list): 打卡记录的统计结果。
-        workdays (set): 工作日集合。
-        holidays (list): 节假日列表。
+        result (list): 每日统计结果（DailyResult 列表）。
+        work_calendar (WorkCalendar): 结果所在年份的日期性质索引。
         total_late_count (int): 当月累计的迟到次数。
         total_late_minutes (int): 当月累计的迟到分钟数。
+        verbose (bool): 是否在终端打印汇总表格，批量模式下关闭。
+        summary (Optional[SummaryAccumulator]): 已经累加好的汇总结果，传入时不再遍历 result。
 
     返回值:
         list: 汇总统计结果。
@@ -984,153 +2731,85 @@ def summarize(result: list, workdays: set, holidays: list, total_late_count: int
     if not result:
         print("没有打卡记录可以汇总")
         return []
-        
+
     # 确保参数不为None
     total_late_count = total_late_count if total_late_count is not None else 0
     total_late_minutes = total_late_minutes if total_late_minutes is not None else 0
-    
-    day_of_month = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
-    year = int(result[0][0].split('-')[0])
-    month = int(result[0][0].split('-')[1])
-    total_overtime_pay = 0.0
-    total_meal_allowance = 0.0
-    total_workday_overtime_pay = 0.0
-    total_weekend_overtime_pay = 0.0
-    total_holiday_overtime_pay = 0.0
-    total_income = 0.0
-    total_workday_hours = 0.0
-    total_weekend_hours = 0.0
-    total_holiday_hours = 0.0
-    required_workdays = day_of_month[month - 1] - len(holidays) - count_weekends(year, month, holidays, workdays)
-    actual_workdays = 0.0
-    total_personal_leave_hours = 0.0
-
-    # 先计算事假的小时数
-    for i in result:
-        try:
-            total_personal_leave_hours += float(i[12]) if len(i) > 12 and i[12] else 0.0
-        except (ValueError, IndexError) as e:
-            print(f"处理事假时间时出错: {e}")
-    
-    personal_leave_remain_hours = total_personal_leave_hours
-    for i in result:
-        try:
-            overtime_pay = float(i[6]) if i[6] else 0.0
-            meal_allowance = float(i[7]) if i[7] else 0.0
-            overtime_hours = float(i[5]) if i[5] else 0.0
-            total_income_val = float(i[8]) if i[8] else 0.0
-            
-            total_overtime_pay += overtime_pay
-            total_meal_allowance += meal_allowance
-            total_workday_overtime_pay += overtime_pay if i[3] == '工作日' else 0.0
-            total_weekend_overtime_pay += overtime_pay if i[3] == '周末' else 0.0
-            total_holiday_overtime_pay += overtime_pay if i[3] == '节假日' else 0.0
-            total_income += total_income_val
-            total_workday_hours += overtime_hours if i[3] == '工作日' else 0.0
-            total_weekend_hours += overtime_hours if i[3] == '周末' else 0.0
-            total_holiday_hours += overtime_hours if i[3] == '节假日' else 0.0
-            actual_workdays += 1 if i[3] == '工作日' else 0
-        except (ValueError, IndexError, TypeError) as e:
-            print(f"处理记录时出错: {e}, 记录: {i}")
-            continue
-        
-    # 计算实际扣减后的加班费
-    # 事假可以用加班抵扣，优先抵扣工作日加班
-    actual_workday_hours = total_workday_hours - personal_leave_remain_hours
-    if actual_workday_hours < 0:
-        actual_workday_hours = 0
-        personal_leave_remain_hours -= total_workday_hours
-    else:
-        personal_leave_remain_hours = 0
-    actual_weekend_hours = total_weekend_hours - personal_leave_remain_hours
-    if actual_weekend_hours < 0:
-        actual_weekend_hours = 0
-        personal_leave_remain_hours -= total_weekend_hours
-    else:
-        personal_leave_remain_hours = 0
-    actual_holiday_hours = total_holiday_hours - personal_leave_remain_hours
-    if actual_holiday_hours < 0:
-        actual_holiday_hours = 0
-        personal_leave_remain_hours -= total_holiday_hours
-    else:
-        personal_leave_remain_hours = 0
-
-    # 处理迟到时间的扣减
-    late_minutes_remain = total_late_minutes if total_late_minutes is not None else 0
-    if late_minutes_remain > 0:
-        for i in result:
-            if late_minutes_remain <= 0:
-                break
-            try:
-                # 获取当天的迟到分钟数（result中的第9个元素）
-                daily_late = float(i[9]) if i[9] else 0.0
-                if daily_late > 0:
-                    if i[3] == '工作日':
-                        if 1 <= daily_late <= 30:
-                            late_minutes_remain -= 60 + daily_late
-                        elif 31 <= daily_late <= 60:
-                            late_minutes_remain -= 120 + daily_late
-                        elif daily_late > 60:
-                            late_minutes_remain -= 480
-                    elif i[3] in ['周末', '节假日']:
-                        if 1 <= daily_late <= 30:
-                            late_minutes_remain -= 60 + daily_late
-                        elif 31 <= daily_late <= 60:
-                            late_minutes_remain -= 120 + daily_late
-                        elif daily_late > 60:
-                            late_minutes_remain -= 480
-            except (ValueError, IndexError, TypeError) as e:
-                print(f"处理迟到扣减时出错: {e}")
-                continue
 
-    actual_workday_overtime_pay = actual_workday_hours * 20
-    actual_weekend_overtime_pay = actual_weekend_hours * 30
-    actual_holiday_overtime_pay = actual_holiday_hours * 60
-    actual_overtime_pay = actual_workday_overtime_pay + actual_weekend_overtime_pay + actual_holiday_overtime_pay
-    actual_total_income = actual_overtime_pay + total_meal_allowance
-
-    # 获取最晚打卡日期
-    latest_date = max(i[0] for i in result)
-
-    # 获取昨天的日期
-    yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
-
-    # 选择最晚打卡日期或昨天的日期
-    cutoff_date = latest_date if latest_date < yesterday else yesterday
-
-    # 动态生成表格
-    table = [
-        ["总加班薪资", f"{total_overtime_pay:.2f} 元"],
-        ["实际加班薪资", f"{actual_overtime_pay:.2f} 元"],
-        ["总餐补", f"{total_meal_allowance:.2f} 元"],
-        ["总工作日加班收入", f"{total_workday_overtime_pay:.2f} 元"],
-        ["总周末加班收入", f"{total_weekend_overtime_pay:.2f} 元"],
-        ["总节假日加班收入", f"{total_holiday_overtime_pay:.2f} 元"],
-        ["总收入", f"{total_income:.2f} 元"],
-        ["扣减后预计工作日加班收入", f"{actual_workday_overtime_pay:.2f} 元"],
-        ["扣减后预计周末加班收入", f"{actual_weekend_overtime_pay:.2f} 元"],
-        ["扣减后预计节假日加班收入", f"{actual_holiday_overtime_pay:.2f} 元"],
-        ["扣减后预计总加班收入", f"{actual_overtime_pay:.2f} 元"],
-        ["扣减后预计总收入", f"{actual_total_income:.2f} 元"],
-        ["总工作日加班时长", f"{total_workday_hours:.2f} 小时"],
-        ["总周末加班时长", f"{total_weekend_hours:.2f} 小时"],
-        ["总节假日加班时长", f"{total_holiday_hours:.2f} 小时"],
-        ["总加班时长", f"{total_workday_hours + total_weekend_hours + total_holiday_hours:.2f} 小时"],
-        ["扣减后预计工作日加班时长", f"{actual_workday_hours:.2f} 小时"],
-        ["扣减后预计周末加班时长", f"{actual_weekend_hours:.2f} 小时"],
-        ["扣减后预计节假日加班时长", f"{actual_holiday_hours:.2f} 小时"],
-        ["扣减后预计总加班时长", f"{actual_workday_hours + actual_weekend_hours + actual_holiday_hours:.2f} 小时"],
-        [f"截止到{cutoff_date}的总迟到次数", f"{total_late_count} 次"],
-        [f"截止到{cutoff_date}的总迟到分钟数", f"{total_late_minutes} 分钟"],
-        ["应出勤天数", f"{required_workdays} 天"],
-        ["实际出勤天数", f"{actual_workdays} 天"]
-    ]
-    print(tabulate(table, headers=["汇总项目", "信息"], tablefmt="grid"))
-    if total_late_minutes >= 30:
-        print("小碧崽治这么喜欢迟到，有你好果汁吃！")
+    if summary is None:
+        summary = summarize_results(result)
+    table = summary.table(work_calendar, total_late_count, total_late_minutes)
+    if verbose:
+        from tabulate import tabulate
+        print(tabulate(table, headers=["汇总项目", "信息"], tablefmt="grid"))
+        if total_late_minutes >= 30:
+            print("小碧崽治这么喜欢迟到，有你好果汁吃！")
 
     return table
 
+# 并发请求同时发现 Cookie 过期时只续期一次：续期过程持有锁，刚刚续期过的旧 Cookie 直接返回对应的新 Cookie。
+# 续期结果只在 COOKIE_RENEW_SHARE_SECONDS 内共享给同时在途的请求，之后删除，续期得到的 Cookie 也会过期，不能一直复用
+COOKIE_RENEW_SHARE_SECONDS = 10
+COOKIE_RENEW_ATTEMPTS = 2       # 续期后重新请求仍然提示过期时，最多续期的次数
+_cookie_renew_lock = threading.Lock()
+_renewed_cookies = {}           # 旧 Cookie -> (新 Cookie, 续期完成的 time.monotonic())
+
+def renew_cookie(browser='auto', user_cookie=None):
+    """
+    重新获取 Cookie。先用旧 Cookie 中的 quectel_refresh_token 静默续期，续期失败时
+    交互模式下启动浏览器登录，非交互（批量）模式下无法登录，直接抛出异常交由调用方处理。
+    交互模式下新的 Cookie 会保存到 COOKIES_FILE。多个线程同时续期同一个 Cookie 时只有第一个真正续期，
+    其余的等待并直接使用它的结果；续期完成 COOKIE_RENEW_SHARE_SECONDS 之后再用同一个旧 Cookie 续期时重新续期。
+
+    参数:
+        browser (str): 使用的浏览器类型 ('chrome', 'edge', 'auto')。默认为 'auto'。
+        user_cookie (str): 已过期的 Cookie，为空时直接启动浏览器。
+
+    返回值:
+        str: 新的 Cookie 字符串；获取失败时返回 None。
+
+    异常:
+        RuntimeError: 非交互模式下续期失败。
+    """
+    with _cookie_renew_lock:
+        now = t.monotonic()
+        for old_cookie in [old_cookie for old_cookie, (_, renewed_at) in _renewed_cookies.items() if now - renewed_at > COOKIE_RENEW_SHARE_SECONDS]:
+            del _renewed_cookies[old_cookie]
+        if user_cookie and user_cookie in _renewed_cookies:
+            return _renewed_cookies[user_cookie][0]
+
+        new_cookie = refresh_cookie_via_token(user_cookie) if user_cookie else None
+        if new_cookie:
+            print("已使用 refresh token 续期Cookie")
+        else:
+            if not INTERACTIVE:
+                raise RuntimeError("Cookie已失效且续期失败，非交互模式下无法启动浏览器重新登录")
+            if user_cookie:
+                print("Cookie续期失败，正在启动浏览器重新登录...")
+            new_cookie = fetch_cookie_via_browser(browser)
+        if new_cookie:
+            if user_cookie:
+                _renewed_cookies[user_cookie] = (new_cookie, t.monotonic())
+            if INTERACTIVE:
+                save_cookie(new_cookie)
+        return new_cookie
+
+def is_expired_response(data) -> bool:
+    """
+    判断接口返回的是否为 Cookie 过期（未登录）的提示，而不是数据。
+
+    参数:
+        data: 接口返回的数据。
+
+    返回值:
+        bool: 是过期提示时返回 True。
+    """
+    if isinstance(data, str):
+        return 'expired' in data or 'login' in data.lower() or 'unauthorized' in data.lower()
+    if isinstance(data, dict):
+        return data.get('code') == 'expired' or data.get('status') == 'unauthorized' or data.get('expired') is True
+    return False
+
 def check_and_refresh_data(fetch_function, *args):
     """
     检查数据是否过期并刷新数据。
@@ -1141,34 +2820,45 @@ def check_and_refresh_data(fetch_function, *args):
 
     返回值:
         data: 刷新后的数据，如果 Cookie 或 API 接口过期，会重新获取并更新数据。
+            续期后重新请求仍然提示过期时再续期，最多 COOKIE_RENEW_ATTEMPTS 次，不会把过期提示当作数据返回。
     """
+    def refetch(args):
+        # Cookie 或接口更新后的重新请求，性能分析时计为重试
+        if PROFILE:
+            _profiler.record_retry(getattr(fetch_function, 'profile_stage', None))
+        return fetch_function(*args)
+
     try:
         data = fetch_function(*args)
         new_cookie = args[1]  # 默认与传入的 cookie 相同
 
-        # 检查返回的数据是否为字符串，如果是则可能包含错误信息
-        if isinstance(data, str):
-            if 'expired' in data or 'login' in data.lower() or 'unauthorized' in data.lower():
+        if is_expired_response(data):
+            browser_arg = 'auto'  # 默认浏览器
+            # 查找浏览器参数，如果存在的话
+            if len(args) > 2 and isinstance(args[2], str) and args[2] in ['chrome', 'edge', 'auto']:
+                browser_arg = args[2]
+            for _ in range(COOKIE_RENEW_ATTEMPTS):
                 print("Cookie已过期，正在重新获取...")
-                browser_arg = 'auto'  # 默认浏览器
-                # 查找浏览器参数，如果存在的话
-                if len(args) > 2 and isinstance(args[2], str) and args[2] in ['chrome', 'edge', 'auto']:
-                    browser_arg = args[2]
-
-                new_cookie = fetch_cookie_via_browser(browser_arg)
-                print(f"获取到新的Cookie")
-                if new_cookie:
-                    save_cookie(new_cookie)
-                    # 更新 args 中的 Cookie 参数
-                    args = list(args)
-                    args[1] = new_cookie
-                    args = tuple(args)
-                    # 使用新的 Cookie 重新获取数据
-                    data = fetch_function(*args)
-                else:
+                # 第二次续期时传入的是上一次续期得到的 Cookie，不会再拿到同一个共享的续期结果
+                new_cookie = renew_cookie(browser_arg, args[1])
+                if not new_cookie:
                     print("Cookie获取失败，请重试")
                     exit()
-            elif 'No access' in data or 'access denied' in data.lower():
+                print(f"获取到新的Cookie")
+                # 更新 args 中的 Cookie 参数，使用新的 Cookie 重新获取数据
+                args = list(args)
+                args[1] = new_cookie
+                args = tuple(args)
+                data = refetch(args)
+                if not is_expired_response(data):
+                    break
+            else:
+                print("续期后的Cookie仍然无效，请重试")
+                exit()
+
+        # 检查返回的数据是否为字符串，如果是则可能包含错误信息
+        elif isinstance(data, str):
+            if 'No access' in data or 'access denied' in data.lower():
                 print("API接口已过期，正在重新获取...")
                 cookie = args[1]  # 获取当前的 Cookie
                 # 判断是哪种接口需要更新
@@ -1176,13 +2866,14 @@ def check_and_refresh_data(fetch_function, *args):
                     try:
                         clock_in_api_endpoint = get_user_variable_online(cookie, CLOCK_IN_DATA_TITLE)
                         if clock_in_api_endpoint:
-                            save_clock_in_api_endpoint_to_config(clock_in_api_endpoint)
+                            if INTERACTIVE:
+                                save_clock_in_api_endpoint_to_config(clock_in_api_endpoint)
                             # 更新 args 中的接口参数
                             args = list(args)
                             args[0] = clock_in_api_endpoint
                             args = tuple(args)
                             # 使用新的接口重新获取数据
-                            data = fetch_function(*args)
+                            data = refetch(args)
                         else:
                             print("接口获取失败，请重试")
                             exit()
@@ -1190,21 +2881,6 @@ def check_and_refresh_data(fetch_function, *args):
                         print(f"接口更新失败: {e}")
                         exit()
 
-        # 检查返回的数据是否为字典且包含错误信息
-        elif isinstance(data, dict):
-            if data.get('code') == 'expired' or data.get('status') == 'unauthorized' or data.get('expired') is True:
-                print("Cookie已过期，正在重新获取...")
-                new_cookie = fetch_cookie_via_browser('auto')
-                if new_cookie:
-                    save_cookie(new_cookie)
-                    args = list(args)
-                    args[1] = new_cookie
-                    args = tuple(args)
-                    data = fetch_function(*args)
-                else:
-                    print("Cookie获取失败，请重试")
-                    exit()
-
         return data, new_cookie
 
     except Exception as e:
@@ -1212,50 +2888,1291 @@ def check_and_refresh_data(fetch_function, *args):
         if DEBUG:
             print(f"[DEBUG] 详细错误信息:")
             traceback.print_exc()
+        if OFFLINE:
+            # 离线模式下无法重新登录，缺少缓存时直接退出
+            exit()
         # 尝试重新获取Cookie
         print("尝试重新获取Cookie...")
-        new_cookie = fetch_cookie_via_browser('auto')
+        new_cookie = renew_cookie('auto', args[1] if len(args) > 1 else None)
         if new_cookie:
-            save_cookie(new_cookie)
             args = list(args)
             args[1] = new_cookie
             args = tuple(args)
             try:
-                data = fetch_function(*args)
-                return data, new_cookie
+                data = refetch(args)
             except Exception as retry_e:
                 print(f"重试后仍然失败: {retry_e}")
                 exit()
+            if is_expired_response(data):
+                print("续期后的Cookie仍然无效，请重试")
+                exit()
+            return data, new_cookie
         else:
             print("Cookie获取失败，程序退出")
             exit()
 
 
-# 主程序
-def main():
-    # 创建 ArgumentParser 对象
-    parser = argparse.ArgumentParser(description='参数配置，是否使用本地数据，是否清除或者删除配置文件，是否指定浏览器')
+def get_employee_cache_key(cookie) -> Optional[str]:
+    """
+    从 Cookie 中取出员工标识（MCHRID），用作每日结果缓存的目录名。
 
-    # 添加命令行参数
-    parser.add_argument('--local', action='store_true', help='使用本地数据')
+    参数:
+        cookie (str 或 dict): 员工的 Cookie。
+
+    返回值:
+        Optional[str]: 员工标识；Cookie 中没有 MCHRID 时返回 None，此时不使用缓存。
+    """
+    try:
+        employee_id = parse_cookie_string(cookie).get('MCHRID')
+    except (ValueError, AttributeError):
+        return None
+    if not employee_id:
+        return None
+    return re.sub(r'[^\w-]', '_', employee_id)
+
+def day_fingerprint(first_check_time: int, last_check_time: int, day_type_code: int, shift_name: Optional[str], late_minutes: list, delay_deductions: list, annual_leaves: list, personal_leaves: list) -> str:
+    """
+    计算一天所有计算输入的指纹，输入不变时每日结果也不变。
+
+    参数:
+        first_check_time (int): 最早打卡时间（当天零点起的秒数）。
+        last_check_time (int): 最晚打卡时间（当天零点起的秒数）。
+        day_type_code (int): 日期性质编码。
+        shift_name (Optional[str]): 班次名称。
+        late_minutes (list): 当天的迟到分钟数列表。
+        delay_deductions (list): 当天的延时工时扣减时间段（当天零点起的分钟数）。
+        annual_leaves (list): 当天的年假时间段（当天零点起的分钟数）。
+        personal_leaves (list): 当天的事假时间段（当天零点起的分钟数）。
+
+    返回值:
+        str: 十六进制指纹。
+    """
+    inputs = [DAILY_RESULT_CACHE_VERSION, first_check_time, last_check_time, day_type_code, shift_name,
+              late_minutes, delay_deductions, annual_leaves, personal_leaves]
+    return hashlib.sha1(json.dumps(inputs, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+@profiled('compute')
+def calculate_daily_results(clock_in_data: list, work_calendar: WorkCalendar, annual_leave: IntervalIndex, personal_leave: IntervalIndex, delay_deduction: IntervalIndex, daily_late_minutes: Dict, daily_shift_map: Dict, day_cache: Optional[Dict[str, list]] = None) -> Tuple[list, float]:
+    """
+    根据打卡、流程申请和出勤数据逐日计算加班情况。
+
+    参数:
+        clock_in_data (list): 打卡记录列表。
+        work_calendar (WorkCalendar): 打卡记录所在年份的日期性质索引。
+        annual_leave (IntervalIndex): 年假时间段。
+        personal_leave (IntervalIndex): 事假时间段。
+        delay_deduction (IntervalIndex): 延时工时扣减时间段。
+        daily_late_minutes (Dict): 每日迟到分钟数。
+        daily_shift_map (Dict): 每日班次信息。
+        day_cache (Optional[Dict[str, list]]): 之前计算过的每日结果，键为日期，值为 [输入指纹, 每日结果]。
+            输入指纹一致的日期直接使用缓存结果，其余日期重新计算后写回 day_cache，并删除已不存在的日期。
+
+    返回值:
+        Tuple[list, float]: 每日统计结果（DailyResult 列表）和总加班费。
+    """
+    print(f"正在处理 {len(clock_in_data)} 条打卡记录...")
+    group_by_date = group_daily_punches(clock_in_data)      # 按日期统计最早和最晚的打卡时间（当天零点起的秒数）
+    return calculate_day_bounds(group_by_date, work_calendar, annual_leave, personal_leave, delay_deduction, daily_late_minutes, daily_shift_map, day_cache)
+
+def calculate_day_bounds(group_by_date: Dict[str, List[int]], work_calendar: WorkCalendar, annual_leave: IntervalIndex, personal_leave: IntervalIndex, delay_deduction: IntervalIndex, daily_late_minutes: Dict, daily_shift_map: Dict, day_cache: Optional[Dict[str, list]] = None) -> Tuple[list, float]:
+    """
+    根据每天最早和最晚的打卡时间逐日计算加班情况，其余参数和返回值见 calculate_daily_results。
+    已经按天归约过打卡记录的调用方（例如从历史数据库重新计算）直接调用这个函数。
+
+    参数:
+        group_by_date (Dict[str, List[int]]): 键为日期，值为 [最早打卡秒数, 最晚打卡秒数]，见 group_daily_punches。
+    """
+    result = []			        # 每日结果，DailyResult 列表
+    overtime_income = 0.0       # 加班费
+
+    # 先整理出每天的输入列，再一次性交给 batch_day_kernel 计算
+    dates = []
+    first_seconds = []
+    last_seconds = []
+    day_type_codes = []
+    shift_codes = []
+    late_minutes_list = []
+    deduction_hours = []
+    leave_columns = []      # (调整后的最早打卡时间, 延时扣减时长, 年假时间, 事假时间)
+    fingerprints = []       # 需要重新计算的日期的输入指纹
+    rows = {}               # 按日期顺序存放每日结果，命中缓存的日期直接填入
+    for i in group_by_date:
+        try:
+            date = i  # 日期
+
+            # 最早和最晚的打卡时间
+            first_check_time, last_check_time = group_by_date[i]
+            day_type_code = work_calendar.day_type_code(date)
+
+            # 当天的延时扣减和请假时间段（当天零点起的分钟数），同一天的多个时间段全部计入
+            deduction_periods = delay_deduction.day_intervals(date)
+            annual_periods = annual_leave.day_intervals(date)
+            personal_periods = personal_leave.day_intervals(date)
+            delay_deduction_time = sum(end - start for start, end in deduction_periods) / 60
+            annual_leave_time = sum(end - start for start, end in annual_periods) / 60
+            personal_leave_time = sum(end - start for start, end in personal_periods) / 60
+
+            # 加班时长按实际打卡时间计算，迟到按最早的请假开始时间和打卡时间中较早的计算
+            leave_first_check_time = first_check_time
+            for periods in (annual_periods, personal_periods):
+                if periods:
+                    leave_first_check_time = min(leave_first_check_time, periods[0][0] * 60)
+
+            shift_name = daily_shift_map.get(date)
+            fingerprint = None
+            if day_cache is not None:
+                fingerprint = day_fingerprint(first_check_time, last_check_time, day_type_code, shift_name,
+                                              daily_late_minutes.get(i, []), deduction_periods, annual_periods, personal_periods)
+                cached = day_cache.get(date)
+                if cached is not None and cached[0] == fingerprint:
+                    rows[date] = cached[1]
+                    continue
+
+            rows[date] = None       # 占位，保持日期顺序，计算完成后填入
+            fingerprints.append(fingerprint)
+            dates.append(date)
+            first_seconds.append(first_check_time)
+            last_seconds.append(last_check_time)
+            day_type_codes.append(day_type_code)
+            shift_codes.append(shift_code(shift_name))
+            late_minutes_list.append(sum(daily_late_minutes[i]) if i in daily_late_minutes else 0)
+            deduction_hours.append(delay_deduction_time)
+            leave_columns.append((leave_first_check_time, delay_deduction_time, annual_leave_time, personal_leave_time))
+
+        except Exception as e:
+            print(f"处理日期 {i} 的数据时出错: {e}")
+            continue
+
+    overtime, overtime_pay, allowance, total_income, late_minutes = batch_day_kernel(first_seconds, last_seconds, day_type_codes, shift_codes, late_minutes_list, deduction_hours)
+    for index, date in enumerate(dates):
+        leave_first_check_time, delay_deduction_time, annual_leave_time, personal_leave_time = leave_columns[index]
+        rows[date] = DailyResult(
+            date,
+            leave_first_check_time,
+            last_seconds[index],
+            day_type_codes[index],
+            DAY_TYPE_RATES[day_type_codes[index]],
+            overtime[index],
+            overtime_pay[index],
+            allowance[index],
+            total_income[index],
+            late_minutes[index],
+            delay_deduction_time,
+            annual_leave_time,
+            personal_leave_time
+        )
+        if day_cache is not None:
+            day_cache[date] = [fingerprints[index], rows[date]]
+
+    if day_cache is not None:
+        # 数据中已经不存在的日期（例如被撤销的打卡）从缓存中删除
+        for date in [date for date in day_cache if date not in rows]:
+            del day_cache[date]
+        if DEBUG:
+            print(f"[DEBUG] 每日结果缓存命中 {len(rows) - len(dates)} 天，重新计算 {len(dates)} 天")
+
+    for date, row in rows.items():
+        result.append(row)
+        overtime_income += row.overtime_pay  # 总加班费
+    return result, overtime_income
+
+def calculate_local_day(date: str, first_check_time: int, last_check_time: int) -> DailyResult:
+    """
+    计算本地数据中的一天。本地数据没有出勤、请假和延时扣减信息，只按打卡时间计算。
+
+    参数:
+        date (str): 日期，格式为 'YYYY-MM-DD'。
+        first_check_time (int): 最早打卡时间（当天零点起的秒数）。
+        last_check_time (int): 最晚打卡时间（当天零点起的秒数）。
+
+    返回值:
+        DailyResult: 当天的结果。
+    """
+    work_calendar = get_work_calendar(int(date[:4]))
+    day_type = work_calendar.day_type(date)									# 今天啥日子
+    rate = pay_rate_cal(day_type)											# 加班一小时该给多少钱
+    overtime = overtime_cal(first_check_time, last_check_time, day_type)	# 加了多久班(单位小时)
+    overtime_pay = overtime_pay_cal(overtime, rate)							# 加班费多少
+    allowance = allowance_cal(overtime, day_type)							# 有没有食补
+    total_income = income_cal(overtime_pay, allowance)						# 一天的总收入
+    late_minutes = late_time_cal(first_check_time, day_type)				# 迟到了多久
+    return DailyResult(date, first_check_time, last_check_time, work_calendar.day_type_code(date), rate, overtime, overtime_pay, allowance, total_income, late_minutes)
+
+def calculate_local_punches(records: Iterable[Dict]) -> Dict[str, Dict[str, DailyResult]]:
+    """
+    边读边计算本地导出文件中的打卡记录，文件可以包含多名员工。reduce_daily_punches 每归约完一天就立即计算这一天，
+    不需要等整个文件读完；同一员工同一天的记录不连续时，合并打卡时间后重新计算这一天。
+
+    参数:
+        records (Iterable[Dict]): 打卡记录，通常是 iter_json_array 生成器。
+
+    返回值:
+        Dict[str, Dict[str, DailyResult]]: 键为员工 EMPID（没有时为空字符串），值为按日期排列的每日结果，都按第一次出现的顺序。
+    """
+    employees = OrderedDict()
+    for employee, date, first, last in reduce_daily_punches(records):
+        days = employees.get(employee)
+        if days is None:
+            days = employees[employee] = OrderedDict()
+        previous = days.get(date)
+        if previous is not None:
+            first = min(first, previous.first_check_seconds)
+            last = max(last, previous.last_check_seconds)
+        with profile_stage('compute'):
+            days[date] = calculate_local_day(date, first, last)
+    return employees
+
+def rank_cal(overtime_income: float) -> str:
+    """
+    根据总加班费给出评价。
+
+    参数:
+        overtime_income (float): 总加班费。
+
+    返回值:
+        str: 评价信息。
+    """
+    rank = ''
+    if overtime_income < 300:
+        rank = '李在赣神魔？'
+    elif 300 <= overtime_income < 500:
+        rank = '不太行'
+    elif 500 <= overtime_income < 1000:
+        rank = '一般，建议多加点 冲1000'
+    elif 1000 <= overtime_income <= 1500:
+        rank = '牛逼'
+    elif 1500 <= overtime_income < 2000:
+        rank = '逆天'
+    elif overtime_income >= 2000:
+        rank = f'你是懂加班的，白加了 {overtime_income - 2000:.2f} 元'
+    return rank
+
+@profiled('report')
+def save_report(file_name: str, result: list, summarize_data: list):
+    """
+    保存每日明细和汇总结果到 CSV 报表。
+
+    参数:
+        file_name (str): 报表文件路径。
+        result (list): 每日统计结果（DailyResult 列表）。
+        summarize_data (list): summarize 返回的汇总结果。
+    """
+    ensure_directory_exists(file_name)
+    with open(file_name, 'w', newline='', encoding='utf-8-sig') as csvfile:
+        csvwriter = csv.writer(csvfile)
+        csvwriter.writerow(DAILY_RESULT_HEADERS)
+        csvwriter.writerows(row.as_row() for row in result)
+        csvwriter.writerows([[], [], ["汇总项目", "信息"]])  # 写入两个空行和汇总项目表头
+        csvwriter.writerows(summarize_data)
+
+def fetch_employee_data(cookie: str, target_year: int, target_month: int, clock_in_api_endpoint: str, process_application_api_endpoint: str) -> Tuple[list, list, list, str]:
+    """
+    并发获取一个员工指定月份的打卡、流程申请和出勤数据，三个请求互不依赖。
+    任何一个请求发现 Cookie 过期时都由 renew_cookie 统一续期，只续期一次。
+
+    参数:
+        cookie (str): 员工的 Cookie。
+        target_year (int): 目标年份。
+        target_month (int): 目标月份。
+        clock_in_api_endpoint (str): 打卡数据接口。
+        process_application_api_endpoint (str): 流程申请数据接口。
+
+    返回值:
+        Tuple[list, list, list, str]: 打卡数据、流程申请数据、出勤数据和（可能已刷新的）Cookie。
+    """
+    print("检查并获取打卡、流程申请和出勤数据...")
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        clock_in_future = executor.submit(check_and_refresh_data, get_clock_in_data, clock_in_api_endpoint, cookie, target_month, target_year)
+        process_application_future = executor.submit(check_and_refresh_data, get_process_application_data, process_application_api_endpoint, cookie)
+        attendance_future = executor.submit(check_and_refresh_data, get_attendance_data, clock_in_api_endpoint, cookie, target_month, target_year)
+        clock_in_data, clock_in_cookie = clock_in_future.result()
+        process_application_data, process_application_cookie = process_application_future.result()
+        attendance_data, attendance_cookie = attendance_future.result()
+    # 续期过的请求返回新的 Cookie，并发续期时它们拿到的是同一个
+    for new_cookie in (clock_in_cookie, process_application_cookie, attendance_cookie):
+        if new_cookie and new_cookie != cookie:
+            cookie = new_cookie
+    return clock_in_data, process_application_data, attendance_data, cookie
+
+def calculate_employee_month(clock_in_data: list, process_application_data: list, attendance_data: list, cookie: str, verbose: bool = True, leave_data: Optional[Tuple[IntervalIndex, IntervalIndex, IntervalIndex]] = None, employee_name: Optional[str] = None) -> Tuple[list, list, SummaryAccumulator]:
+    """
+    解析一个员工一个月的原始数据并计算每日结果和汇总。
+
+    参数:
+        clock_in_data (list): 打卡数据。
+        process_application_data (list): 流程申请数据。
+        attendance_data (list): 出勤数据。
+        cookie (str): 员工的 Cookie，获取延时工时扣减数据时使用。
+        verbose (bool): 是否在终端打印汇总表格。
+        leave_data (Optional[Tuple[IntervalIndex, IntervalIndex, IntervalIndex]]): 已解析的年假、事假和延时工时扣减时间段。
+            多个月份共用同一份流程申请数据时传入，避免重复解析和请求。
+        employee_name (Optional[str]): 导出报表和写入历史数据库时使用的员工姓名，默认为 Cookie 中的 ENMAME。
+
+    返回值:
+        Tuple[list, list, SummaryAccumulator]: 每日统计结果、汇总表格和汇总结果（总加班费为 overtime_pay，
+            可以直接 merge 到部门或月份汇总中）。
+
+    异常:
+        ValueError: 如果打卡数据为空或格式不正确。
+    """
+    if not clock_in_data or not isinstance(clock_in_data, list):
+        if DEBUG:
+            print(f"[DEBUG] clock_in_data 原始内容: {clock_in_data}")
+        raise ValueError("打卡数据为空或格式不正确")
+
+    work_calendar = get_work_calendar(int(clock_in_data[0]['SHIFTTERM'][:4]))
+    # 从流程申请中获取年假、事假以及延时工时扣减数据
+    if leave_data is None:
+        leave_data = parse_process_application_data(process_application_data, cookie)
+    annual_leave, personal_leave, delay_deduction = leave_data
+    # 从出勤数据中获取迟到信息
+    attendance = parse_attendance_data(attendance_data)
+    daily_late_minutes, total_late_count, total_late_minutes, daily_shift_map = attendance
+    # 每日结果按输入指纹缓存，重新运行同一个月时只计算输入有变化的日期
+    employee_key = get_employee_cache_key(cookie) if USE_DAILY_RESULT_CACHE else None
+    month = clock_in_data[0]['SHIFTTERM'][:7]
+    day_cache = read_daily_results_from_cache(employee_key, month) if employee_key else None
+    result, _ = calculate_daily_results(clock_in_data, work_calendar, annual_leave, personal_leave, delay_deduction, daily_late_minutes, daily_shift_map, day_cache)
+    if day_cache is not None:
+        save_daily_results_to_cache(employee_key, month, day_cache)
+    summary = summarize_results(result)
+    summarize_data = summarize(result, work_calendar, total_late_count, total_late_minutes, verbose, summary)
+    cookie_dict = parse_cookie_string(cookie)
+    employee_id, employee_name = cookie_dict.get('MCHRID', ''), employee_name or cookie_dict.get('ENMAME', '')
+    export_month(employee_id, employee_name, month, result, summary)
+    record_history(employee_id, employee_name, month, clock_in_data, attendance, leave_data, result)
+    return result, summarize_data, summary
+
+
+# 报表导出
+# 导出的每日结果表和汇总表，列名和类型（SQLite 类型名，Parquet 中分别对应 string、int64 和 float64）
+EXPORT_DAILY_COLUMNS = [
+    ('employee_id', 'TEXT'), ('employee_name', 'TEXT'), ('month', 'TEXT'), ('date', 'TEXT'),
+    ('first_check_seconds', 'INTEGER'), ('last_check_seconds', 'INTEGER'), ('day_type', 'TEXT'), ('rate', 'REAL'),
+    ('overtime', 'REAL'), ('overtime_pay', 'REAL'), ('allowance', 'REAL'), ('income', 'REAL'), ('late_minutes', 'REAL'),
+    ('delay_deduction', 'REAL'), ('annual_leave', 'REAL'), ('personal_leave', 'REAL'),
+]
+# 汇总表的指标与 ROLLUP_HEADERS 一一对应
+EXPORT_SUMMARY_COLUMNS = [
+    ('employee_id', 'TEXT'), ('employee_name', 'TEXT'), ('month', 'TEXT'),
+    ('workday_overtime', 'REAL'), ('weekend_overtime', 'REAL'), ('holiday_overtime', 'REAL'), ('total_overtime', 'REAL'),
+    ('overtime_pay', 'REAL'), ('allowance', 'REAL'), ('income', 'REAL'), ('late_minutes', 'REAL'), ('personal_leave', 'REAL'),
+]
+EXPORT_PATH = OUTPUT_PATH + 'exports/'
+PARQUET_ROW_GROUP_SIZE = 10000      # Parquet 每攒够这么多行写出一个行组
+
+def daily_export_row(employee_id: str, employee_name: str, month: str, row: DailyResult) -> tuple:
+    """
+    将一天的结果转换为按 EXPORT_DAILY_COLUMNS 排列的一行。
+    """
+    return (employee_id, employee_name, month, row.date, row.first_check_seconds, row.last_check_seconds, row.day_type,
+            float(row.rate), row.overtime, row.overtime_pay, row.allowance, row.income, float(row.late_minutes),
+            row.delay_deduction, row.annual_leave, row.personal_leave)
+
+def summary_export_row(employee_id: str, employee_name: str, month: str, summary: SummaryAccumulator) -> tuple:
+    """
+    将一个员工月的汇总转换为按 EXPORT_SUMMARY_COLUMNS 排列的一行。
+    """
+    return (employee_id, employee_name, month) + tuple(float(value) for value in summary.rollup_values())
+
+class ReportExporter:
+    """
+    报表导出器的基类。每个员工月计算完成后立即写出，每日结果和汇总分别写入两张表。
+    批量模式下多个线程共用同一个导出器，写入时持有 self.lock。
+    """
+    name = ''
+
+    def __init__(self, directory: str, append: bool = False):
+        """
+        参数:
+            directory (str): 导出目录。
+            append (bool): 是否追加到已有的导出数据；为 False 时先清空之前导出的数据。
+        """
+        self.directory = directory
+        self.append = append
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, daily_rows: List[tuple], summary_row: tuple):
+        """
+        写出一个员工月的每日结果和汇总。
+
+        参数:
+            daily_rows (List[tuple]): 按 EXPORT_DAILY_COLUMNS 排列的每日结果。
+            summary_row (tuple): 按 EXPORT_SUMMARY_COLUMNS 排列的汇总。
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class JsonLinesExporter(ReportExporter):
+    """
+    导出为 daily.jsonl 和 summary.jsonl，每行一个 JSON 对象，写完一个员工月就刷新到磁盘。
+    """
+    name = 'jsonl'
+
+    def __init__(self, directory: str, append: bool = False):
+        super().__init__(directory, append)
+        mode = 'a' if append else 'w'
+        self.daily_file = open(os.path.join(directory, 'daily.jsonl'), mode, encoding='utf-8')
+        self.summary_file = open(os.path.join(directory, 'summary.jsonl'), mode, encoding='utf-8')
+
+    def write(self, daily_rows: List[tuple], summary_row: tuple):
+        daily_names = [name for name, _ in EXPORT_DAILY_COLUMNS]
+        summary_names = [name for name, _ in EXPORT_SUMMARY_COLUMNS]
+        with self.lock:
+            for row in daily_rows:
+                self.daily_file.write(json.dumps(dict(zip(daily_names, row)), ensure_ascii=False) + '\n')
+            self.summary_file.write(json.dumps(dict(zip(summary_names, summary_row)), ensure_ascii=False) + '\n')
+            self.daily_file.flush()
+            self.summary_file.flush()
+
+    def close(self):
+        self.daily_file.close()
+        self.summary_file.close()
+
+class SqliteExporter(ReportExporter):
+    """
+    导出到 overtime.db 中的 daily_results 和 summaries 两张表。主键为员工标识加日期（月份），姓名只是普通的列，
+    同一员工同一天（同一月）的数据重复导出时覆盖旧数据，姓名改变或在不同名单中写法不同也不会产生重复行。
+    """
+    name = 'sqlite'
+    tables = (('daily_results', EXPORT_DAILY_COLUMNS, ('employee_id', 'date')),
+              ('summaries', EXPORT_SUMMARY_COLUMNS, ('employee_id', 'month')))
+
+    def __init__(self, directory: str, append: bool = False):
+        super().__init__(directory, append)
+        import sqlite3
+        self.connection = sqlite3.connect(os.path.join(directory, 'overtime.db'), check_same_thread=False)
+        with self.connection:
+            for table, columns, key in self.tables:
+                if not append:
+                    self.connection.execute(f"DROP TABLE IF EXISTS {table}")
+                existing_key = tuple(row[1] for row in sorted(self.connection.execute(f"PRAGMA table_info({table})"), key=lambda row: row[5]) if row[5])
+                definition = f"({', '.join(f'{name} {kind}' for name, kind in columns)}, PRIMARY KEY ({', '.join(key)}))"
+                if existing_key and existing_key != key:
+                    # 之前的版本把姓名也放在主键中，按新的主键重建，同一员工同一天保留最后写入的一行
+                    self.connection.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+                    self.connection.execute(f"CREATE TABLE {table} {definition}")
+                    self.connection.execute(f"INSERT OR REPLACE INTO {table} SELECT * FROM {table}_old ORDER BY rowid")
+                    self.connection.execute(f"DROP TABLE {table}_old")
+                else:
+                    self.connection.execute(f"CREATE TABLE IF NOT EXISTS {table} {definition}")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS daily_results_month ON daily_results (month)")
+        self.daily_sql = f"INSERT OR REPLACE INTO daily_results VALUES ({', '.join('?' * len(EXPORT_DAILY_COLUMNS))})"
+        self.summary_sql = f"INSERT OR REPLACE INTO summaries VALUES ({', '.join('?' * len(EXPORT_SUMMARY_COLUMNS))})"
+
+    def write(self, daily_rows: List[tuple], summary_row: tuple):
+        with self.lock, self.connection:
+            self.connection.executemany(self.daily_sql, daily_rows)
+            self.connection.execute(self.summary_sql, summary_row)
+
+    def close(self):
+        self.connection.close()
+
+class ParquetExporter(ReportExporter):
+    """
+    导出为 daily/ 和 summary/ 两个 Parquet 数据集目录，需要安装 pyarrow。
+    行数据先在内存中攒成行组再写出；Parquet 文件写完后不能追加，所以每次运行写一个新的 part 文件，
+    非追加模式下先删除目录中之前的 part 文件。
+    """
+    name = 'parquet'
+
+    def __init__(self, directory: str, append: bool = False):
+        super().__init__(directory, append)
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("导出 Parquet 需要先安装 pyarrow: pip install pyarrow")
+        self.pyarrow = pyarrow
+        types = {'TEXT': pyarrow.string(), 'INTEGER': pyarrow.int64(), 'REAL': pyarrow.float64()}
+        part_name = f"part-{datetime.now().strftime('%Y%m%d%H%M%S')}-{os.getpid()}.parquet"
+        self.tables = {}
+        for table, columns in (('daily', EXPORT_DAILY_COLUMNS), ('summary', EXPORT_SUMMARY_COLUMNS)):
+            table_directory = os.path.join(directory, table)
+            os.makedirs(table_directory, exist_ok=True)
+            if not append:
+                for file_name in os.listdir(table_directory):
+                    if file_name.endswith('.parquet'):
+                        os.remove(os.path.join(table_directory, file_name))
+            schema = pyarrow.schema([(name, types[kind]) for name, kind in columns])
+            writer = pyarrow.parquet.ParquetWriter(os.path.join(table_directory, part_name), schema)
+            self.tables[table] = (schema, writer, [])
+
+    def flush(self, table: str):
+        schema, writer, buffer = self.tables[table]
+        if buffer:
+            columns = list(zip(*buffer))
+            writer.write_table(self.pyarrow.Table.from_arrays([self.pyarrow.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema))
+            buffer.clear()
+
+    def write(self, daily_rows: List[tuple], summary_row: tuple):
+        with self.lock:
+            self.tables['daily'][2].extend(daily_rows)
+            self.tables['summary'][2].append(summary_row)
+            for table, (_, _, buffer) in self.tables.items():
+                if len(buffer) >= PARQUET_ROW_GROUP_SIZE:
+                    self.flush(table)
+
+    def close(self):
+        with self.lock:
+            for table, (_, writer, _) in self.tables.items():
+                self.flush(table)
+                writer.close()
+
+EXPORTERS = OrderedDict((exporter.name, exporter) for exporter in (JsonLinesExporter, SqliteExporter, ParquetExporter))
+_exporters = []
+
+def open_exporters(formats: List[str], directory: str = EXPORT_PATH, append: bool = False):
+    """
+    打开指定格式的导出器，之后每个员工月计算完成时由 export_month 写出，程序退出时自动关闭。
+
+    参数:
+        formats (List[str]): 导出格式，见 EXPORTERS。
+        directory (str): 导出目录。
+        append (bool): 是否追加到已有的导出数据。
+
+    异常:
+        ValueError: 如果格式不支持。
+        RuntimeError: 如果缺少导出格式需要的依赖。
+    """
+    unknown = [name for name in formats if name not in EXPORTERS]
+    if unknown:
+        raise ValueError(f"不支持的导出格式: {', '.join(unknown)}，可选 {', '.join(EXPORTERS)}")
+    for name in dict.fromkeys(formats):
+        _exporters.append(EXPORTERS[name](directory, append))
+    atexit.register(close_exporters)
+
+def close_exporters():
+    """
+    关闭所有导出器，写出 Parquet 中剩余的行组。重复调用时什么也不做。
+    """
+    while _exporters:
+        _exporters.pop().close()
+
+def export_month(employee_id: str, employee_name: str, month: str, result: list, summary: SummaryAccumulator):
+    """
+    将一个员工一个月的每日结果和汇总写到所有已打开的导出器，没有打开导出器时什么也不做。
+
+    参数:
+        employee_id (str): 员工标识（MCHRID）。
+        employee_name (str): 员工姓名。
+        month (str): 月份，格式为 'YYYY-MM'。
+        result (list): 每日统计结果（DailyResult 列表）。
+        summary (SummaryAccumulator): 汇总结果。
+    """
+    if not _exporters:
+        return
+    with profile_stage('report'):
+        daily_rows = [daily_export_row(employee_id, employee_name, month, row) for row in result]
+        summary_row = summary_export_row(employee_id, employee_name, month, summary)
+        for exporter in _exporters:
+            exporter.write(daily_rows, summary_row)
+
+
+# 历史数据库
+# 每次运行获取的原始数据和计算结果按员工和日期写入 HISTORY_DB_FILE，同一员工同一个月重新运行时整月替换，
+# 之后的区间统计直接查询数据库，不需要重新请求接口。表结构如下（打卡时间为当天零点起的秒数，时间段为当天零点起的分钟数）:
+#   employees       员工标识和姓名
+#   months          已记录的员工月，以及当月累计的迟到次数和迟到分钟数
+#   punches         每一次打卡，remote 为是否异地打卡
+#   attendance      每日的迟到分钟数和班次
+#   periods         每天的年假、事假和延时工时扣减时间段，kind 分别为 annual_leave、personal_leave、delay_deduction
+#   day_results     每日结果，列与 DailyResult 一致
+HISTORY_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS employees (employee_id TEXT PRIMARY KEY, employee_name TEXT)",
+    "CREATE TABLE IF NOT EXISTS months (employee_id TEXT, month TEXT, late_count INTEGER, late_minutes INTEGER, "
+    "updated_at TEXT, PRIMARY KEY (employee_id, month))",
+    "CREATE TABLE IF NOT EXISTS punches (employee_id TEXT, date TEXT, seconds INTEGER, remote INTEGER, "
+    "PRIMARY KEY (employee_id, date, seconds, remote))",
+    "CREATE TABLE IF NOT EXISTS attendance (employee_id TEXT, date TEXT, late_minutes INTEGER, shift_name TEXT, "
+    "PRIMARY KEY (employee_id, date))",
+    "CREATE TABLE IF NOT EXISTS periods (employee_id TEXT, date TEXT, kind TEXT, start_minute INTEGER, end_minute INTEGER, "
+    "PRIMARY KEY (employee_id, date, kind, start_minute))",
+    "CREATE TABLE IF NOT EXISTS day_results (employee_id TEXT, date TEXT, first_check_seconds INTEGER, last_check_seconds INTEGER, "
+    "day_type_code INTEGER, rate INTEGER, overtime REAL, overtime_pay REAL, allowance REAL, income REAL, late_minutes REAL, "
+    "delay_deduction REAL, annual_leave REAL, personal_leave REAL, PRIMARY KEY (employee_id, date))",
+    # 不指定员工时按日期范围查询
+    "CREATE INDEX IF NOT EXISTS day_results_date ON day_results (date)",
+]
+HISTORY_PERIOD_KINDS = ('annual_leave', 'personal_leave', 'delay_deduction')
+HISTORY_RESULT_SQL = f"INSERT OR REPLACE INTO day_results VALUES ({', '.join('?' * 14)})"
+
+def history_result_row(employee_id: str, row: DailyResult) -> tuple:
+    """
+    将一天的结果转换为 day_results 表中的一行。
+    """
+    return (employee_id, row.date, row.first_check_seconds, row.last_check_seconds, row.day_type_code, row.rate,
+            row.overtime, row.overtime_pay, row.allowance, row.income, row.late_minutes, row.delay_deduction,
+            row.annual_leave, row.personal_leave)
+
+def history_range_condition(alias: str, column: str, employee: Optional[str], start_month: Optional[str], end_month: Optional[str]) -> Tuple[str, list]:
+    """
+    生成按员工和月份区间筛选的 WHERE 条件，条件的前缀与 (employee_id, date) 索引一致。
+
+    参数:
+        alias (str): 表的别名。
+        column (str): 日期列（'date'）或月份列（'month'）。
+        employee (Optional[str]): 员工标识或姓名，为空时不限制。
+        start_month (Optional[str]): 起始月份，格式为 'YYYY-MM'，为空时不限制。
+        end_month (Optional[str]): 结束月份（包含），为空时不限制。
+
+    返回值:
+        Tuple[str, list]: 条件和对应的参数。
+    """
+    # 日期按字符串比较，'YYYY-MM' 到 'YYYY-MM-~' 覆盖整月，对月份列同样适用
+    conditions = [f"{alias}.{column} >= ?", f"{alias}.{column} < ?"]
+    parameters = [start_month or '0000-00', (end_month or '9999-99') + '-~']
+    if employee:
+        conditions.insert(0, f"{alias}.employee_id IN (SELECT employee_id FROM employees WHERE employee_id = ? OR employee_name = ?)")
+        parameters = [employee, employee] + parameters
+    return ' AND '.join(conditions), parameters
+
+def split_periods_by_day(intervals: IntervalIndex):
+    """
+    将时间段按零点拆分为每天的时间段。
+
+    参数:
+        intervals (IntervalIndex): 以分钟序号表示的时间段。
+
+    返回值:
+        Iterator[Tuple[str, int, int]]: (日期, 开始, 结束)，开始和结束为当天零点起的分钟数。
+    """
+    for start, end in intervals:
+        for day in range(start // MINUTES_PER_DAY, (end - 1) // MINUTES_PER_DAY + 1):
+            base = day * MINUTES_PER_DAY
+            yield dt_date.fromordinal(day).isoformat(), max(start, base) - base, min(end, base + MINUTES_PER_DAY) - base
+
+class HistoryStore:
+    """
+    本地历史数据库。批量模式下多个线程共用同一个连接，写入和查询时持有 self.lock；
+    多个进程同时写入时由 SQLite 的文件锁排队。
+    """
+
+    def __init__(self, file_path: str = HISTORY_DB_FILE):
+        import sqlite3
+        ensure_directory_exists(file_path)
+        self.file_path = file_path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(file_path, timeout=30, check_same_thread=False)
+        with self.connection:
+            for statement in HISTORY_SCHEMA:
+                self.connection.execute(statement)
+
+    def record_month(self, employee_id: str, employee_name: str, month: str, clock_in_data: list, attendance: tuple,
+                     leave_data: Tuple[IntervalIndex, IntervalIndex, IntervalIndex], result: list):
+        """
+        写入一个员工一个月的数据，先删除该员工该月之前的记录，被撤销的打卡和请假不会残留。
+        流程申请不分月份，时间段每次整体替换。
+
+        参数:
+            employee_id (str): 员工标识（MCHRID）。
+            employee_name (str): 员工姓名。
+            month (str): 月份，格式为 'YYYY-MM'。
+            clock_in_data (list): 打卡数据。
+            attendance (tuple): parse_attendance_data 的返回值。
+            leave_data (Tuple[IntervalIndex, IntervalIndex, IntervalIndex]): 年假、事假和延时工时扣减时间段。
+            result (list): 每日统计结果（DailyResult 列表）。
+        """
+        daily_late_minutes, total_late_count, total_late_minutes, daily_shift_map = attendance
+        punches = set()
+        for item in clock_in_data:
+            if not isinstance(item, dict) or 'SHIFTTERM' not in item or 'CARDTIME' not in item:
+                continue
+            try:
+                punch = parse_punch(item['CARDTIME'])
+            except ValueError:
+                continue
+            punches.add((employee_id, item['SHIFTTERM'], punch.seconds, int(punch.remote)))
+        attendance_rows = [(employee_id, date, sum(daily_late_minutes.get(date, [])), daily_shift_map.get(date))
+                           for date in dict.fromkeys(itertools.chain(daily_late_minutes, daily_shift_map))]
+        period_rows = [(employee_id, date, kind, start, end)
+                       for kind, intervals in zip(HISTORY_PERIOD_KINDS, leave_data)
+                       for date, start, end in split_periods_by_day(intervals)]
+        result_rows = [history_result_row(employee_id, row) for row in result]
+        # 日期按字符串比较，'YYYY-MM-' 到 'YYYY-MM-~' 覆盖整月
+        month_range = (employee_id, month + '-', month + '-~')
+        with self.lock, self.connection:
+            execute = self.connection.execute
+            execute("INSERT OR REPLACE INTO employees VALUES (?, ?)", (employee_id, employee_name))
+            execute("INSERT OR REPLACE INTO months VALUES (?, ?, ?, ?, ?)",
+                    (employee_id, month, total_late_count, total_late_minutes, datetime.now().isoformat(timespec='seconds')))
+            for table in ('punches', 'attendance', 'day_results'):
+                execute(f"DELETE FROM {table} WHERE employee_id = ? AND date >= ? AND date < ?", month_range)
+            execute("DELETE FROM periods WHERE employee_id = ?", (employee_id,))
+            self.connection.executemany("INSERT OR REPLACE INTO punches VALUES (?, ?, ?, ?)", sorted(punches))
+            self.connection.executemany("INSERT OR REPLACE INTO attendance VALUES (?, ?, ?, ?)", attendance_rows)
+            self.connection.executemany("INSERT OR REPLACE INTO periods VALUES (?, ?, ?, ?, ?)", period_rows)
+            self.connection.executemany(HISTORY_RESULT_SQL, result_rows)
+
+    def load_month_inputs(self, employee: Optional[str] = None, start_month: Optional[str] = None,
+                          end_month: Optional[str] = None) -> List[tuple]:
+        """
+        读出已记录的员工月重新计算所需的输入，打卡只保留每天最早和最晚的非异地打卡，每种数据一次范围查询。
+
+        参数:
+            employee (Optional[str]): 员工标识或姓名，为空时读取所有员工。
+            start_month (Optional[str]): 起始月份，格式为 'YYYY-MM'，为空时不限制。
+            end_month (Optional[str]): 结束月份（包含），为空时不限制。
+
+        返回值:
+            List[tuple]: 按员工和月份排序的 (员工标识, 月份, 当月累计迟到分钟数, 每天打卡, 每日迟到, 每日班次, 时间段)，
+                后四项为元组，格式见 recalculate_employee_month。
+        """
+        inputs = OrderedDict()
+        with self.lock:
+            conditions, parameters = history_range_condition('m', 'month', employee, start_month, end_month)
+            for employee_id, month, late_minutes in self.connection.execute(
+                    f"SELECT employee_id, month, late_minutes FROM months m WHERE {conditions} ORDER BY employee_id, month", parameters):
+                inputs[(employee_id, month)] = ([], [], [], [], late_minutes or 0)
+            conditions, parameters = history_range_condition('p', 'date', employee, start_month, end_month)
+            punches = self.connection.execute(
+                f"SELECT employee_id, date, MIN(seconds), MAX(seconds) FROM punches p WHERE {conditions} AND remote = 0 "
+                "GROUP BY employee_id, date ORDER BY employee_id, date", parameters).fetchall()
+            conditions, parameters = history_range_condition('a', 'date', employee, start_month, end_month)
+            attendance = self.connection.execute(
+                f"SELECT employee_id, date, late_minutes, shift_name FROM attendance a WHERE {conditions}", parameters).fetchall()
+            conditions, parameters = history_range_condition('r', 'date', employee, start_month, end_month)
+            periods = self.connection.execute(
+                f"SELECT employee_id, date, kind, start_minute, end_minute FROM periods r WHERE {conditions}", parameters).fetchall()
+        for employee_id, date, first, last in punches:
+            month_inputs = inputs.get((employee_id, date[:7]))
+            if month_inputs is not None:
+                month_inputs[0].append((date, first, last))
+        for employee_id, date, late_minutes, shift_name in attendance:
+            month_inputs = inputs.get((employee_id, date[:7]))
+            if month_inputs is not None:
+                month_inputs[1].append((date, late_minutes))
+                if shift_name:
+                    month_inputs[2].append((date, shift_name))
+        for employee_id, date, kind, start, end in periods:
+            month_inputs = inputs.get((employee_id, date[:7]))
+            if month_inputs is not None and kind in HISTORY_PERIOD_KINDS:
+                month_inputs[3].append((HISTORY_PERIOD_KINDS.index(kind), date, start, end))
+        return [(employee_id, month, late_minutes, tuple(bounds), tuple(late), tuple(shifts), tuple(periods))
+                for (employee_id, month), (bounds, late, shifts, periods, late_minutes) in inputs.items() if bounds]
+
+    def replace_day_results(self, month_results: List[Tuple[str, str, list]]):
+        """
+        用重新计算的每日结果替换数据库中对应员工月的每日结果，其他数据不变。
+
+        参数:
+            month_results (List[Tuple[str, str, list]]): (员工标识, 月份, DailyResult 列表)。
+        """
+        with self.lock, self.connection:
+            for employee_id, month, result in month_results:
+                self.connection.execute("DELETE FROM day_results WHERE employee_id = ? AND date >= ? AND date < ?",
+                                        (employee_id, month + '-', month + '-~'))
+                self.connection.executemany(HISTORY_RESULT_SQL, [history_result_row(employee_id, row) for row in result])
+
+    def monthly_summaries(self, employee: Optional[str] = None, start_month: Optional[str] = None,
+                          end_month: Optional[str] = None) -> List[Tuple[str, str, str, SummaryAccumulator]]:
+        """
+        按员工和月份汇总数据库中的每日结果。指定员工时使用 (employee_id, date) 主键索引，否则使用日期索引。
+
+        参数:
+            employee (Optional[str]): 员工标识或姓名，为空时查询所有员工。
+            start_month (Optional[str]): 起始月份，格式为 'YYYY-MM'，为空时不限制。
+            end_month (Optional[str]): 结束月份（包含），为空时不限制。
+
+        返回值:
+            List[Tuple[str, str, str, SummaryAccumulator]]: 按员工和月份排序的 (员工标识, 员工姓名, 月份, 汇总结果)。
+        """
+        conditions, parameters = history_range_condition('d', 'date', employee, start_month, end_month)
+        query = (f"SELECT d.employee_id, e.employee_name, m.late_minutes, d.* FROM day_results d "
+                 f"LEFT JOIN employees e ON e.employee_id = d.employee_id "
+                 f"LEFT JOIN months m ON m.employee_id = d.employee_id AND m.month = substr(d.date, 1, 7) "
+                 f"WHERE {conditions} ORDER BY d.employee_id, d.date")
+        summaries = []
+        with self.lock:
+            rows = self.connection.execute(query, parameters).fetchall()
+        for (employee_id, month), group in itertools.groupby(rows, key=lambda row: (row[0], row[4][:7])):
+            group = list(group)
+            summary = summarize_results([DailyResult(*row[4:]) for row in group])
+            summaries.append((employee_id, group[0][1] or '', month, summary))
+        return summaries
+
+    def employee_names(self) -> Dict[str, str]:
+        """
+        返回 {员工标识: 员工姓名}。
+        """
+        with self.lock:
+            return dict(self.connection.execute("SELECT employee_id, employee_name FROM employees"))
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+_history_store = None
+_history_store_lock = threading.Lock()
+
+def get_history_store() -> HistoryStore:
+    """
+    获取历史数据库，第一次使用时打开，程序退出时自动关闭。
+
+    返回值:
+        HistoryStore: 进程内唯一的历史数据库。
+    """
+    global _history_store
+    with _history_store_lock:
+        if _history_store is None:
+            _history_store = HistoryStore()
+            atexit.register(_history_store.close)
+        return _history_store
+
+def record_history(employee_id: str, employee_name: str, month: str, clock_in_data: list, attendance: tuple,
+                   leave_data: Tuple[IntervalIndex, IntervalIndex, IntervalIndex], result: list):
+    """
+    将一个员工月写入历史数据库，参数见 HistoryStore.record_month。--no-history 或没有员工标识时什么也不做；
+    写入失败只打印提示，不影响报表。
+    """
+    if not USE_HISTORY or not employee_id:
+        return
+    import sqlite3
+    try:
+        with profile_stage('report'):
+            get_history_store().record_month(employee_id, employee_name, month, clock_in_data, attendance, leave_data, result)
+    except (sqlite3.Error, OSError) as e:
+        print(f"写入历史数据库失败: {e}")
+
+def history_report(employee: Optional[str] = None, months: Optional[List[Tuple[int, int]]] = None, summaries: Optional[list] = None) -> Tuple[List[str], list]:
+    """
+    从历史数据库中查询每个员工每个月的加班汇总，不发出任何请求。
+
+    参数:
+        employee (Optional[str]): 员工标识或姓名，为空时查询所有员工。
+        months (Optional[List[Tuple[int, int]]]): 查询的月份区间，为空时查询所有月份。
+        summaries (Optional[list]): 已经算好的 (员工标识, 员工姓名, 月份, 汇总结果)，例如 recalculate_history 的返回值，
+            传入时不再查询数据库。
+
+    返回值:
+        Tuple[List[str], list]: 表头和表格行，每个员工最后一行为区间合计。
+    """
+    if summaries is None:
+        start_month = f"{months[0][0]}-{months[0][1]:02d}" if months else None
+        end_month = f"{months[-1][0]}-{months[-1][1]:02d}" if months else None
+        summaries = get_history_store().monthly_summaries(employee, start_month, end_month)
+    headers = ["员工", "姓名", "月份"] + ROLLUP_HEADERS
+    table = []
+    for employee_id, group in itertools.groupby(summaries, key=lambda item: item[0]):
+        group = list(group)
+        for _, name, month, summary in group:
+            table.append([employee_id, name, month] + [round(value, 2) for value in summary.rollup_values()])
+        total = group_summaries((({'month': month}, summary) for _, _, month, summary in group), ())[()]
+        table.append([employee_id, name, "合计"] + [round(value, 2) for value in total.rollup_values()])
+    return headers, table
+
+
+# 多进程重新计算
+# 数据已经在历史数据库中时，重新计算只剩下纯 Python 的 CPU 计算，线程受 GIL 限制，改用进程池：
+# 每个员工月是一个任务，父进程查询出紧凑的输入（每天的打卡上下限、迟到、班次和时间段，都是元组），
+# 子进程计算每日结果和汇总，父进程按任务顺序合并，结果与进程数和完成顺序无关
+RECALCULATE_CHUNKS_PER_WORKER = 4   # 每个进程平均分到的任务批次数，批次越少进程间通信越少，越多负载越均衡
+
+def _init_recalculate_worker(work_calendars: Dict[int, WorkCalendar]):
+    """
+    进程池的初始化函数：每个子进程只接收一次日期性质索引，之后不读缓存也不请求节假日接口。
+    """
+    _work_calendars.update(work_calendars)
+
+def recalculate_employee_month(task: tuple) -> Tuple[str, str, list, SummaryAccumulator]:
+    """
+    重新计算一个员工月，在子进程中运行。
+
+    参数:
+        task (tuple): HistoryStore.load_month_inputs 返回的一项，依次为员工标识、月份、当月累计迟到分钟数、
+            每天打卡 ((日期, 最早打卡秒数, 最晚打卡秒数), ...)、每日迟到 ((日期, 分钟数), ...)、
+            每日班次 ((日期, 班次), ...) 和时间段 ((HISTORY_PERIOD_KINDS 中的序号, 日期, 开始分钟, 结束分钟), ...)。
+
+    返回值:
+        Tuple[str, str, list, SummaryAccumulator]: 员工标识、月份、每日统计结果和汇总结果。
+    """
+    employee_id, month, total_late_minutes, bounds, late, shifts, periods = task
+    leave_data = (IntervalIndex(), IntervalIndex(), IntervalIndex())
+    for kind, date, start, end in periods:
+        base = date_ordinal(date) * MINUTES_PER_DAY
+        leave_data[kind].add(base + start, base + end)
+    group_by_date = {date: [first, last] for date, first, last in bounds}
+    daily_late_minutes = {date: [minutes] for date, minutes in late}
+    result, _ = calculate_day_bounds(group_by_date, get_work_calendar(int(month[:4])), *leave_data, daily_late_minutes, dict(shifts))
+    return employee_id, month, result, summarize_results(result)
+
+def recalculate_history(employee: Optional[str] = None, months: Optional[List[Tuple[int, int]]] = None, processes: Optional[int] = None) -> List[Tuple[str, str, str, SummaryAccumulator]]:
+    """
+    用当前的计算规则重新计算历史数据库中已记录的员工月，并替换数据库中的每日结果。
+
+    参数:
+        employee (Optional[str]): 员工标识或姓名，为空时重新计算所有员工。
+        months (Optional[List[Tuple[int, int]]]): 月份区间，为空时重新计算所有月份。
+        processes (Optional[int]): 进程数量，默认为 CPU 核数；为 1 或只有一个任务时在当前进程中计算。
+
+    返回值:
+        List[Tuple[str, str, str, SummaryAccumulator]]: 按员工和月份排序的 (员工标识, 员工姓名, 月份, 汇总结果)，
+            格式与 HistoryStore.monthly_summaries 一致。
+    """
+    start_month = f"{months[0][0]}-{months[0][1]:02d}" if months else None
+    end_month = f"{months[-1][0]}-{months[-1][1]:02d}" if months else None
+    store = get_history_store()
+    with profile_stage('parse'):
+        tasks = store.load_month_inputs(employee, start_month, end_month)
+    if not tasks:
+        return []
+    # 子进程不再读取节假日缓存，需要的年份先在父进程中准备好
+    work_calendars = {year: get_work_calendar(year) for year in sorted({int(task[1][:4]) for task in tasks})}
+    processes = max(1, processes or os.cpu_count() or 1)
+    print(f"正在使用 {min(processes, len(tasks))} 个进程重新计算 {len(tasks)} 个员工月...")
+    with profile_stage('compute'):
+        if processes == 1 or len(tasks) == 1:
+            outcomes = [recalculate_employee_month(task) for task in tasks]
+        else:
+            chunk_size = max(1, len(tasks) // (processes * RECALCULATE_CHUNKS_PER_WORKER))
+            with ProcessPoolExecutor(max_workers=min(processes, len(tasks)), initializer=_init_recalculate_worker,
+                                     initargs=(work_calendars,)) as executor:
+                # map 按提交顺序返回结果，合并顺序与完成顺序无关
+                outcomes = list(executor.map(recalculate_employee_month, tasks, chunksize=chunk_size))
+    with profile_stage('report'):
+        store.replace_day_results([(employee_id, month, result) for employee_id, month, result, _ in outcomes])
+    names = store.employee_names()
+    return [(employee_id, names.get(employee_id, ''), month, summary) for employee_id, month, _, summary in outcomes]
+
+
+# 批量计算
+def read_roster(roster_file: str) -> List[Dict[str, str]]:
+    """
+    读取员工名单文件。文件为 CSV 格式，首行为表头，必须包含 name 和 cookie 两列，
+    可选 department 列。
+
+    参数:
+        roster_file (str): 名单文件路径。
+
+    返回值:
+        List[Dict[str, str]]: 名单中的每一行。
+
+    异常:
+        ValueError: 如果缺少必需的列，或同一员工（员工标识相同，或报表文件名相同）出现多次。
+    """
+    with open(roster_file, 'r', newline='', encoding='utf-8-sig') as file:
+        reader = csv.DictReader(file)
+        missing = {'name', 'cookie'} - set(reader.fieldnames or [])
+        if missing:
+            raise ValueError(f"名单文件缺少必需的列: {', '.join(sorted(missing))}")
+        roster = [row for row in reader if row.get('name') and row.get('cookie')]
+
+    # 同一员工出现两次时个人报表会互相覆盖，直接报错；员工标识相同即视为同一员工
+    seen = {}
+    for line, entry in enumerate(roster, start=1):
+        for key in {get_employee_cache_key(entry['cookie'].strip()), roster_report_name(entry)} - {None}:
+            if key in seen:
+                raise ValueError(f"名单中第 {seen[key]} 条和第 {line} 条记录是同一员工（{key}）")
+            seen[key] = line
+    return roster
+
+def roster_report_name(entry: Dict[str, str]) -> str:
+    """
+    生成名单中一个员工的个人报表文件名（不含扩展名）：Cookie 中的员工标识（MCHRID）加上姓名，
+    非字母数字的字符都替换为下划线，避免重名员工互相覆盖，也避免姓名中的 / 或 .. 把报表写到输出目录之外。
+
+    参数:
+        entry (Dict[str, str]): 名单中的一行，包含 name 和 cookie。
+
+    返回值:
+        str: 文件名，Cookie 中没有 MCHRID 时只使用姓名。
+    """
+    name = re.sub(r'[^\w-]', '_', entry['name'].strip()) or '未知'
+    employee_id = get_employee_cache_key(entry['cookie'].strip())
+    return f"{employee_id}_{name}" if employee_id else name
+
+def process_roster_entry(entry: Dict[str, str], target_year: int, target_month: int, output_dir: str) -> Tuple[str, str, list, Optional[SummaryAccumulator]]:
+    """
+    计算名单中一个员工的加班情况并保存个人报表。任何错误都只影响当前员工。
+
+    参数:
+        entry (Dict[str, str]): 名单中的一行，包含 name 和 cookie。
+        target_year (int): 目标年份。
+        target_month (int): 目标月份。
+        output_dir (str): 个人报表输出目录。
+
+    返回值:
+        Tuple[str, str, list, Optional[SummaryAccumulator]]: 员工姓名、处理状态（"成功" 或错误信息）、汇总表格和汇总结果，
+            失败时汇总表格为空、汇总结果为 None。
+    """
+    name = entry['name'].strip()
+    cookie = entry['cookie'].strip()
+    try:
+        if not validate_user_cookie(cookie):
+            raise ValueError("Cookie缺少必需字段")
+        # 接口中包含用户变量，每个员工都需要单独获取，离线模式下不需要
+        if OFFLINE:
+            clock_in_api_endpoint = process_application_api_endpoint = ''
+        else:
+            clock_in_api_endpoint = get_user_variable_online(cookie, CLOCK_IN_DATA_TITLE)
+            process_application_api_endpoint = get_user_variable_online(cookie, PROCESS_APPLICATION_DATA_TITLE)
+        clock_in_data, process_application_data, attendance_data, cookie = fetch_employee_data(cookie, target_year, target_month, clock_in_api_endpoint, process_application_api_endpoint)
+        result, summarize_data, summary = calculate_employee_month(clock_in_data, process_application_data, attendance_data, cookie, verbose=False, employee_name=name)
+        save_report(os.path.join(output_dir, roster_report_name(entry) + ".csv"), result, summarize_data)
+        return name, "成功", summarize_data, summary
+    except (Exception, SystemExit) as e:
+        # SystemExit 来自沿用的 exit() 调用，批量模式下不能让单个员工终止整个任务
+        if DEBUG:
+            traceback.print_exc()
+        return name, f"失败: {e}", [], None
+
+def run_batch(roster_file: str, target_year: int, target_month: int, workers: int):
+    """
+    批量计算名单中所有员工指定月份的加班情况，使用有界线程池并发处理。
+
+    参数:
+        roster_file (str): 名单文件路径。
+        target_year (int): 目标年份。
+        target_month (int): 目标月份。
+        workers (int): 并发处理的员工数量上限。
+    """
+    global INTERACTIVE
+    INTERACTIVE = False
+
+    try:
+        roster = read_roster(roster_file)
+    except ValueError as e:
+        print(f"名单文件有误: {e}")
+        exit()
+    # 所有员工共用同一份节假日数据，开始前预取，之后不再请求
+    prefetch_holiday_calendars([target_year])
+    output_dir = f"{OUTPUT_PATH}{target_year}年{target_month:02d}月批量报表/"
+    ensure_directory_exists(output_dir)
+    print(f"共 {len(roster)} 名员工，使用 {workers} 个并发任务计算{target_year}年{target_month}月的加班情况...")
+
+    outcomes = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(process_roster_entry, entry, target_year, target_month, output_dir) for entry in roster]
+        for index, future in enumerate(futures):
+            name, status, summarize_data, summary = future.result()
+            print(f"[{index + 1}/{len(roster)}] {name}: {status}")
+            outcomes.append((name, status, summarize_data, summary))
+
+    # 汇总表按名单顺序输出，每个员工一行
+    header = next(([item[0] for item in data] for _, _, data, _ in outcomes if data), [])
+    summary_file = output_dir + '批量汇总.csv'
+    with profile_stage('report'), open(summary_file, 'w', newline='', encoding='utf-8-sig') as csvfile:
+        csvwriter = csv.writer(csvfile)
+        csvwriter.writerow(["姓名", "状态"] + header)
+        for name, status, summarize_data, _ in outcomes:
+            csvwriter.writerow([name, status] + [item[1] for item in summarize_data])
+
+    # 部门汇总直接合并每个员工的汇总结果，不再遍历每日结果
+    departments = [({'department': (entry.get('department') or '').strip() or '未分组'}, summary)
+                   for entry, (_, _, _, summary) in zip(roster, outcomes) if summary is not None]
+    department_totals = group_summaries(departments, ('department',))
+    department_members = {}
+    for context, _ in departments:
+        department_members[context['department']] = department_members.get(context['department'], 0) + 1
+    department_file = output_dir + '部门汇总.csv'
+    with profile_stage('report'), open(department_file, 'w', newline='', encoding='utf-8-sig') as csvfile:
+        csvwriter = csv.writer(csvfile)
+        csvwriter.writerow(["部门", "人数"] + ROLLUP_HEADERS)
+        for (department,), total in department_totals.items():
+            csvwriter.writerow([department, department_members[department]] + [round(value, 2) for value in total.rollup_values()])
+
+    failed = sum(1 for _, status, _, _ in outcomes if status != "成功")
+    print(f"批量计算完成，成功 {len(outcomes) - failed} 人，失败 {failed} 人，汇总已保存到 {summary_file} 和 {department_file}")
+
+
+# 多月份区间查询
+def parse_month_arg(value: str) -> Tuple[int, int]:
+    """
+    解析 'YYYY-MM' 格式的月份参数。
+
+    参数:
+        value (str): 月份字符串，例如 '2026-01'。
+
+    返回值:
+        Tuple[int, int]: 年份和月份。
+
+    异常:
+        argparse.ArgumentTypeError: 如果格式不正确。
+    """
+    try:
+        parsed = datetime.strptime(value, '%Y-%m')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"月份格式应为 YYYY-MM，例如 2026-01，实际为: {value}")
+    return parsed.year, parsed.month
+
+def iter_months(start: Tuple[int, int], end: Tuple[int, int]) -> List[Tuple[int, int]]:
+    """
+    列出起止月份之间（包含两端）的所有月份。
+
+    参数:
+        start (Tuple[int, int]): 起始年份和月份。
+        end (Tuple[int, int]): 结束年份和月份。
+
+    返回值:
+        List[Tuple[int, int]]: 按时间顺序排列的 (年份, 月份) 列表。
+    """
+    months = []
+    year, month = start
+    while (year, month) <= end:
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+def summarize_range(month_results: List[Tuple[int, int, list]], verbose: bool = True) -> Tuple[List[str], list]:
+    """
+    汇总多个月份的统计结果，每个月一行，最后一行为区间合计。
+
+    参数:
+        month_results (List[Tuple[int, int, list]]): 每个月的 (年份, 月份, 每日统计结果)。
+        verbose (bool): 是否在终端打印汇总表格。
+
+    返回值:
+        Tuple[List[str], list]: 表头和表格行。
+    """
+    headers = ["月份"] + ROLLUP_HEADERS
+    month_keys = [f"{year}-{month:02d}" for year, month, _ in month_results]
+    month_totals = group_summaries((({'month': month_key}, row) for month_key, (_, _, result) in zip(month_keys, month_results) for row in result), ('month',))
+    # 没有打卡记录的月份也输出一行
+    summaries = [month_totals.get((month_key,)) or SummaryAccumulator() for month_key in month_keys]
+    total = group_summaries((({'month': month_key}, summary) for month_key, summary in zip(month_keys, summaries)), ()).get((), SummaryAccumulator())
+    table = [[month_key] + [round(value, 2) for value in summary.rollup_values()] for month_key, summary in zip(month_keys, summaries)]
+    table.append(["合计"] + [round(value, 2) for value in total.rollup_values()])
+
+    if verbose:
+        from tabulate import tabulate
+        print(tabulate(table, headers=headers, tablefmt="grid"))
+    return headers, table
+
+def run_range(cookie: str, months: List[Tuple[int, int]], clock_in_api_endpoint: str, process_application_api_endpoint: str, workers: int) -> Tuple[list, str]:
+    """
+    计算多个月份的加班情况。各月份的打卡和出勤数据并发获取，流程申请数据只获取和解析一次。
+
+    参数:
+        cookie (str): 用户的 Cookie。
+        months (List[Tuple[int, int]]): 要查询的 (年份, 月份) 列表。
+        clock_in_api_endpoint (str): 打卡数据接口。
+        process_application_api_endpoint (str): 流程申请数据接口。
+        workers (int): 并发请求数量上限。
+
+    返回值:
+        Tuple[list, str]: 每个月的 (年份, 月份, 每日统计结果, 汇总结果) 列表和（可能已刷新的）Cookie。
+    """
+    # 跨年的区间需要多个年份的节假日数据，先一次性预取
+    prefetch_holiday_calendars(year for year, _ in months)
+
+    # 流程申请数据与月份无关，先单独获取并解析一次，所有月份共用
+    print("检查并获取流程申请数据...")
+    process_application_data, cookie = check_and_refresh_data(get_process_application_data, process_application_api_endpoint, cookie)
+    leave_data = parse_process_application_data(process_application_data, cookie)
+
+    print(f"正在并发获取 {len(months)} 个月份的打卡和出勤数据...")
+    # 当前有效的 Cookie。每个请求开始时读取，之后开始的月份直接使用续期后的 Cookie
+    current = {'cookie': cookie}
+    current_lock = threading.Lock()
+
+    def fetch(fetch_function, year, month):
+        used_cookie = current['cookie']
+        data, new_cookie = check_and_refresh_data(fetch_function, clock_in_api_endpoint, used_cookie, month, year)
+        with current_lock:
+            # 只接受对当前 Cookie 的续期，较早发出的请求不会用旧 Cookie 覆盖更新的续期结果
+            if new_cookie and new_cookie != used_cookie and current['cookie'] == used_cookie:
+                current['cookie'] = new_cookie
+        return data
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        fetches = {
+            (year, month): (
+                executor.submit(fetch, get_clock_in_data, year, month),
+                executor.submit(fetch, get_attendance_data, year, month),
+            )
+            for year, month in months
+        }
+
+        def calculate_month(year, month):
+            clock_in_future, attendance_future = fetches[(year, month)]
+            clock_in_data = clock_in_future.result()
+            attendance_data = attendance_future.result()
+            return calculate_employee_month(clock_in_data, process_application_data, attendance_data, current['cookie'], verbose=False, leave_data=leave_data)
+
+        # 打卡和出勤请求都先于计算任务提交，计算任务等待的请求一定已经在执行或已完成
+        calculations = [(year, month, executor.submit(calculate_month, year, month)) for year, month in months]
+        month_results = []
+        for year, month, future in calculations:
+            try:
+                result, summarize_data, _ = future.result()
+            except ValueError as e:
+                print(f"{year}年{month}月: {e}，已跳过")
+                continue
+            month_results.append((year, month, result, summarize_data))
+
+    return month_results, current['cookie']
+
+
+# 主程序
+def main():
+    global DEBUG, DELAY_DEDUCTION_WORKERS, USE_DAILY_RESULT_CACHE, USE_HISTORY, OFFLINE
+
+    # 创建 ArgumentParser 对象
+    parser = argparse.ArgumentParser(description='参数配置，是否使用本地数据，是否清除或者删除配置文件，是否指定浏览器')
+
+    # 添加命令行参数
+    parser.add_argument('--local', action='store_true', help='使用本地数据')
     parser.add_argument('--delete_sensitive_files', action='store_true', help='删除敏感文件')
     parser.add_argument('--clean-run', action='store_true', help='清除所有配置并重新运行')
     parser.add_argument('--broswer', choices=['chrome', 'edge', 'auto'], default='auto', help='指定使用的浏览器 (chrome, edge 或 auto), Safari浏览器不可用, 后续也不会添加Safari支持')
     parser.add_argument('--debug', action='store_true', help='开启调试模式，打印详细的请求/响应信息和错误原因')
+    parser.add_argument('--year', type=int, help='目标年份，指定后不再询问')
+    parser.add_argument('--month', type=int, choices=range(1, 13), metavar='{1..12}', help='目标月份，指定后不再询问')
+    parser.add_argument('--roster', help='批量模式：员工名单 CSV 文件路径，需包含 name 和 cookie 列')
+    parser.add_argument('--workers', type=int, default=8, help='批量模式下同时处理的员工数量，区间查询时同时请求的数量，默认为 8')
+    parser.add_argument('--delay-workers', type=int, default=DELAY_DEDUCTION_WORKERS, help=f'同时获取延时工时扣减表单的数量，默认为 {DELAY_DEDUCTION_WORKERS}')
+    parser.add_argument('--from', dest='range_from', type=parse_month_arg, metavar='YYYY-MM', help='区间查询的起始月份，例如 2026-01')
+    parser.add_argument('--to', dest='range_to', type=parse_month_arg, metavar='YYYY-MM', help='区间查询的结束月份，例如 2026-12，不指定时与起始月份相同')
+    parser.add_argument('--recompute', action='store_true', help='忽略已缓存的每日结果，重新计算每一天')
+    parser.add_argument('--offline', action='store_true', help='离线模式：只使用之前缓存的接口响应计算，不发出任何请求')
+    parser.add_argument('--export', type=lambda value: [item.strip() for item in value.split(',') if item.strip()], metavar='FORMATS', help=f"额外导出每日结果和汇总，可选 {', '.join(EXPORTERS)}，多个格式用逗号分隔")
+    parser.add_argument('--export-dir', default=EXPORT_PATH, help=f'导出目录，默认为 {EXPORT_PATH}')
+    parser.add_argument('--append', action='store_true', help='导出时追加到已有的数据，不清空之前导出的内容')
+    parser.add_argument('--no-history', action='store_true', help=f'不把本次获取的数据和计算结果写入历史数据库 {HISTORY_DB_FILE}')
+    parser.add_argument('--history', nargs='?', const='', metavar='EMPLOYEE', help='从历史数据库查询每个月的加班汇总，不发出请求；可以指定员工标识或姓名，配合 --from/--to 限定月份')
+    parser.add_argument('--recalculate', nargs='?', const='', metavar='EMPLOYEE', help='用当前的计算规则重新计算历史数据库中已记录的员工月并更新每日结果，不发出请求；可以指定员工标识或姓名，配合 --from/--to 限定月份')
+    parser.add_argument('--processes', type=int, default=os.cpu_count(), help=f'重新计算时使用的进程数量，默认为 CPU 核数 {os.cpu_count()}')
+    parser.add_argument('--profile', nargs='?', const=PROFILE_TRACE_FILE, metavar='FILE', help=f'性能分析：结束时打印各阶段的耗时、请求数和传输量，并写入 JSON 跟踪文件，默认为 {PROFILE_TRACE_FILE}')
 
     args = parser.parse_args()
 
-    global DEBUG
     if args.debug:
         DEBUG = True
         print("[DEBUG] 调试模式已开启")
 
+    if args.profile:
+        enable_profiling(args.profile)
+
+    if args.export:
+        try:
+            open_exporters(args.export, args.export_dir, args.append)
+        except (ValueError, RuntimeError, OSError) as e:
+            print(f"无法打开导出器: {e}")
+            exit()
+
+    if args.recompute:
+        USE_DAILY_RESULT_CACHE = False
+    if args.no_history:
+        USE_HISTORY = False
+    if args.offline:
+        OFFLINE = True
+        print("离线模式：只使用缓存的数据")
+
+    DELAY_DEDUCTION_WORKERS = max(1, args.delay_workers)
+    size_http_pool(args.workers, bool(args.roster))
+
     if args.delete_sensitive_files:
         if os.path.exists(COOKIES_FILE):
             os.remove(COOKIES_FILE)
             print("Cookie文件已删除")
         else:
             print("Cookie文件不存在，干净又卫生！")
+        if os.path.exists(CACHE_PATH):
+            shutil.rmtree(CACHE_PATH)
+            print("缓存目录已删除")
         if os.path.exists(OUTPUT_PATH):
             for filename in os.listdir(OUTPUT_PATH):
                 file_path = os.path.join(OUTPUT_PATH, filename)
@@ -1278,88 +4195,141 @@ def main():
         print("Cookie文件和配置文件已删除")
     if args.local:
         if os.path.exists(LOCAL_DATA_PATH + 'data.json'):
-            with open(LOCAL_DATA_PATH + 'data.json', 'r', encoding='utf-8') as file:
-                clock_in_data = json.load(file)
             print("使用本地数据，请注意节假日信息年份")
-            holidays = {}
-            workdays = set()
+            # 边读边计算，不把整个文件读入内存：一天的打卡读完（员工或日期变化）就立即计算这一天
+            records = iter_json_array(LOCAL_DATA_PATH + 'data.json')
+            with profile_stage('parse'):
+                first_record = next(records, None)
+            clock_in_data = [first_record] if first_record else []
             if os.path.exists(LOCAL_DATA_PATH + 'holidays.json'):
                 with open(LOCAL_DATA_PATH + 'holidays.json', 'r', encoding='utf-8') as file:
                     info = json.load(file)
-                holidays, workdays = get_holiday_data_from_local(clock_in_data, info)
-            else:
+                get_holiday_data_from_local(clock_in_data, info)   # 写入节假日缓存，与在线查询共用
+            elif clock_in_data:
                 print(f"未找到本地信息，正在获取文件对应的节假日信息，请稍后...")
-                holidays, workdays = get_holiday_data_online(clock_in_data)
-            result = []			    # 这玩意存结果,列表里边是元组,元组可通过下标访问(python限定)
-            group_by_date = {}	    # 按日期统计打卡时间
-            overtime_income = 0.0   # 加班费
-            for item in clock_in_data:
-                # 过滤掉包含异地打卡的数据
-                if "(异地打卡)" in item['CARDTIME']:
-                    continue
-                group_by_date.setdefault(item['SHIFTTERM'], []).append(item['CARDTIME'][11::])		# 过滤掉打卡时间里的年月日
-            for i in group_by_date:
-                group_by_date[i] = sorted(group_by_date[i], key=lambda time: datetime.strptime(time[:8], '%H:%M:%S'))	# 排序,时间早的在前面
-                date = i																# 日期
-                first_check_time = group_by_date[i][0]									# 最早的打卡时间
-                last_check_time = group_by_date[i][-1]									# 最晚的打卡时间
-                day_type = get_day_type(date, holidays, workdays)						# 今天啥日子
-                rate = pay_rate_cal(day_type)											# 加班一小时该给多少钱
-                overtime = overtime_cal(first_check_time, last_check_time, day_type)	# 加了多久班(单位小时)
-                overtime_pay = overtime_pay_cal(overtime, rate)							# 加班费多少
-                overtime_income += float(overtime_pay)									# 总加班费
-                allowance = allowance_cal(overtime, day_type)							# 有没有食补
-                total_income = income_cal(overtime_pay, allowance)						# 一天的总收入
-                late_minutes = late_time_cal(first_check_time, day_type)				# 迟到了多久
-                result.append((date, first_check_time[:8], last_check_time[:8], day_type, rate, overtime, overtime_pay, allowance, total_income, late_minutes))
-            # 评价信息
-            rank = ''
-            if overtime_income < 300:
-                rank = '李在赣神魔？'
-            elif 300 <= overtime_income < 500:
-                rank = '不太行'
-            elif 500 <= overtime_income < 1000:
-                rank = '一般，建议多加点 冲1000'
-            elif 1000 <= overtime_income <= 1500:
-                rank = '牛逼'
-            elif 1500 <= overtime_income < 2000:
-                rank = '逆天'
-            elif overtime_income >= 2000:
-                rank = f'你是懂加班的，白加了 {overtime_income - 2000:.2f} 元'
-            file_name = OUTPUT_PATH + '本地数据加班情况分析报表.csv'
-            summarize(result, workdays, holidays, 0, 0)
-            print(f"\n**********************\n义眼丁真，鉴定您的级别为：\n {rank}\n**********************\n")
-            print(f"正在保存数据到 {file_name}...")
-
-            # 保存报表
-            with open(file_name, 'w', newline='', encoding='utf-8-sig') as csvfile:    
-                csvwriter = csv.writer(csvfile)
-                csvwriter.writerow(["日期", "最早打卡时间", "最晚打卡时间", "本日性质", "加班时薪", "加班时长", "加班薪资", "延时餐补", "总收入", "迟到分钟数"])
-                csvwriter.writerows(result)
+            else:
+                print("数据文件为空或格式不正确。")
+                exit()
+            with profile_stage('parse'):
+                employees = calculate_local_punches(itertools.chain([first_record], records))
+            if not employees:
+                print("数据文件中没有有效的打卡记录。")
+                exit()
+
+            # 多员工的导出文件每名员工单独汇总和保存，只有一名员工时与之前的报表相同
+            for employee, days in employees.items():
+                result = list(days.values())	# 每日结果，DailyResult 列表
+                # 本地数据可能跨月，按月份分别导出
+                for month, rows in itertools.groupby(result, key=lambda row: row.date[:7]):
+                    rows = list(rows)
+                    export_month(employee, '', month, rows, summarize_results(rows))
+                if len(employees) > 1:
+                    print(f"\n员工 {employee or '未知'}:")
+                    employee_key = re.sub(r'[^\w-]', '_', employee) or '未知'
+                    file_name = f"{OUTPUT_PATH}本地数据加班情况分析报表_{employee_key}.csv"
+                else:
+                    file_name = OUTPUT_PATH + '本地数据加班情况分析报表.csv'
+                # 评价信息
+                rank = rank_cal(sum(float(row.overtime_pay) for row in result))
+                summarize(result, get_work_calendar(int(result[0].date[:4])), 0, 0)
+                print(f"\n**********************\n义眼丁真，鉴定您的级别为：\n {rank}\n**********************\n")
+                print(f"正在保存数据到 {file_name}...")
+
+                # 保存报表
+                ensure_directory_exists(file_name)
+                with profile_stage('report'), open(file_name, 'w', newline='', encoding='utf-8-sig') as csvfile:
+                    csvwriter = csv.writer(csvfile)
+                    # 本地数据没有请假和延时扣减信息，只输出前 10 列
+                    csvwriter.writerow(DAILY_RESULT_HEADERS[:10])
+                    csvwriter.writerows(row.as_row()[:10] for row in result)
             exit()
         else:
             print("本地数据文件不存在，下面将进行在线获取")
 
-    # 获取用户输入的年月
-    target_year = input("请输入年份，不输入默认为当年: ")
-    if target_year.isdigit() and 2010 <= int(target_year) <= datetime.now().year:
-        target_year = int(target_year)
-    else:
-        target_year = datetime.now().year
+    # 指定了月份区间时按区间查询
+    months = None
+    if args.range_from or args.range_to:
+        months = iter_months(args.range_from or args.range_to, args.range_to or args.range_from)
+        if not months:
+            print("结束月份不能早于起始月份")
+            exit()
 
-    target_month = input("请输入月份，不输入默认为当月: ")
-    if target_month.isdigit() and 1 <= int(target_month) <= 12:
-        target_month = int(target_month)
+    # 查询或重新计算历史数据库，不需要年月、Cookie 和网络
+    if args.history is not None or args.recalculate is not None:
+        if not os.path.exists(HISTORY_DB_FILE):
+            print(f"历史数据库 {HISTORY_DB_FILE} 不存在，请先正常运行一次")
+            exit()
+        if args.recalculate is not None:
+            summaries = recalculate_history(args.recalculate, months, args.processes)
+            headers, history_table = history_report(summaries=summaries)
+        else:
+            headers, history_table = history_report(args.history, months)
+        if not history_table:
+            print("历史数据库中没有符合条件的记录")
+            exit()
+        from tabulate import tabulate
+        print(tabulate(history_table, headers=headers, tablefmt="grid"))
+        file_name = OUTPUT_PATH + '历史加班情况汇总报表.csv'
+        print(f"正在保存数据到 {file_name}...")
+        ensure_directory_exists(file_name)
+        with profile_stage('report'), open(file_name, 'w', newline='', encoding='utf-8-sig') as csvfile:
+            csvwriter = csv.writer(csvfile)
+            csvwriter.writerow(headers)
+            csvwriter.writerows(history_table)
+        exit()
+
+    # 获取用户输入的年月，批量模式、区间查询或命令行已指定时不再询问
+    if args.year is not None:
+        target_year = args.year
+    elif months:
+        target_year = months[0][0]
+    elif args.roster:
+        target_year = datetime.now().year
     else:
+        target_year = input("请输入年份，不输入默认为当年: ")
+        if target_year.isdigit() and 2010 <= int(target_year) <= datetime.now().year:
+            target_year = int(target_year)
+        else:
+            target_year = datetime.now().year
+
+    if args.month is not None:
+        target_month = args.month
+    elif months:
+        target_month = months[0][1]
+    elif args.roster:
         target_month = datetime.now().month
+    else:
+        target_month = input("请输入月份，不输入默认为当月: ")
+        if target_month.isdigit() and 1 <= int(target_month) <= 12:
+            target_month = int(target_month)
+        else:
+            target_month = datetime.now().month
+
+    if args.roster:
+        if not os.path.exists(args.roster):
+            print(f"名单文件 {args.roster} 不存在")
+            exit()
+        run_batch(args.roster, target_year, target_month, max(1, args.workers))
+        exit()
 
-    print(f"正在查询{target_year}年{target_month}月的加班情况，请稍后...")
+    if months:
+        print(f"正在查询{months[0][0]}年{months[0][1]}月至{months[-1][0]}年{months[-1][1]}月的加班情况，请稍后...")
+    else:
+        print(f"正在查询{target_year}年{target_month}月的加班情况，请稍后...")
 
     # 读取配置
     clock_in_api_endpoint = get_clock_in_api_endpoint_from_config()
     process_application_api_endpoint = get_process_application_api_endpoint_from_config()
     cookie = get_cookie()
 
+    # 离线模式下 Cookie 只用来确定员工，接口地址不需要
+    if OFFLINE:
+        if not cookie:
+            print("离线模式需要之前保存的Cookie来确定员工，请先在线运行一次")
+            exit()
+        clock_in_api_endpoint = clock_in_api_endpoint or ''
+        process_application_api_endpoint = process_application_api_endpoint or ''
+
     # 如果配置文件不存在或者配置文件中的接口地址为空，则需要重新获取
     if not cookie:
         print("未找到Cookie，正在启动浏览器以获取Cookie...")
@@ -1371,182 +4341,51 @@ def main():
             exit()
     
     # 如果配置文件中的打卡数据接口为空，则需要重新获取
-    if not clock_in_api_endpoint:
+    if not clock_in_api_endpoint and not OFFLINE:
         print("未找到打卡数据接口，正在获取...")
         clock_in_api_endpoint = get_user_variable_online(cookie, CLOCK_IN_DATA_TITLE)
         save_clock_in_api_endpoint_to_config(clock_in_api_endpoint)
     
     # 如果配置文件中的流程申请数据接口为空，则需要重新获取
-    if not process_application_api_endpoint:
+    if not process_application_api_endpoint and not OFFLINE:
         print("未找到流程申请数据接口，正在获取...")
         process_application_api_endpoint = get_user_variable_online(cookie, PROCESS_APPLICATION_DATA_TITLE)
         save_process_application_api_endpoint_to_config(process_application_api_endpoint)
 
-    # 获取打卡和流程申请数据
-    print(f"检查并获取打卡数据...")
-    clock_in_data, cookie = check_and_refresh_data(get_clock_in_data, clock_in_api_endpoint, cookie, target_month, target_year)
-    print(f"检查并获取流程申请数据...")
-    process_application_data, cookie = check_and_refresh_data(get_process_application_data, process_application_api_endpoint, cookie)
-    print(f"检查并获取出勤数据...")
-    attendance_data, cookie = check_and_refresh_data(get_attendance_data, clock_in_api_endpoint, cookie, target_month, target_year)
+    if months:
+        month_results, cookie = run_range(cookie, months, clock_in_api_endpoint, process_application_api_endpoint, max(1, args.workers))
+        for year, month, result, summarize_data in month_results:
+            save_report(f"{OUTPUT_PATH}{year}年{month:02d}月加班情况详细分析报表.csv", result, summarize_data)
+        headers, range_table = summarize_range([(year, month, result) for year, month, result, _ in month_results])
+        file_name = f"{OUTPUT_PATH}{months[0][0]}年{months[0][1]:02d}月至{months[-1][0]}年{months[-1][1]:02d}月加班情况汇总报表.csv"
+        print(f"正在保存数据到 {file_name}...")
+        ensure_directory_exists(file_name)
+        with profile_stage('report'), open(file_name, 'w', newline='', encoding='utf-8-sig') as csvfile:
+            csvwriter = csv.writer(csvfile)
+            csvwriter.writerow(headers)
+            csvwriter.writerows(range_table)
+        exit()
+
+    # 获取打卡、流程申请和出勤数据
+    clock_in_data, process_application_data, attendance_data, cookie = fetch_employee_data(cookie, target_year, target_month, clock_in_api_endpoint, process_application_api_endpoint)
 
     # 获取并计算加班信息
-    if not clock_in_data or not isinstance(clock_in_data, list):
-        if DEBUG:
-            print(f"[DEBUG] clock_in_data 原始内容: {clock_in_data}")
-        print("打卡数据为空或格式不正确，程序退出")
+    try:
+        result, summarize_data, summary = calculate_employee_month(clock_in_data, process_application_data, attendance_data, cookie)
+    except ValueError as e:
+        print(f"{e}，程序退出")
         exit()
-        
-    holidays, workdays = get_holiday_data_online(clock_in_data)
-    # 从流程申请中获取年假、事假以及延时工时扣减数据
-    annual_leave, personal_leave, delay_deduction = parse_process_application_data(process_application_data, cookie)
-    # 从出勤数据中获取迟到信息
-    daily_late_minutes, total_late_count, total_late_minutes, daily_shift_map = parse_attendance_data(attendance_data)
-    result = []			        # 这玩意存结果,列表里边是元组,元组可通过下标访问(python限定)
-    group_by_date = {}	        # 按日期统计打卡时间
-    late_minutes = 0.0          # 迟到分钟数
-    overtime_income = 0.0       # 加班费
-    annual_leave_total = 0.0    # 年假总时间
-    personal_leave_total = 0.0  # 事假总时间
-    
-    print(f"正在处理 {len(clock_in_data)} 条打卡记录...")
-    
-    for item in clock_in_data:
-        # 验证数据完整性
-        if not isinstance(item, dict) or 'SHIFTTERM' not in item or 'CARDTIME' not in item:
-            print(f"跳过无效的打卡记录: {item}")
-            continue
-            
-        # 过滤掉包含异地打卡的数据
-        if "(异地打卡)" in item['CARDTIME']:
-            continue
-        group_by_date.setdefault(item['SHIFTTERM'], []).append(item['CARDTIME'][11::])		# 过滤掉打卡时间里的年月日
-    for i in group_by_date:
-        try:
-            # 排序，时间早的在前面
-            group_by_date[i] = sorted(group_by_date[i], key=lambda time_str: datetime.strptime(time_str[:8], '%H:%M:%S'))
-            date = i  # 日期
-        
-            # 确保有打卡记录
-            if not group_by_date[i]:
-                print(f"跳过日期 {date}，无有效打卡记录")
-                continue
-        
-            # 将打卡时间转换为 dt_time 对象，先去除 "(异地打卡)" 后缀
-            first_check_time = datetime.strptime(
-                group_by_date[i][0].replace('(异地打卡)', '').strip(), '%H:%M:%S'
-            ).time()
-            last_check_time = datetime.strptime(
-                group_by_date[i][-1].replace('(异地打卡)', '').strip(), '%H:%M:%S'
-            ).time()
-            day_type = get_day_type(date, holidays, workdays)
-            rate = pay_rate_cal(day_type)
-            shift_name = daily_shift_map.get(date)
-            overtime = overtime_cal(first_check_time.strftime('%H:%M:%S'), last_check_time.strftime('%H:%M:%S'), day_type, shift_name)
-        
-            # 计算延时扣减总时间
-            delay_deduction_time = 0.0
-            if i in delay_deduction:
-                for start_time_str, end_time_str in delay_deduction[i]:
-                    try:
-                        start_time = datetime.strptime(start_time_str, '%H:%M:%S')
-                        end_time = datetime.strptime(end_time_str, '%H:%M:%S')
-                        delay_deduction_time += (end_time - start_time).total_seconds() / 3600
-                    except ValueError as e:
-                        print(f"延时扣减时间格式错误: {e}")
-                overtime = max(0, overtime - delay_deduction_time)  # 确保不为负数
-        
-            overtime_pay = overtime_pay_cal(overtime, rate)  # 加班费多少
-            overtime_income += overtime_pay  # 总加班费
-            allowance = allowance_cal(overtime, day_type)  # 有没有食补
-            total_income = income_cal(overtime_pay, allowance)  # 一天的总收入
-        
-            # 计算事假和年假的时间
-            annual_leave_time = 0.0
-            personal_leave_time = 0.0
-        
-            if i in annual_leave:
-                try:
-                    # 获取 annual_leave 中的第一个时间
-                    leave_start_time_str = annual_leave[i][0][0]
-                    leave_start_time = datetime.strptime(leave_start_time_str, '%H:%M').time()
-                    # 计算当天年假时间
-                    annual_leave_time = (datetime.strptime(annual_leave[i][0][1], '%H:%M') - datetime.strptime(leave_start_time_str, '%H:%M')).total_seconds() / 3600
-                    # 比较 first_check_time 和 leave_start_time，取最早值
-                    first_check_time = min(first_check_time, leave_start_time)
-                except (ValueError, IndexError) as e:
-                    print(f"处理年假数据时出错: {e}")
-        
-            if i in personal_leave:
-                try:
-                    # 获取 personal_leave 中的第一个时间
-                    leave_start_time_str = personal_leave[i][0][0]
-                    leave_start_time = datetime.strptime(leave_start_time_str, '%H:%M').time()
-                    # 计算当天事假时间
-                    personal_leave_time = (datetime.strptime(personal_leave[i][0][1], '%H:%M') - datetime.strptime(leave_start_time_str, '%H:%M')).total_seconds() / 3600
-                    # 比较 first_check_time 和 leave_start_time，取最早值
-                    first_check_time = min(first_check_time, leave_start_time)
-                except (ValueError, IndexError) as e:
-                    print(f"处理事假数据时出错: {e}")
-        
-            # 计算迟到时间
-            late_minutes = late_time_cal(first_check_time, day_type, sum(daily_late_minutes[i]) if i in daily_late_minutes else 0)
-        
-            # 将时间对象转换为字符串用于输出
-            first_check_time_str = first_check_time.strftime('%H:%M:%S')
-            last_check_time_str = last_check_time.strftime('%H:%M:%S')
-        
-            result.append((
-                date,
-                first_check_time_str,
-                last_check_time_str,
-                day_type,
-                rate,
-                overtime,
-                overtime_pay,
-                allowance,
-                total_income,
-                late_minutes,
-                delay_deduction_time,
-                annual_leave_time,
-                personal_leave_time
-            ))
-            
-        except Exception as e:
-            print(f"处理日期 {i} 的数据时出错: {e}")
-            continue
 
     # 评价信息
-    rank = ''
-    if overtime_income < 300:
-        rank = '李在赣神魔？'
-    elif 300 <= overtime_income < 500:
-        rank = '不太行'
-    elif 500 <= overtime_income < 1000:
-        rank = '一般，建议多加点 冲1000'
-    elif 1000 <= overtime_income <= 1500:
-        rank = '牛逼'
-    elif 1500 <= overtime_income < 2000:
-        rank = '逆天'
-    elif overtime_income >= 2000:
-        rank = f'你是懂加班的，白加了 {overtime_income - 2000:.2f} 元'
+    rank = rank_cal(summary.overtime_pay)
     print(f"\n**********************\n义眼丁真，鉴定您的级别为：\n {rank}\n**********************\n")
-    
-    # 汇总统计结果
-    summarize_data = summarize(result, workdays, holidays, total_late_count, total_late_minutes)
 
     # 生成报表文件名
     file_name = f"{OUTPUT_PATH}{target_year}年{target_month:02d}月加班情况详细分析报表.csv"
     print(f"正在保存数据到 {file_name}...")
 
     # 保存报表
-    ensure_directory_exists(file_name)
-    with open(file_name, 'w', newline='', encoding='utf-8-sig') as csvfile:    
-        csvwriter = csv.writer(csvfile)
-        csvwriter.writerow(["日期", "最早打卡时间", "最晚打卡时间", "本日性质", "加班时薪", "加班时长", "加班薪资", "延时餐补", "总收入", "迟到分钟数", "延时工时扣减时间", "年假时间", "事假时间"])
-        csvwriter.writerows(result)
-        csvwriter.writerows([[], [], ["汇总项目", "信息"]])  # 写入两个空行和汇总项目表头
-        csvwriter.writerows(summarize_data)
+    save_report(file_name, result, summarize_data)
 
 if __name__ == '__main__':
     try: